@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+EvidLY Jurisdiction Intelligence Engine — Match Keys
+=====================================================
+
+Resolves crawled records to the stable `jurisdictions` key (state, slug)
+through a lookup table built once from jurisdictions/*_jurisdictions.json.
+The loaders update `WHERE state = ... AND slug = ...`, which hits the
+unique idx_jurisdictions_state_slug index directly, instead of deriving a
+county by stripping " County" from the crawled name and comparing with
+lower(), which breaks for "City of Berkeley" and defeats plain indexes.
+
+Entries without a "slug" are not resolvable and are reported as unmatched.
+"""
+
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+
+JURISDICTIONS_DIR = Path(__file__).parent / "jurisdictions"
+
+_AFFIX_RE = re.compile(r"^(city and county of|city of|county of|town of)\s+|\s+(county|city)$")
+
+
+def normalize_name(name: str) -> str:
+    """Case-, accent-, punctuation- and whitespace-insensitive name."""
+    name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", name.lower()).split())
+
+
+def name_aliases(name: str) -> set:
+    """The full normalized name plus the name with City of / County affixes removed."""
+    full = normalize_name(name)
+    bare = _AFFIX_RE.sub("", full).strip()
+    return {full, bare} - {""}
+
+
+def build_key_index(paths=None) -> dict:
+    """
+    Build {(state, alias): slug} from jurisdiction list files.
+    Aliases shared by two different slugs in the same state are dropped
+    so an ambiguous name can never update the wrong row.
+    """
+    if paths is None:
+        paths = sorted(JURISDICTIONS_DIR.glob("*_jurisdictions.json"))
+
+    exact = {}        # (state, full name) -> slug
+    aliases = {}      # (state, alias) -> slug
+    ambiguous = set()
+    for path in paths:
+        with open(path) as f:
+            entries = json.load(f)
+        for entry in entries:
+            slug = entry.get("slug")
+            if not slug:
+                continue
+            state = entry.get("state", "").upper()
+            full = normalize_name(entry["name"])
+            for alias in name_aliases(entry["name"]):
+                key = (state, alias)
+                table = exact if alias == full else aliases
+                if key in table and table[key] != slug:
+                    ambiguous.add((table is exact, key))
+                else:
+                    table.setdefault(key, slug)
+
+    for is_exact, key in ambiguous:
+        (exact if is_exact else aliases).pop(key, None)
+    # An exact name always beats an alias of another entry, in either order
+    index = dict(aliases)
+    index.update(exact)
+    return index
+
+
+def resolve_key(record: dict, index: dict):
+    """Return (state, slug) for a crawled record, or None if unmatched."""
+    state = (record.get("state") or "CA").upper()
+    name = record.get("jurisdiction_name", "")
+    full = normalize_name(name)
+    slug = index.get((state, full))
+    if slug is None:
+        for alias in name_aliases(name):
+            slug = index.get((state, alias))
+            if slug:
+                break
+    return (state, slug) if slug else None
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+EvidLY Jurisdiction Intelligence Engine — Column Mapping
+=========================================================
+
+Single source of truth for mapping validated crawl records onto
+`jurisdictions` table columns. Used by both the SQL generator
+(load_jurisdictions.py) and the REST updater (push_to_supabase.py) so
+the two paths cannot drift.
+
+Mappings that inspect free text are memoized on their input string:
+crawls repeat the same department names and grading descriptions
+across hundreds of records, so each distinct value is classified once.
+"""
+
+import re
+from functools import lru_cache
+
+
+GRADING_TYPE_MAP = {
+    "letter_grade": "letter_grade",
+    "numerical_score": "score_only",
+    "pass_fail": "pass_fail",
+    "hybrid": "letter_grade",  # Most hybrids are letter + score
+    "other": "report_only",    # Custom systems default to report_only
+    "unknown": "report_only",  # Unknown = no public grading = report_only
+}
+
+# Fire AHJ keywords in priority order — the first rule that matches
+# anywhere in the department name wins, regardless of position.
+FIRE_AHJ_RULES = [
+    (("cal fire", "state fire marshal"), "cal_fire"),
+    (("county fire", "county"), "county_fire"),
+    (("city fire", "city"), "city_fire"),
+    (("fire district", "district"), "fire_district"),
+    (("federal", "nps"), "federal"),
+    (("fire protection",), "county_fire"),  # Most "Fire Protection District" in CA are county-level
+]
+FIRE_AHJ_DEFAULT = "county_fire"  # Default for CA
+
+_FIRE_KEYWORD_RANK = {}
+for _rank, (_keywords, _) in enumerate(FIRE_AHJ_RULES):
+    for _kw in _keywords:
+        _FIRE_KEYWORD_RANK.setdefault(_kw, _rank)
+
+# One pass over the name: the lookahead lets overlapping keywords
+# ("county" inside "county fire") all be reported.
+_FIRE_KEYWORD_RE = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in
+                       sorted(_FIRE_KEYWORD_RANK, key=len, reverse=True)) + "))"
+)
+
+
+def map_grading_type(crawl_gs: dict) -> str:
+    """Map crawl grading_system.type to DB grading_type enum."""
+    return GRADING_TYPE_MAP.get(crawl_gs.get("type", "unknown"), "report_only")
+
+
+@lru_cache(maxsize=4096)
+def _scoring_type(gtype: str, description: str) -> str:
+    if gtype == "pass_fail":
+        return "pass_fail"
+    if gtype == "other":
+        desc = description.lower()
+        # Point-based like Merced
+        if "good" in desc and "satisfactory" in desc:
+            return "weighted_deduction"
+        if "violation" in desc and "count" in desc:
+            return "major_violation_count"
+    # letter_grade, numerical_score, unknown (CalCode default)
+    return "weighted_deduction"
+
+
+def map_scoring_type(crawl_gs: dict) -> str:
+    """Map crawl grading_system to DB scoring_type."""
+    return _scoring_type(crawl_gs.get("type", "unknown"),
+                         crawl_gs.get("description") or "")
+
+
+@lru_cache(maxsize=4096)
+def classify_fire_ahj(department_name: str) -> str:
+    """Classify a fire department name into a fire_ahj_type."""
+    name = " ".join(department_name.lower().split())
+    best = None
+    for m in _FIRE_KEYWORD_RE.finditer(name):
+        rank = _FIRE_KEYWORD_RANK[m.group(1)]
+        if best is None or rank < best:
+            best = rank
+            if rank == 0:
+                break
+    return FIRE_AHJ_RULES[best][1] if best is not None else FIRE_AHJ_DEFAULT
+
+
+def map_fire_ahj_type(crawl_fire: dict) -> str:
+    """Map fire safety authority to fire_ahj_type."""
+    return classify_fire_ahj(crawl_fire.get("department_name") or "")
+
+
+def build_grading_config(crawl_gs: dict) -> dict:
+    """Build grading_config JSONB from crawl data."""
+    config = {
+        "crawl_type": crawl_gs.get("type"),
+        "description": crawl_gs.get("description"),
+    }
+
+    if crawl_gs.get("letter_grades"):
+        config["letter_grades"] = crawl_gs["letter_grades"]
+    if crawl_gs.get("grade_thresholds"):
+        config["grade_thresholds"] = crawl_gs["grade_thresholds"]
+    if crawl_gs.get("score_range_min") is not None:
+        config["score_range_min"] = crawl_gs["score_range_min"]
+    if crawl_gs.get("score_range_max") is not None:
+        config["score_range_max"] = crawl_gs["score_range_max"]
+    if crawl_gs.get("passing_threshold") is not None:
+        config["passing_threshold"] = crawl_gs["passing_threshold"]
+
+    return config
+
+
+def build_violation_weight_map(crawl_gs: dict) -> dict:
+    """Build violation_weight_map JSONB from crawl data."""
+    weights = {}
+    gt = crawl_gs.get("grade_thresholds")
+    if isinstance(gt, dict):
+        weights["grade_thresholds"] = gt
+
+    # Extract any violation weights mentioned in description
+    desc = crawl_gs.get("description", "")
+    if desc:
+        weights["methodology_description"] = desc
+
+    return weights
+
+
+def map_thresholds(crawl_gs: dict) -> tuple:
+    """Return (pass_threshold, warning_threshold, critical_threshold)."""
+    pass_threshold = crawl_gs.get("passing_threshold")
+    if pass_threshold is None and crawl_gs.get("grade_thresholds"):
+        # Lowest passing grade minimum
+        gt = crawl_gs["grade_thresholds"]
+        mins = [v.get("min") for v in gt.values()
+                if isinstance(v, dict) and v.get("min") is not None]
+        if mins:
+            pass_threshold = min(mins)
+
+    # Warning threshold = passing + buffer
+    warning_threshold = None
+    if isinstance(pass_threshold, (int, float)):
+        warning_threshold = int(pass_threshold) + 5
+
+    # Critical = pass threshold
+    return pass_threshold, warning_threshold, pass_threshold
+
+
+def confidence_of(record: dict) -> tuple:
+    """Return (computed confidence, computed score) for notes and comments."""
+    validation = record.get("_validation", {})
+    confidence = validation.get("computed_confidence", record.get("confidence_level", "?"))
+    return confidence, validation.get("computed_confidence_score", "?")
+
+
+def build_notes(record: dict) -> str:
+    """Build the notes column with crawl metadata."""
+    insp = record.get("inspection_details", {})
+    confidence, conf_score = confidence_of(record)
+
+    notes_parts = [f"JIE crawl: confidence={confidence}({conf_score})"]
+
+    if record.get("needs_manual_verification"):
+        notes_parts.append("NEEDS MANUAL VERIFICATION")
+
+    verify_notes = record.get("verification_notes", "")
+    if verify_notes:
+        notes_parts.append(verify_notes)
+
+    freq = insp.get("frequency", "")
+    if freq:
+        notes_parts.append(f"Inspection freq: {freq[:200]}")
+
+    reinsp = insp.get("reinspection_trigger", "")
+    if reinsp:
+        notes_parts.append(f"Reinspection: {reinsp[:200]}")
+
+    return " | ".join(notes_parts)
+
+
+def map_record(record: dict) -> dict:
+    """
+    Map one validated record to the `jurisdictions` columns shared by the
+    SQL and REST loaders. Timestamps and thresholds are left to callers.
+    """
+    gs = record.get("grading_system", {})
+    fire = record.get("fire_safety_authority", {})
+    reg = record.get("regulatory_framework", {})
+
+    # Data sources
+    sources = record.get("data_sources", [])
+    data_source_url = sources[0] if sources else record.get("department_url", "")
+
+    # Scoring methodology description
+    scoring_methodology = gs.get("description", "")
+    if reg.get("food_code_basis"):
+        scoring_methodology = f"{reg['food_code_basis']}. {scoring_methodology}"
+
+    return {
+        "agency_name": record.get("department_name"),
+        "scoring_type": map_scoring_type(gs),
+        "grading_type": map_grading_type(gs),
+        "grading_config": build_grading_config(gs),
+        "scoring_methodology": scoring_methodology[:500],
+        "violation_weight_map": build_violation_weight_map(gs),
+        "fire_ahj_name": fire.get("department_name"),
+        "fire_ahj_type": map_fire_ahj_type(fire),
+        "has_local_amendments": bool(fire.get("ansul_system_requirements")),
+        "data_source_type": "jie_crawl",
+        "data_source_url": (data_source_url or "")[:500],
+        "notes": build_notes(record)[:1000],
+    }
@@ -8,16 +8,29 @@ via the Supabase PostgREST API (no psql needed).
 
 Usage:
     python push_to_supabase.py
+
+    # Stream a directory of per-record JSON files or a JSONL file
+    python push_to_supabase.py --input results/validated/
+    python push_to_supabase.py --input records.jsonl --workers 16
+
+    # JSONL from stdin
+    cat records.jsonl | python push_to_supabase.py --input -
 """
 
+import argparse
 import json
 import sys
+import threading
 import urllib.request
 import urllib.error
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
 
+from jurisdiction_keys import build_key_index, resolve_key
+from jurisdiction_mapping import map_record
+
 
 # ── Config ──────────────────────────────────────────────────────────────
 SUPABASE_URL = "https://irxgmhxhmxtzfwuieblc.supabase.co"
@@ -31,169 +44,34 @@ HEADERS = {
     "apikey": SERVICE_ROLE_KEY,
     "Authorization": f"Bearer {SERVICE_ROLE_KEY}",
     "Content-Type": "application/json",
-    "Prefer": "return=minimal",
+    "Prefer": "return=minimal,count=exact",
 }
 
 
-# ── Mapping functions (mirroring load_jurisdictions.py) ─────────────────
-
-def map_grading_type(crawl_gs: dict) -> str:
-    gtype = crawl_gs.get("type", "unknown")
-    mapping = {
-        "letter_grade": "letter_grade",
-        "numerical_score": "score_only",
-        "pass_fail": "pass_fail",
-        "hybrid": "letter_grade",
-        "other": "report_only",
-        "unknown": "report_only",
-    }
-    return mapping.get(gtype, "report_only")
-
-
-def map_scoring_type(crawl_gs: dict) -> str:
-    gtype = crawl_gs.get("type", "unknown")
-    desc = crawl_gs.get("description", "").lower()
-    if gtype == "letter_grade":
-        return "weighted_deduction"
-    elif gtype == "numerical_score":
-        return "weighted_deduction"
-    elif gtype == "pass_fail":
-        return "pass_fail"
-    elif gtype == "other":
-        if "good" in desc and "satisfactory" in desc:
-            return "weighted_deduction"
-        if "violation" in desc and "count" in desc:
-            return "major_violation_count"
-        return "weighted_deduction"
-    elif gtype == "unknown":
-        return "weighted_deduction"
-    return "weighted_deduction"
-
-
-def build_grading_config(crawl_gs: dict) -> dict:
-    config = {
-        "crawl_type": crawl_gs.get("type"),
-        "description": crawl_gs.get("description"),
-    }
-    if crawl_gs.get("letter_grades"):
-        config["letter_grades"] = crawl_gs["letter_grades"]
-    if crawl_gs.get("grade_thresholds"):
-        config["grade_thresholds"] = crawl_gs["grade_thresholds"]
-    if crawl_gs.get("score_range_min") is not None:
-        config["score_range_min"] = crawl_gs["score_range_min"]
-    if crawl_gs.get("score_range_max") is not None:
-        config["score_range_max"] = crawl_gs["score_range_max"]
-    if crawl_gs.get("passing_threshold") is not None:
-        config["passing_threshold"] = crawl_gs["passing_threshold"]
-    return config
-
-
-def build_violation_weight_map(crawl_gs: dict) -> dict:
-    weights = {}
-    gt = crawl_gs.get("grade_thresholds")
-    if isinstance(gt, dict):
-        weights["grade_thresholds"] = gt
-    desc = crawl_gs.get("description", "")
-    if desc:
-        weights["methodology_description"] = desc
-    return weights if weights else {}
-
-
-def map_fire_ahj_type(crawl_fire: dict) -> str:
-    dept = crawl_fire.get("department_name", "").lower()
-    if "cal fire" in dept or "state fire marshal" in dept:
-        return "cal_fire"
-    elif "county fire" in dept or "county" in dept:
-        return "county_fire"
-    elif "city fire" in dept or "city" in dept:
-        return "city_fire"
-    elif "fire district" in dept or "district" in dept:
-        return "fire_district"
-    elif "federal" in dept or "nps" in dept:
-        return "federal"
-    elif "fire protection" in dept:
-        return "county_fire"
-    else:
-        return "county_fire"
-
-
 # ── Build the PATCH body for one record ─────────────────────────────────
 
 def build_patch_body(record: dict) -> dict:
-    gs = record.get("grading_system", {})
-    insp = record.get("inspection_details", {})
-    fire = record.get("fire_safety_authority", {})
-    reg = record.get("regulatory_framework", {})
-    validation = record.get("_validation", {})
-
-    # Build notes
-    notes_parts = []
-    confidence = validation.get("computed_confidence", record.get("confidence_level", "?"))
-    conf_score = validation.get("computed_confidence_score", "?")
-    notes_parts.append(f"JIE crawl: confidence={confidence}({conf_score})")
-
-    if record.get("needs_manual_verification"):
-        notes_parts.append("NEEDS MANUAL VERIFICATION")
-
-    verify_notes = record.get("verification_notes", "")
-    if verify_notes:
-        notes_parts.append(verify_notes)
-
-    freq = insp.get("frequency", "")
-    if freq:
-        notes_parts.append(f"Inspection freq: {freq[:200]}")
-
-    reinsp = insp.get("reinspection_trigger", "")
-    if reinsp:
-        notes_parts.append(f"Reinspection: {reinsp[:200]}")
-
-    notes = " | ".join(notes_parts)
-
-    # Data sources
-    sources = record.get("data_sources", [])
-    data_source_url = sources[0] if sources else record.get("department_url", "")
-
-    # Scoring methodology
-    scoring_methodology = gs.get("description", "")
-    if reg.get("food_code_basis"):
-        scoring_methodology = f"{reg['food_code_basis']}. {scoring_methodology}"
-
-    # Has local amendments
-    has_amendments = bool(fire.get("ansul_system_requirements"))
+    body = map_record(record)
+    body["data_source_url"] = body["data_source_url"] or None
 
     now_iso = datetime.now(timezone.utc).isoformat()
-
-    body = {
-        "agency_name": record.get("department_name"),
-        "scoring_type": map_scoring_type(gs),
-        "grading_type": map_grading_type(gs),
-        "grading_config": build_grading_config(gs),
-        "scoring_methodology": scoring_methodology[:500],
-        "violation_weight_map": build_violation_weight_map(gs),
-        "fire_ahj_name": fire.get("department_name"),
-        "fire_ahj_type": map_fire_ahj_type(fire),
-        "has_local_amendments": has_amendments,
-        "data_source_type": "jie_crawl",
-        "data_source_url": data_source_url[:500] if data_source_url else None,
-        "notes": notes[:1000],
-        "last_sync_at": now_iso,
-        "updated_at": now_iso,
-    }
+    body["last_sync_at"] = now_iso
+    body["updated_at"] = now_iso
 
     return body
 
 
 # ── Execute PATCH via urllib ────────────────────────────────────────────
 
-def patch_jurisdiction(county: str, state: str, body: dict) -> tuple:
+def patch_jurisdiction(state: str, slug: str, body: dict) -> tuple:
     """
-    PATCH the jurisdiction row matching state + county.
+    PATCH the jurisdiction row matching state + slug (unique index).
     Returns (success: bool, status_code: int, message: str)
     """
     # Build URL with query params to match the row
     params = urllib.parse.urlencode({
         "state": f"eq.{state}",
-        "county": f"eq.{county}",
+        "slug": f"eq.{slug}",
     })
     url = f"{REST_ENDPOINT}?{params}"
 
@@ -206,6 +84,10 @@ def patch_jurisdiction(county: str, state: str, body: dict) -> tuple:
     try:
         with urllib.request.urlopen(req) as resp:
             status = resp.status
+            # count=exact makes PostgREST report matched rows as "*/N"
+            content_range = resp.headers.get("Content-Range", "")
+            if content_range.endswith("/0"):
+                return (False, status, "0 rows matched")
             return (True, status, "OK")
     except urllib.error.HTTPError as e:
         err_body = e.read().decode("utf-8", errors="replace")
@@ -214,49 +96,213 @@ def patch_jurisdiction(county: str, state: str, body: dict) -> tuple:
         return (False, 0, str(e))
 
 
+# ── Streaming input ─────────────────────────────────────────────────────
+
+READ_CHUNK = 64 * 1024
+
+
+def iter_json_array(fh):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+    Only the current element and one read chunk are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = fh.read(READ_CHUNK)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        if pos >= len(buf):
+            return
+
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            pos += 1
+            continue
+
+        if buf[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fh.read(READ_CHUNK)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        # raw_decode can succeed on a truncated number at the buffer edge
+        if end == len(buf) and not eof:
+            chunk = fh.read(READ_CHUNK)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        yield obj
+        pos = end
+
+
+def iter_records(source: str):
+    """
+    Lazily yield validated records from:
+      - a directory of per-record JSON files (files starting with "_" skipped)
+      - a JSONL file, or "-" for JSONL on stdin
+      - a JSON array file such as _validated_combined.json
+    """
+    if source == "-":
+        for line in sys.stdin:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    path = Path(source)
+    if path.is_dir():
+        for f in sorted(path.rglob("*.json")):
+            if f.name.startswith("_"):
+                continue
+            with open(f) as fh:
+                data = json.load(fh)
+            if isinstance(data, dict):
+                yield data
+    elif path.suffix == ".jsonl":
+        with open(path) as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path) as fh:
+            yield from iter_json_array(fh)
+
+
+def count_records(source: str):
+    """
+    Count records the way iter_records() yields them, in constant memory.
+    Returns None for stdin, which can only be read once.
+    """
+    if source == "-":
+        return None
+
+    path = Path(source)
+    if path.is_dir():
+        count = 0
+        for f in path.rglob("*.json"):
+            if f.name.startswith("_"):
+                continue
+            with open(f) as fh:
+                if isinstance(json.load(fh), dict):
+                    count += 1
+        return count
+    if path.suffix == ".jsonl":
+        with open(path) as fh:
+            return sum(1 for line in fh if line.strip())
+    with open(path) as fh:
+        return sum(1 for _ in iter_json_array(fh))
+
+
 # ── Main ────────────────────────────────────────────────────────────────
 
+def push_record(record: dict, key_index: dict) -> tuple:
+    """
+    Build and PATCH one record. Returns (name, state, ok, status, msg);
+    never raises, so a malformed record is counted as a failure.
+    """
+    jname = record.get("jurisdiction_name", "?") if isinstance(record, dict) else "?"
+    state = record.get("state", "CA") if isinstance(record, dict) else "?"
+    try:
+        key = resolve_key(record, key_index)
+        if key is None:
+            return (jname, state, False, 0, "UNMATCHED — no slug in jurisdiction lists")
+
+        state, slug = key
+        body = build_patch_body(record)
+        ok, status, msg = patch_jurisdiction(state, slug, body)
+    except Exception as e:
+        return (jname, state, False, 0, f"{type(e).__name__}: {e}")
+    return (jname, state, ok, status, msg)
+
+
 def main():
-    # Load validated JSON
-    if not VALIDATED_JSON.exists():
-        print(f"ERROR: Cannot find {VALIDATED_JSON}")
+    parser = argparse.ArgumentParser(
+        description="PATCH validated jurisdiction records via PostgREST"
+    )
+    parser.add_argument("--input", default=str(VALIDATED_JSON),
+                        help="Directory, JSONL file, JSON array file, or - for stdin")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Concurrent PATCH requests (default 8)")
+    args = parser.parse_args()
+
+    source = args.input
+    if source != "-" and not Path(source).exists():
+        print(f"ERROR: Cannot find {source}")
         sys.exit(1)
 
-    with open(VALIDATED_JSON) as f:
-        records = json.load(f)
+    total = count_records(source)
+    total_label = str(total) if total is not None else "?"
+    width = len(total_label)
 
-    print(f"Loaded {len(records)} records from validated JSON")
+    print(f"Streaming {total_label} records from {source}")
     print(f"Target: {REST_ENDPOINT}")
     print(f"{'='*70}")
 
+    key_index = build_key_index()
+
     succeeded = 0
     failed = 0
+    done = 0
     failures = []
-
-    for i, record in enumerate(records, 1):
-        jname = record.get("jurisdiction_name", "?")
-        county = jname.replace(" County", "").strip()
-        state = record.get("state", "CA")
-
-        body = build_patch_body(record)
-
-        ok, status, msg = patch_jurisdiction(county, state, body)
-
-        if ok:
-            succeeded += 1
-            print(f"  [{i:2d}/51] OK  {county} County ({state}) -> HTTP {status}")
-        else:
-            failed += 1
-            failures.append((county, status, msg))
-            print(f"  [{i:2d}/51] FAIL {county} County ({state}) -> HTTP {status}: {msg[:200]}")
+    lock = threading.Lock()
+
+    # Bound in-flight requests so memory stays flat while parsing
+    # continues ahead of the network.
+    in_flight = threading.BoundedSemaphore(args.workers * 2)
+
+    def on_done(future):
+        nonlocal succeeded, failed, done
+        in_flight.release()
+        jname, state, ok, status, msg = future.result()
+        with lock:
+            done += 1
+            if ok:
+                succeeded += 1
+                print(f"  [{done:{width}d}/{total_label}] OK  {jname} ({state}) -> HTTP {status}")
+            else:
+                failed += 1
+                failures.append((jname, status, msg))
+                print(f"  [{done:{width}d}/{total_label}] FAIL {jname} ({state}) -> HTTP {status}: {msg[:200]}")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for record in iter_records(source):
+            in_flight.acquire()
+            pool.submit(push_record, record, key_index).add_done_callback(on_done)
 
     print(f"\n{'='*70}")
-    print(f"RESULTS: {succeeded} succeeded, {failed} failed out of {len(records)} total")
+    print(f"RESULTS: {succeeded} succeeded, {failed} failed out of {done} total")
 
     if failures:
-        print(f"\nFailed counties:")
-        for county, status, msg in failures:
-            print(f"  - {county}: HTTP {status} => {msg[:300]}")
+        print(f"\nFailed or unmatched jurisdictions:")
+        for jname, status, msg in failures:
+            print(f"  - {jname}: HTTP {status} => {msg[:300]}")
 
     return 0 if failed == 0 else 1
 
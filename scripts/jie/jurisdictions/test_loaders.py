@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Test the DB loaders (push_to_supabase.py / load_jurisdictions.py)
+against synthetic records. No network or database access.
+"""
+import io
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import push_to_supabase
+from push_to_supabase import iter_json_array, iter_records, count_records, build_patch_body
+from load_jurisdictions import generate_update_sql
+from apply_sql import apply_chunks, split_chunks, chunk_begin_marker, chunk_end_marker
+from bench_load import PostgrestStub, create_sqlite_db, make_bench_record, bench_key_index
+from jurisdiction_keys import build_key_index, resolve_key
+from jurisdiction_mapping import classify_fire_ahj, map_scoring_type
+
+
+def make_record(name="Test County", state="CA"):
+    return {
+        "jurisdiction_name": name,
+        "state": state,
+        "department_name": f"{name} Environmental Health",
+        "grading_system": {"type": "letter_grade", "description": "A/B/C placards"},
+        "fire_safety_authority": {"department_name": f"{name} Fire Department"},
+        "_meta": {"status": "success"},
+    }
+
+
+# ============================================================================
+# TEST CASES
+# ============================================================================
+
+def test_json_array_stream_matches_json_load():
+    """Streaming decode must match json.load at every chunk size."""
+    records = [make_record(f"County {i}") for i in range(25)]
+    records.append({"n": 12345, "s": "bracket ] and , inside"})
+    text = json.dumps(records, indent=2)
+    saved = push_to_supabase.READ_CHUNK
+    try:
+        for chunk in (1, 2, 5, 64, 1 << 16):
+            push_to_supabase.READ_CHUNK = chunk
+            assert list(iter_json_array(io.StringIO(text))) == records, f"chunk={chunk}"
+    finally:
+        push_to_supabase.READ_CHUNK = saved
+    return "PASS"
+
+
+def test_json_array_empty():
+    assert list(iter_json_array(io.StringIO("  [ ]\n"))) == []
+    return "PASS"
+
+
+def test_directory_and_jsonl_sources():
+    """Directories skip _-prefixed files; JSONL skips blank lines; totals are exact."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for i in range(3):
+            (tmp / f"ca_{i}.json").write_text(json.dumps(make_record(f"County {i}")))
+        (tmp / "_combined.json").write_text("[]")
+        (tmp / "ca_list.json").write_text("[]")  # not a record; iter_records skips it
+        jsonl = tmp / "records.jsonl"
+        jsonl.write_text("\n".join(json.dumps(make_record(f"J {i}")) for i in range(4)) + "\n\n")
+
+        assert count_records(str(tmp)) == 3
+        assert [r["jurisdiction_name"] for r in iter_records(str(tmp))] == \
+            ["County 0", "County 1", "County 2"]
+        assert count_records(str(jsonl)) == 4
+        assert len(list(iter_records(str(jsonl)))) == 4
+        array = tmp / "_validated_combined.json"
+        array.write_text(json.dumps([make_record("A"), make_record("B")]))
+        assert count_records(str(array)) == 2 == len(list(iter_records(str(array))))
+    return "PASS"
+
+
+def test_push_record_never_raises():
+    """A record that breaks mapping comes back as a failure tuple, not an exception."""
+    index = bench_key_index(1)
+    bad = make_bench_record(0)
+    bad["grading_system"] = "not a dict"
+    jname, _, ok, status, msg = push_to_supabase.push_record(bad, index)
+    assert jname == bad["jurisdiction_name"] and not ok and status == 0, msg
+    assert "Error" in msg, msg
+    return "PASS"
+
+
+def test_fire_ahj_rule_priority():
+    """Earlier rules win over later ones regardless of where they appear."""
+    assert classify_fire_ahj("City of Clovis Fire District") == "city_fire"
+    assert classify_fire_ahj("Fresno County Fire Protection District") == "county_fire"
+    assert classify_fire_ahj("Fire District 4 / CAL FIRE") == "cal_fire"
+    assert classify_fire_ahj("NPS Structural Fire") == "federal"
+    assert classify_fire_ahj("Fire Protection Authority") == "county_fire"
+    assert classify_fire_ahj("") == "county_fire"
+    return "PASS"
+
+
+def test_scoring_type_other_patterns():
+    assert map_scoring_type({"type": "other", "description": "Violation COUNT based"}) == "major_violation_count"
+    assert map_scoring_type({"type": "other", "description": "Good / Satisfactory / Count violations"}) == "weighted_deduction"
+    assert map_scoring_type({"type": "pass_fail"}) == "pass_fail"
+    return "PASS"
+
+
+def test_sql_and_rest_share_mapping():
+    """Both loaders emit the same mapped values for a record."""
+    rec = make_record("Kern County")
+    body = build_patch_body(rec)
+    sql = generate_update_sql(rec, ("CA", "kern"))
+    assert f"fire_ahj_type = '{body['fire_ahj_type']}'" in sql
+    assert f"grading_type = '{body['grading_type']}'" in sql
+    assert f"scoring_type = '{body['scoring_type']}'" in sql
+    return "PASS"
+
+
+def test_chunked_apply_resumes_after_failure():
+    """A failed chunk stops the run; the next run resumes at that chunk."""
+    parts = []
+    for n in range(1, 5):
+        parts += [chunk_begin_marker(n, 4, 1), "BEGIN;", f"UPDATE t SET n = {n};", "COMMIT;",
+                  chunk_end_marker(n, 4), ""]
+    parts.append("SELECT 1;")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sql_path = Path(tmp) / "update.sql"
+        sql_path.write_text("\n".join(parts))
+        assert len(split_chunks(sql_path.read_text())) == 4
+
+        executed = []
+
+        def flaky(sql):
+            if "n = 3" in sql and not executed.count("failed"):
+                executed.append("failed")
+                raise RuntimeError("connection reset")
+            executed.append(sql)
+
+        applied, skipped, failed = apply_chunks(sql_path, flaky)
+        assert (applied, skipped, failed) == (2, 0, 3)
+
+        applied, skipped, failed = apply_chunks(sql_path, flaky)
+        assert (applied, skipped, failed) == (2, 2, None)
+        assert [s for s in executed if s != "failed"] == \
+            [c.sql for c in split_chunks(sql_path.read_text())]
+
+        # Editing the SQL invalidates recorded progress
+        sql_path.write_text(sql_path.read_text().replace("n = 4", "n = 40"))
+        applied, skipped, failed = apply_chunks(sql_path, lambda sql: None)
+        assert (applied, skipped, failed) == (4, 0, None)
+    return "PASS"
+
+
+def test_all_unmatched_emits_valid_sql():
+    """With no matched keys the verification query is left out, not emitted as IN ()."""
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "nowhere.json").write_text(json.dumps(make_record("Nowhere County", state="ZZ")))
+        out = Path(tmp) / "update.sql"
+        proc = subprocess.run([sys.executable, str(Path(__file__).parent / "load_jurisdictions.py"),
+                               "--input", tmp, "--output", str(out)], capture_output=True, text=True)
+        assert proc.returncode == 0, proc.stderr
+        sql = out.read_text()
+        assert "-- UNMATCHED (no slug): Nowhere County (ZZ)" in sql
+        assert "IN ()" not in sql and "SELECT" not in sql
+    return "PASS"
+
+
+def test_key_resolution():
+    """Cities, county-less names and special slugs resolve; unknowns don't."""
+    index = build_key_index()
+    assert resolve_key(make_record("City of Berkeley"), index) == ("CA", "berkeley")
+    assert resolve_key(make_record("San Francisco"), index) == ("CA", "san-francisco")
+    assert resolve_key(make_record("los angeles county"), index) == ("CA", "la-county")
+    assert resolve_key(make_record("Nevada County"), index) == ("CA", "nevada-ca")
+    assert resolve_key(make_record("National Park Service — California"), index) is None
+    assert resolve_key(make_record("Alameda County", state="NV"), index) is None
+    return "PASS"
+
+
+def test_ambiguous_alias_is_dropped():
+    """A bare name shared by a county and a city must not resolve to either."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "xx_jurisdictions.json"
+        path.write_text(json.dumps([
+            {"name": "Carson County", "state": "XX", "slug": "carson-county"},
+            {"name": "City of Carson", "state": "XX", "slug": "carson-city"},
+        ]))
+        index = build_key_index([path])
+    assert resolve_key(make_record("Carson", state="XX"), index) is None
+    assert resolve_key(make_record("City of Carson", state="XX"), index) == ("XX", "carson-city")
+    return "PASS"
+
+
+def test_exact_name_beats_alias_in_either_order():
+    """An exact name resolves even when a later entry's alias collides with it."""
+    entries = [
+        {"name": "San Francisco", "state": "XX", "slug": "sf-city"},
+        {"name": "San Francisco County", "state": "XX", "slug": "sf-county"},
+    ]
+    for order in (entries, entries[::-1]):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "xx_jurisdictions.json"
+            path.write_text(json.dumps(order))
+            index = build_key_index([path])
+        assert resolve_key(make_record("San Francisco", state="XX"), index) == ("XX", "sf-city"), order
+        assert resolve_key(make_record("San Francisco County", state="XX"), index) == ("XX", "sf-county"), order
+    return "PASS"
+
+
+def test_patch_reports_zero_row_match():
+    """Against the PostgREST stand-in, a key with no row is a failure, not OK."""
+    conn = create_sqlite_db(2)
+    index = bench_key_index(3)  # index knows a third slug the table lacks
+    with PostgrestStub(conn) as stub:
+        saved = push_to_supabase.REST_ENDPOINT
+        push_to_supabase.REST_ENDPOINT = stub.endpoint
+        try:
+            ok_result = push_to_supabase.push_record(make_bench_record(1), index)
+            missing = push_to_supabase.push_record(make_bench_record(2), index)
+        finally:
+            push_to_supabase.REST_ENDPOINT = saved
+    assert ok_result[2], ok_result
+    assert not missing[2] and "0 rows" in missing[4], missing
+    row = conn.execute("SELECT grading_type, fire_ahj_type FROM jurisdictions "
+                       "WHERE slug = 'bench-000001'").fetchone()
+    assert row == ("score_only", "county_fire"), row
+    return "PASS"
+
+
+# ============================================================================
+# RUN ALL TESTS
+# ============================================================================
+
+def run_tests():
+    tests = [
+        test_json_array_stream_matches_json_load,
+        test_json_array_empty,
+        test_directory_and_jsonl_sources,
+        test_push_record_never_raises,
+        test_fire_ahj_rule_priority,
+        test_scoring_type_other_patterns,
+        test_sql_and_rest_share_mapping,
+        test_chunked_apply_resumes_after_failure,
+        test_all_unmatched_emits_valid_sql,
+        test_key_resolution,
+        test_ambiguous_alias_is_dropped,
+        test_exact_name_beats_alias_in_either_order,
+        test_patch_reports_zero_row_match,
+    ]
+
+    passed = 0
+    failed = 0
+    for test_fn in tests:
+        name = test_fn.__name__
+        try:
+            test_fn()
+            print(f"  ✅ {name}")
+            passed += 1
+        except AssertionError as e:
+            print(f"  ❌ {name}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  💥 {name}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'='*50}")
+    print(f"  {passed} passed, {failed} failed, {len(tests)} total")
+    print(f"{'='*50}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Running loader tests...\n")
+    ok = run_tests()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,184 @@
+"""
+PROD catalog snapshot loader.
+
+A snapshot is one JSON file (written by catalog_snapshot.py) holding the
+structured schema: tables with RLS flags, columns with types, indexes and
+constraints with their tables, policies, function signatures, views, enum
+labels, triggers, and the schema_migrations rows. Catalog builds keyed
+lookups from it, both for the schema model diff (keys()) and for scoped
+questions like "which table is this index on" or "what labels does this
+enum have". fingerprints() hashes function, view, policy and trigger
+bodies the same way sql_lexer does for migrations, for drift detection.
+
+Object names follow sql_lexer: lowercased, unqualified for public, and
+schema-qualified otherwise.
+
+Catalog.from_legacy_dir() reads the older set of flat text files
+(prod_tables.txt, prod_policies.txt in name@table form, ...) for
+environments that haven't produced a snapshot yet. Those files carry no
+constraint tables and no enum labels, so keys() leaves those kinds out and
+ops on them stay 'unclear'.
+"""
+import json
+import os
+from collections import defaultdict
+
+from sql_lexer import fingerprint_sql, fingerprint_tokens, policy_fingerprint, tokenize
+
+SNAPSHOT_FORMAT = 1
+
+
+def _lower(name):
+    return name.lower() if name else name
+
+
+class Catalog:
+    def __init__(self, data, source=None):
+        self.source = source
+        self.structured = data.get('format') is not None
+
+        self.migrations = {m['version']: m.get('name') for m in data.get('migrations', [])}
+        self.tables = {_lower(t['name']): t for t in data.get('tables', [])}
+        self.columns = {(_lower(c['table']), _lower(c['name'])): c for c in data.get('columns', [])}
+        self.indexes = {_lower(i['name']): i for i in data.get('indexes', [])}
+        self.constraints = {(_lower(c.get('table')), _lower(c['name'])): c
+                            for c in data.get('constraints', [])}
+        self.policies = {(_lower(p['table']), _lower(p['name'])): p for p in data.get('policies', [])}
+        self.functions = defaultdict(list)
+        for fn in data.get('functions', []):
+            self.functions[_lower(fn['name'])].append(fn)
+        self.views = {_lower(v['name']): v for v in data.get('views', [])}
+        self.enums = {_lower(e['name']): e.get('labels') for e in data.get('enums', [])}
+        self.triggers = {(_lower(t['table']), _lower(t['name'])): t for t in data.get('triggers', [])}
+
+        self._indexes_on = defaultdict(list)
+        for idx in self.indexes.values():
+            if idx.get('table'):
+                self._indexes_on[_lower(idx['table'])].append(idx)
+
+    # ── Loading ──
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        fmt = data.get('format')
+        if fmt != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path}: unsupported catalog snapshot format {fmt!r} (expected {SNAPSHOT_FORMAT})")
+        return cls(data, source=path)
+
+    @classmethod
+    def from_legacy_dir(cls, tmp_dir):
+        """Build a catalog from the flat prod_*.txt / remote_versions.txt files."""
+        def lines(name):
+            with open(os.path.join(tmp_dir, name), 'r') as f:
+                return sorted(set(line.strip() for line in f if line.strip()))
+
+        def pairs(name):
+            return [line.split('@', 1) for line in lines(name) if '@' in line]
+
+        rls = set(lines('prod_rls_enabled.txt'))
+        data = {
+            'migrations': [{'version': v} for v in lines('remote_versions.txt')],
+            'tables': [{'name': t, 'rls_enabled': t in rls} for t in lines('prod_tables.txt')],
+            'columns': [{'table': tc.split('.', 1)[0], 'name': tc.split('.', 1)[1]}
+                        for tc in lines('prod_columns.txt') if '.' in tc],
+            'indexes': [{'name': i} for i in lines('prod_indexes.txt')],
+            'constraints': [{'name': c} for c in lines('prod_constraints.txt')],
+            'policies': [{'name': n, 'table': t} for n, t in pairs('prod_policies.txt')],
+            'functions': [{'name': fn} for fn in lines('prod_functions.txt')],
+            'views': [{'name': v} for v in lines('prod_views.txt')],
+            'enums': [{'name': e} for e in lines('prod_enums.txt')],
+            'triggers': [{'name': n, 'table': t} for n, t in pairs('prod_triggers.txt')],
+        }
+        return cls(data, source=tmp_dir)
+
+    # ── Keys for schema_model.SchemaModel.diff ──
+
+    @property
+    def remote_versions(self):
+        return set(self.migrations)
+
+    def keys(self):
+        """kind -> set of keys, in schema_model's key format."""
+        keys = {
+            'tables': set(self.tables),
+            'columns': {f"{t}.{c}" for t, c in self.columns},
+            'indexes': set(self.indexes),
+            'policies': {f"{t}.{n}" for t, n in self.policies},
+            'functions': set(self.functions),
+            'views': set(self.views),
+            'enums': set(self.enums),
+            'triggers': {f"{t}.{n}" for t, n in self.triggers},
+            'rls_enabled': {name for name, t in self.tables.items() if t.get('rls_enabled')},
+        }
+        if self.structured:
+            keys['constraints'] = {f"{t}.{n}" for t, n in self.constraints}
+            keys['enum_values'] = {f"{e}.{label.lower()}"
+                                   for e, labels in self.enums.items() for label in labels or []}
+        return keys
+
+    # ── Scoped lookups ──
+
+    def has_table(self, table):
+        return _lower(table) in self.tables
+
+    def column(self, table, column):
+        """Column row ({'table', 'name', 'type', 'nullable', 'default'}) or None."""
+        return self.columns.get((_lower(table), _lower(column)))
+
+    def index(self, name):
+        return self.indexes.get(_lower(name))
+
+    def indexes_on(self, table):
+        return self._indexes_on.get(_lower(table), [])
+
+    def constraint(self, table, name):
+        return self.constraints.get((_lower(table), _lower(name)))
+
+    def policies_on(self, table):
+        table = _lower(table)
+        return [p for (t, _), p in self.policies.items() if t == table]
+
+    def enum_labels(self, name):
+        """Labels in sort order, or None if unknown (legacy catalog / no such enum)."""
+        return self.enums.get(_lower(name))
+
+    def function_signatures(self, name):
+        return [fn.get('signature') for fn in self.functions.get(_lower(name), [])]
+
+    # ── Body fingerprints ──
+
+    def fingerprints(self):
+        """kind -> {key: set of body fingerprints}, for objects whose body is known.
+
+        Functions can have several overloads, hence a set per name. Legacy
+        catalogs have no bodies and yield empty dicts.
+        """
+        fps = {'functions': defaultdict(set), 'views': {}, 'policies': {}, 'triggers': {}}
+        for name, overloads in self.functions.items():
+            for fn in overloads:
+                if fn.get('body') is not None:
+                    fps['functions'][name].add(fingerprint_sql(fn['body']))
+        for name, view in self.views.items():
+            if view.get('definition') is not None:
+                fps['views'][name] = {fingerprint_sql(view['definition'])}
+        for (table, name), p in self.policies.items():
+            if 'qual' in p or 'with_check' in p:
+                qual = list(tokenize(p['qual'])) if p.get('qual') is not None else None
+                check = list(tokenize(p['with_check'])) if p.get('with_check') is not None else None
+                fps['policies'][f"{table}.{name}"] = {policy_fingerprint(p.get('cmd'), qual, check)}
+        for (table, name), t in self.triggers.items():
+            if t.get('definition'):
+                fps['triggers'][f"{table}.{name}"] = {trigger_fingerprint(t['definition'])}
+        fps['functions'] = dict(fps['functions'])
+        return fps
+
+
+def trigger_fingerprint(definition):
+    """Fingerprint a pg_get_triggerdef() string from just after the trigger name."""
+    toks = list(tokenize(definition))
+    for i, t in enumerate(toks):
+        if t.upper == 'TRIGGER':
+            return fingerprint_tokens(toks[i + 2:])
+    return fingerprint_tokens(toks)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Write a catalog snapshot (see catalog.py) from pg_catalog through psql.
+
+Works against any Postgres: PROD via its connection string, or a local
+database a migration set was replayed into. One query builds the whole
+snapshot as JSON server-side; schema_migrations rows are added when the
+supabase_migrations schema exists.
+
+Usage:
+    python scripts/migration_triage/catalog_snapshot.py --db-url "$DATABASE_URL"
+    python scripts/migration_triage/catalog_snapshot.py --schemas public,storage --out prod_catalog.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from catalog import SNAPSHOT_FORMAT  # noqa: E402
+from parse_cache import DEFAULT_CACHE_DIR  # noqa: E402
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(DEFAULT_CACHE_DIR, 'catalog_snapshot.json')
+
+# Relation and function names are reported the way sql_lexer names them:
+# bare for public, schema-qualified otherwise.
+SNAPSHOT_SQL = r"""
+WITH rel AS (
+  SELECT c.oid, c.relkind, c.relrowsecurity,
+         CASE WHEN n.nspname = 'public' THEN c.relname ELSE n.nspname || '.' || c.relname END AS qname
+  FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+  WHERE n.nspname = ANY (string_to_array(:'schemas', ','))
+)
+SELECT json_build_object(
+  'tables', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', qname, 'rls_enabled', relrowsecurity) ORDER BY qname), '[]')
+    FROM rel WHERE relkind IN ('r', 'p')),
+  'columns', (
+    SELECT coalesce(json_agg(json_build_object(
+             'table', r.qname, 'name', a.attname,
+             'type', format_type(a.atttypid, a.atttypmod),
+             'nullable', NOT a.attnotnull,
+             'default', pg_get_expr(d.adbin, d.adrelid)) ORDER BY r.qname, a.attnum), '[]')
+    FROM rel r
+    JOIN pg_attribute a ON a.attrelid = r.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE r.relkind IN ('r', 'p')),
+  'indexes', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', ic.qname, 'table', t.qname,
+             'unique', i.indisunique, 'primary', i.indisprimary,
+             'columns', (SELECT coalesce(json_agg(a.attname ORDER BY k.ord), '[]')
+                         FROM unnest(i.indkey::int2[]) WITH ORDINALITY k(attnum, ord)
+                         JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum),
+             'definition', pg_get_indexdef(i.indexrelid)) ORDER BY ic.qname), '[]')
+    FROM pg_index i
+    JOIN rel ic ON ic.oid = i.indexrelid
+    JOIN rel t ON t.oid = i.indrelid),
+  'constraints', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', co.conname, 'table', t.qname, 'type', co.contype,
+             'columns', (SELECT coalesce(json_agg(a.attname ORDER BY k.ord), '[]')
+                         FROM unnest(co.conkey) WITH ORDINALITY k(attnum, ord)
+                         JOIN pg_attribute a ON a.attrelid = co.conrelid AND a.attnum = k.attnum),
+             'definition', pg_get_constraintdef(co.oid)) ORDER BY t.qname, co.conname), '[]')
+    FROM pg_constraint co JOIN rel t ON t.oid = co.conrelid),
+  'policies', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', p.polname, 'table', t.qname,
+             'cmd', CASE p.polcmd WHEN 'r' THEN 'SELECT' WHEN 'a' THEN 'INSERT'
+                                  WHEN 'w' THEN 'UPDATE' WHEN 'd' THEN 'DELETE' ELSE 'ALL' END,
+             'permissive', p.polpermissive,
+             'roles', (SELECT coalesce(json_agg(CASE WHEN r.oid = 0 THEN 'public' ELSE ro.rolname END), '[]')
+                       FROM unnest(p.polroles) r(oid) LEFT JOIN pg_roles ro ON ro.oid = r.oid),
+             'qual', pg_get_expr(p.polqual, p.polrelid),
+             'with_check', pg_get_expr(p.polwithcheck, p.polrelid)) ORDER BY t.qname, p.polname), '[]')
+    FROM pg_policy p JOIN rel t ON t.oid = p.polrelid),
+  'functions', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', CASE WHEN n.nspname = 'public' THEN p.proname ELSE n.nspname || '.' || p.proname END,
+             'signature', pg_get_function_identity_arguments(p.oid),
+             'returns', pg_get_function_result(p.oid),
+             'volatility', p.provolatile,
+             'security_definer', p.prosecdef,
+             'language', l.lanname,
+             'body', p.prosrc) ORDER BY n.nspname, p.proname), '[]')
+    FROM pg_proc p
+    JOIN pg_namespace n ON n.oid = p.pronamespace
+    JOIN pg_language l ON l.oid = p.prolang
+    WHERE n.nspname = ANY (string_to_array(:'schemas', ','))),
+  'views', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', qname, 'materialized', relkind = 'm',
+             'definition', pg_get_viewdef(oid)) ORDER BY qname), '[]')
+    FROM rel WHERE relkind IN ('v', 'm')),
+  'enums', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', CASE WHEN n.nspname = 'public' THEN t.typname ELSE n.nspname || '.' || t.typname END,
+             'labels', (SELECT json_agg(e.enumlabel ORDER BY e.enumsortorder)
+                        FROM pg_enum e WHERE e.enumtypid = t.oid)) ORDER BY t.typname), '[]')
+    FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace
+    WHERE t.typtype = 'e' AND n.nspname = ANY (string_to_array(:'schemas', ','))),
+  'triggers', (
+    SELECT coalesce(json_agg(json_build_object(
+             'name', tg.tgname, 'table', t.qname,
+             'function', tg.tgfoid::regproc::text,
+             'definition', pg_get_triggerdef(tg.oid)) ORDER BY t.qname, tg.tgname), '[]')
+    FROM pg_trigger tg JOIN rel t ON t.oid = tg.tgrelid
+    WHERE NOT tg.tgisinternal)
+);
+"""
+
+MIGRATIONS_EXISTS_SQL = "SELECT to_regclass('supabase_migrations.schema_migrations') IS NOT NULL;"
+
+MIGRATIONS_SQL = """
+SELECT coalesce(json_agg(json_build_object('version', version, 'name', name) ORDER BY version), '[]')
+FROM supabase_migrations.schema_migrations;
+"""
+
+
+def run_psql(db_url, sql, variables=None):
+    """Run one query through psql and return its single unaligned value."""
+    cmd = ["psql", db_url, "-X", "-q", "-A", "-t", "-v", "ON_ERROR_STOP=1"]
+    for name, value in (variables or {}).items():
+        cmd += ["-v", f"{name}={value}"]
+    proc = subprocess.run(cmd + ["-f", "-"], input=sql, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"psql exited {proc.returncode}")
+    return proc.stdout.strip()
+
+
+def build_snapshot(db_url, schemas=('public',)):
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'schemas': list(schemas),
+    }
+    snapshot.update(json.loads(run_psql(db_url, SNAPSHOT_SQL, {'schemas': ','.join(schemas)})))
+    if run_psql(db_url, MIGRATIONS_EXISTS_SQL) == 't':
+        snapshot['migrations'] = json.loads(run_psql(db_url, MIGRATIONS_SQL))
+    else:
+        snapshot['migrations'] = []
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a catalog snapshot from pg_catalog')
+    parser.add_argument('--db-url', default=os.environ.get('DATABASE_URL'),
+                        help='Postgres connection string (default: $DATABASE_URL)')
+    parser.add_argument('--schemas', default='public',
+                        help='Comma-separated schemas to include (default: public)')
+    parser.add_argument('--out', default=DEFAULT_SNAPSHOT_PATH,
+                        help=f'Output path (default: {DEFAULT_SNAPSHOT_PATH})')
+    args = parser.parse_args()
+
+    if not args.db_url:
+        parser.error('--db-url or $DATABASE_URL is required')
+
+    schemas = [s.strip() for s in args.schemas.split(',') if s.strip()]
+    snapshot = build_snapshot(args.db_url, schemas)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, indent=1)
+        f.write('\n')
+
+    counts = ', '.join(f"{len(snapshot[k])} {k}" for k in
+                       ('tables', 'columns', 'indexes', 'constraints', 'policies',
+                        'functions', 'enums', 'triggers', 'migrations'))
+    print(f"Wrote {args.out}: {counts}")
+
+
+if __name__ == '__main__':
+    main()
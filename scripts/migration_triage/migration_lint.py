@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Lint supabase/migrations for DDL that is lock- or scan-heavy on large tables.
+
+Rules:
+  index-not-concurrent  CREATE INDEX without CONCURRENTLY: the build holds a
+                        SHARE lock, blocking every write to the table
+  column-type-rewrite   ALTER COLUMN ... TYPE that isn't binary-coercible:
+                        ACCESS EXCLUSIVE lock while the table and its
+                        indexes are rewritten
+  volatile-default      ADD COLUMN with a DEFAULT calling a volatile
+                        function: every existing row is rewritten (stable
+                        defaults like now() are metadata-only since PG 11)
+  fk-without-index      foreign key whose columns don't lead any index on
+                        the referencing table: each delete/update of a
+                        referenced row scans it
+  policy-volatile-call  RLS policy calling a VOLATILE function: re-run for
+                        every row the policy filters
+
+The first three skip tables the same migration created, since those are
+empty. fk-without-index is judged on the final state (every migration
+replayed, plus PROD indexes from a structured catalog snapshot) and
+reported at the statement that declared the key. Function volatility comes
+from the last CREATE FUNCTION in the migrations, then the catalog.
+
+Each finding carries the migration file, statement offset and line.
+
+Usage:
+    python scripts/migration_triage/migration_lint.py
+    python scripts/migration_triage/migration_lint.py --since 20260601000000 --rule fk-without-index
+    python scripts/migration_triage/migration_lint.py --json lint.json
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from catalog import Catalog  # noqa: E402
+from catalog_snapshot import DEFAULT_SNAPSHOT_PATH  # noqa: E402
+from object_index import MIGRATIONS_DIR, discover  # noqa: E402
+from parse_cache import DEFAULT_CACHE_DIR, parse_files  # noqa: E402
+from sql_lexer import tokenize  # noqa: E402
+
+RULES = ('index-not-concurrent', 'column-type-rewrite', 'volatile-default',
+         'fk-without-index', 'policy-volatile-call')
+
+# Built-in volatile functions that show up in column defaults
+BUILTIN_VOLATILE = frozenset((
+    'random', 'gen_random_uuid', 'uuid_generate_v1', 'uuid_generate_v4', 'clock_timestamp',
+    'timeofday', 'nextval', 'txid_current',
+))
+
+# Keywords that take a parenthesized operand but aren't function calls
+NOT_CALLS = frozenset(('in', 'exists', 'and', 'or', 'not', 'any', 'all', 'some', 'select', 'values', 'array', 'as'))
+
+# pg_proc.provolatile codes as snapshot rows carry them
+_VOLATILITY_CODES = {'v': 'VOLATILE', 's': 'STABLE', 'i': 'IMMUTABLE'}
+
+
+def function_calls(sql):
+    """Names called in an SQL expression (`name(` / `schema.name(`), lowercased, in order."""
+    toks = list(tokenize(sql or ''))
+    calls = []
+    for k, t in enumerate(toks):
+        if t.kind == 'op' and t.value == '(' and k and toks[k - 1].kind in ('word', 'qident'):
+            parts = [toks[k - 1].value]
+            j = k - 2
+            while j >= 1 and toks[j].kind == 'op' and toks[j].value == '.' \
+                    and toks[j - 1].kind in ('word', 'qident'):
+                parts.insert(0, toks[j - 1].value)
+                j -= 2
+            if parts[0].lower() == 'public' and len(parts) > 1:
+                parts = parts[1:]
+            if len(parts) > 1 or parts[0].lower() not in NOT_CALLS:
+                calls.append('.'.join(parts).lower())
+    return calls
+
+
+def _base_type(sql_type):
+    return ''.join((sql_type or '').lower().split()).replace('charactervarying', 'varchar')
+
+
+def rewrite_free(old, new):
+    """Whether changing a column from `old` to `new` skips the table rewrite."""
+    old, new = _base_type(old), _base_type(new)
+    if not old:
+        return False
+    if old == new:
+        return True
+    if old.startswith('varchar') and new in ('text', 'varchar'):
+        return True
+    if old.startswith('varchar(') and new.startswith('varchar('):
+        try:
+            return int(new[8:-1]) >= int(old[8:-1])
+        except ValueError:
+            return False
+    return False
+
+
+class _State:
+    """What the lint needs to know about the schema as migrations are replayed."""
+
+    def __init__(self, catalog=None):
+        self.volatility = {}
+        self.column_types = {}
+        self.indexes = {}                  # name -> (table, [columns])
+        self.keys = defaultdict(list)      # table -> [[columns]] backed by PK / UNIQUE indexes
+        self.foreign_keys = {}             # (table, name) -> (columns, finding site)
+        if catalog is not None:
+            for name, overloads in catalog.functions.items():
+                codes = {_VOLATILITY_CODES.get(fn.get('volatility')) for fn in overloads} - {None}
+                if codes:
+                    # any volatile overload makes the name suspect
+                    self.volatility[name] = 'VOLATILE' if 'VOLATILE' in codes else codes.pop()
+            for (table, column), row in catalog.columns.items():
+                if row.get('type'):
+                    self.column_types[(table, column)] = row['type']
+            for name, idx in catalog.indexes.items():
+                if idx.get('table') and idx.get('columns'):
+                    self.indexes[name] = (idx['table'].lower(), [c.lower() for c in idx['columns']])
+
+    def is_volatile(self, name):
+        if name in self.volatility:
+            return self.volatility[name] == 'VOLATILE'
+        schema, _, base = name.rpartition('.')
+        return base in BUILTIN_VOLATILE and schema in ('', 'extensions', 'pg_catalog')
+
+    def drop_table(self, table):
+        self.keys.pop(table, None)
+        for name in [n for n, (t, _) in self.indexes.items() if t == table]:
+            del self.indexes[name]
+        for key in [k for k in self.foreign_keys if k[0] == table]:
+            del self.foreign_keys[key]
+        for key in [k for k in self.column_types if k[0] == table]:
+            del self.column_types[key]
+
+    def covered(self, table, columns):
+        """Whether some index on `table` has `columns` as its leading columns."""
+        want = set(columns)
+        candidates = self.keys.get(table, []) + [cols for t, cols in self.indexes.values() if t == table]
+        return any(set(cols[:len(columns)]) == want for cols in candidates)
+
+
+def _finding(rule, version, file, content, op, message):
+    offset = op.get('offset', 0)
+    return {
+        'rule': rule,
+        'version': version,
+        'file': file,
+        'offset': offset,
+        'line': content.count('\n', 0, offset) + 1 if content else None,
+        'message': message,
+    }
+
+
+def lint(migrations, catalog=None, versions=None):
+    """Lint (version, file, content, ops) tuples, replayed in the order given.
+
+    Findings are only reported for `versions` (default: all), but every
+    migration feeds the schema state. Returns findings in version/offset order.
+    """
+    return _replay(migrations, catalog, versions)[1]
+
+
+def schema_state(migrations, catalog=None):
+    """Final column types, indexes, keys and function volatility after replaying the migrations."""
+    return _replay(migrations, catalog, versions=())[0]
+
+
+def _replay(migrations, catalog, versions):
+    migrations = list(migrations)
+    state = _State(catalog)
+
+    # Final function volatility first: a policy is judged by what its
+    # function ends up as, not what it was when the policy was written
+    for _, _, _, ops in migrations:
+        for op in ops:
+            if op['type'] == 'CREATE_FUNCTION':
+                state.volatility[op['args'][0].lower()] = (op.get('detail') or {}).get('volatility', 'VOLATILE')
+
+    findings = []
+    for version, file, content, ops in migrations:
+        report = versions is None or version in versions
+        created_here = set()
+        for op in ops:
+            op_type = op['type']
+            args = [a.lower() for a in op['args']]
+            detail = op.get('detail') or {}
+
+            if op_type == 'CREATE_TABLE':
+                table = args[0]
+                state.drop_table(table)
+                created_here.add(table)
+                for col, sql_type in (detail.get('types') or {}).items():
+                    state.column_types[(table, col)] = sql_type
+                state.keys[table] = [cols for cols in detail.get('keys', []) if all(cols)]
+                for cols in detail.get('foreign_keys', []):
+                    name = f"{table.split('.')[-1]}_{'_'.join(cols)}_fkey"
+                    state.foreign_keys[(table, name)] = (cols, (version, file, content, op))
+
+            elif op_type == 'DROP_TABLE':
+                state.drop_table(args[0])
+
+            elif op_type == 'RENAME_TABLE' and len(args) > 1:
+                old, new = args
+                for key, (cols, site) in list(state.foreign_keys.items()):
+                    if key[0] == old:
+                        state.foreign_keys[(new, key[1])] = (cols, site)
+                        del state.foreign_keys[key]
+                if old in state.keys:
+                    state.keys[new] = state.keys.pop(old)
+                for name, (t, cols) in list(state.indexes.items()):
+                    if t == old:
+                        state.indexes[name] = (new, cols)
+
+            elif op_type == 'CREATE_INDEX':
+                name, table = args[0], args[1]
+                state.indexes[name] = (table, [c for c in detail.get('columns', []) if c])
+                if report and not detail.get('concurrently') and table not in created_here:
+                    findings.append(_finding(
+                        'index-not-concurrent', version, file, content, op,
+                        f"CREATE INDEX {name} on {table} without CONCURRENTLY blocks writes for the whole build"))
+
+            elif op_type == 'DROP_INDEX':
+                state.indexes.pop(args[0], None)
+
+            elif op_type == 'ADD_COLUMN':
+                table, col = args[0], args[1]
+                state.column_types[(table, col)] = detail.get('type')
+                default = detail.get('default')
+                volatile = [fn for fn in function_calls(default) if state.is_volatile(fn)]
+                if report and volatile and table not in created_here:
+                    findings.append(_finding(
+                        'volatile-default', version, file, content, op,
+                        f"{table}.{col} DEFAULT {default} calls volatile {', '.join(volatile)}: "
+                        "rewrites every existing row under ACCESS EXCLUSIVE"))
+                if detail.get('key'):
+                    state.keys[table].append([col])
+                if detail.get('references'):
+                    name = f"{table.split('.')[-1]}_{col}_fkey"
+                    state.foreign_keys[(table, name)] = ([col], (version, file, content, op))
+
+            elif op_type == 'ALTER_COLUMN' and detail.get('action') == 'type':
+                table, col = args[0], args[1]
+                old = state.column_types.get((table, col))
+                new = detail.get('type')
+                if report and table not in created_here and not rewrite_free(old, new):
+                    was = f" from {old}" if old else ""
+                    findings.append(_finding(
+                        'column-type-rewrite', version, file, content, op,
+                        f"{table}.{col} TYPE{was} to {new} rewrites the table and its indexes "
+                        "under ACCESS EXCLUSIVE"))
+                state.column_types[(table, col)] = new
+
+            elif op_type == 'DROP_COLUMN':
+                table, col = args[0], args[1]
+                state.column_types.pop((table, col), None)
+                for key, (cols, _) in list(state.foreign_keys.items()):
+                    if key[0] == table and col in cols:
+                        del state.foreign_keys[key]
+                # Postgres drops indexes that include the column
+                for name, (t, cols) in list(state.indexes.items()):
+                    if t == table and col in cols:
+                        del state.indexes[name]
+                state.keys[table] = [cols for cols in state.keys.get(table, []) if col not in cols]
+
+            elif op_type == 'ADD_CONSTRAINT':
+                table, name = args[0], args[1]
+                if detail.get('key'):
+                    state.keys[table].append(detail['key'])
+                if detail.get('foreign_key'):
+                    state.foreign_keys[(table, name)] = (detail['foreign_key'], (version, file, content, op))
+
+            elif op_type == 'DROP_CONSTRAINT':
+                state.foreign_keys.pop((args[0], args[1]), None)
+
+            elif op_type == 'CREATE_POLICY' and report:
+                name, table = args[0], args[1]
+                calls = function_calls(detail.get('using')) + function_calls(detail.get('with_check'))
+                volatile = sorted({fn for fn in calls if state.is_volatile(fn)})
+                if volatile:
+                    findings.append(_finding(
+                        'policy-volatile-call', version, file, content, op,
+                        f"policy \"{name}\" on {table} calls VOLATILE {', '.join(volatile)} "
+                        "once per row; mark it STABLE if it only reads"))
+
+    for (table, _), (cols, site) in state.foreign_keys.items():
+        version, file, content, op = site
+        if (versions is None or version in versions) and all(cols) and not state.covered(table, cols):
+            findings.append(_finding(
+                'fk-without-index', version, file, content, op,
+                f"foreign key {table} ({', '.join(cols)}) has no index leading with those columns: "
+                "deletes on the referenced table scan it"))
+
+    findings.sort(key=lambda f: (f['version'], f['offset'], f['rule']))
+    return state, findings
+
+
+def format_finding(f):
+    return f"{f['file']}:{f['line']} (offset {f['offset']}) [{f['rule']}] {f['message']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag lock- and scan-heavy DDL in migrations')
+    parser.add_argument('--migrations-dir', default=MIGRATIONS_DIR)
+    parser.add_argument('--catalog', default=None,
+                        help=f'Catalog snapshot for PROD indexes and function volatility '
+                             f'(default: {DEFAULT_SNAPSHOT_PATH} if present)')
+    parser.add_argument('--since', help='Only report migrations at or after this version')
+    parser.add_argument('--rule', action='append', choices=RULES, help='Only these rules (repeatable)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--json', metavar='PATH', help='Write findings as JSON')
+    args = parser.parse_args()
+
+    catalog_path = args.catalog or (DEFAULT_SNAPSHOT_PATH if os.path.exists(DEFAULT_SNAPSHOT_PATH) else None)
+    catalog = Catalog.load(catalog_path) if catalog_path else None
+
+    local_map = discover(args.migrations_dir)
+    parsed, _ = parse_files([local_map[v] for v in sorted(local_map)], cache_dir=args.cache_dir)
+    migrations = [(v, os.path.basename(local_map[v]), parsed[local_map[v]]['content'], parsed[local_map[v]]['ops'])
+                  for v in sorted(local_map) if 'error' not in parsed[local_map[v]]]
+    versions = {v for v in local_map if v >= args.since} if args.since else None
+
+    findings = lint(migrations, catalog, versions)
+    if args.rule:
+        findings = [f for f in findings if f['rule'] in args.rule]
+    for f in findings:
+        print(format_finding(f))
+
+    counts = defaultdict(int)
+    for f in findings:
+        counts[f['rule']] += 1
+    print(f"{len(findings)} finding(s): " + ', '.join(f"{counts[r]} {r}" for r in RULES if counts[r]),
+          file=sys.stderr)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fh:
+            json.dump(findings, fh, indent=1)
+            fh.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Object -> migration index for supabase/migrations.
+
+Answers "which migrations touched table X / policy Y / function Z, in what
+order" without grepping the SQL. Every op extracted by sql_lexer is indexed
+under the objects it names (the object it writes, plus the table it acts
+on), with the migration version, op type, statement offset and line.
+
+The index is a sqlite file updated incrementally: files whose size and
+mtime are unchanged are skipped without reading, files whose content hash
+is unchanged are skipped without parsing, and only new or edited files
+are re-indexed (through the parse cache).
+
+Usage:
+    python scripts/migration_triage/object_index.py jurisdictions
+    python scripts/migration_triage/object_index.py --kind policies "members can read"
+    python scripts/migration_triage/object_index.py --like 'inspection_%'
+    python scripts/migration_triage/object_index.py --rebuild
+"""
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from sql_lexer import LEXER_VERSION  # noqa: E402
+from parse_cache import DEFAULT_CACHE_DIR, content_key, parse_files  # noqa: E402
+from schema_model import KINDS, TABLE_KEYED, op_target  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MIGRATIONS_DIR = os.path.join(REPO_ROOT, 'supabase', 'migrations')
+DEFAULT_DB_PATH = os.path.join(DEFAULT_CACHE_DIR, 'objects.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS migrations (
+    version       TEXT PRIMARY KEY,
+    file          TEXT NOT NULL,
+    size          INTEGER NOT NULL,
+    mtime_ns      INTEGER NOT NULL,
+    content_key   TEXT NOT NULL,
+    lexer_version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    kind     TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    version  TEXT NOT NULL,
+    op_type  TEXT NOT NULL,
+    offset   INTEGER NOT NULL,
+    line     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_refs_name ON refs (name, kind);
+CREATE INDEX IF NOT EXISTS idx_refs_version ON refs (version);
+"""
+
+# Bump when op_refs() output changes; older index files are rebuilt
+INDEX_FORMAT = 2
+
+# Ops that act on a table without writing a tracked object
+TABLE_OPS = ('INSERT_INTO', 'UPDATE_TABLE', 'DELETE_FROM', 'GRANT')
+
+
+def connect(path=DEFAULT_DB_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_FORMAT:
+        conn.executescript("DROP TABLE IF EXISTS refs; DROP TABLE IF EXISTS migrations;")
+        conn.execute(f"PRAGMA user_version = {INDEX_FORMAT}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def discover(migrations_dir=MIGRATIONS_DIR):
+    """version -> path for every NNNN_*.sql migration."""
+    local_map = {}
+    for path in sorted(glob.glob(os.path.join(migrations_dir, '*.sql'))):
+        match = re.match(r'^(\d+)_', os.path.basename(path))
+        if match:
+            local_map[match.group(1)] = path
+    return local_map
+
+
+def op_refs(op):
+    """(kind, name) pairs an op should be found under; the object it writes comes first.
+
+    Names are schema_model keys, so constraints, policies and triggers are
+    "table.name": the same policy name on two tables is two objects.
+    """
+    refs = []
+    args = [a.lower() for a in op['args']]
+    op_type = op['type']
+    target = op_target(op)
+    if target:
+        kind, key, _ = target
+        refs.append((kind, key))
+
+    table = None
+    if op_type in ('CREATE_INDEX', 'CREATE_POLICY', 'DROP_POLICY',
+                   'CREATE_TRIGGER', 'DROP_TRIGGER') and len(args) > 1:
+        table = args[1]
+    elif op_type in ('ADD_COLUMN', 'ALTER_COLUMN', 'DROP_COLUMN', 'ADD_CONSTRAINT',
+                     'DROP_CONSTRAINT', 'ENABLE_RLS', 'DISABLE_RLS') or op_type in TABLE_OPS:
+        table = args[0]
+    elif op_type == 'RENAME_TABLE':
+        table = args[0]  # old name; the new one is the target
+    elif op_type == 'RENAME_COLUMN' and len(args) > 2:
+        table = args[0]
+        refs.append(('columns', f"{args[0]}.{args[1]}"))
+    if table and ('tables', table) not in refs:
+        refs.append(('tables', table))
+    return refs
+
+
+def index_migration(conn, version, path, st, key, content, ops):
+    conn.execute("DELETE FROM refs WHERE version = ?", (version,))
+    rows = []
+    for op in ops:
+        offset = op.get('offset', 0)
+        line = content.count('\n', 0, offset) + 1
+        for kind, name in op_refs(op):
+            rows.append((kind, name, version, op['type'], offset, line))
+    conn.executemany(
+        "INSERT INTO refs (kind, name, version, op_type, offset, line) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.execute(
+        "INSERT OR REPLACE INTO migrations (version, file, size, mtime_ns, content_key, lexer_version) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (version, os.path.basename(path), st.st_size, st.st_mtime_ns, key, LEXER_VERSION))
+
+
+def update_index(conn, local_map, parsed=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Bring the index in line with local_map; returns (indexed, removed) counts.
+
+    `parsed` may hold parse_files() results the caller already has; any
+    changed file not in it is parsed here (through the parse cache).
+    """
+    known = {row[0]: row[1:] for row in conn.execute(
+        "SELECT version, size, mtime_ns, content_key, lexer_version FROM migrations")}
+
+    removed = [v for v in known if v not in local_map]
+    changed = []  # (version, path, stat, key)
+    for version, path in local_map.items():
+        st = os.stat(path)
+        prev = known.get(version)
+        if prev and prev[3] == LEXER_VERSION and (prev[0], prev[1]) == (st.st_size, st.st_mtime_ns):
+            continue
+        with open(path, 'rb') as f:
+            key = content_key(f.read())
+        if prev and prev[3] == LEXER_VERSION and prev[2] == key:
+            conn.execute("UPDATE migrations SET size = ?, mtime_ns = ? WHERE version = ?",
+                         (st.st_size, st.st_mtime_ns, version))
+            continue
+        changed.append((version, path, st, key))
+
+    parsed = dict(parsed or {})
+    missing = [path for _, path, _, _ in changed if path not in parsed]
+    if missing:
+        parsed.update(parse_files(missing, cache_dir=cache_dir)[0])
+
+    with conn:
+        for version in removed:
+            conn.execute("DELETE FROM refs WHERE version = ?", (version,))
+            conn.execute("DELETE FROM migrations WHERE version = ?", (version,))
+        for version, path, st, key in changed:
+            result = parsed[path]
+            if 'error' in result:
+                continue
+            index_migration(conn, version, path, st, key, result['content'], result['ops'])
+    return len(changed), len(removed)
+
+
+def lookup(conn, name, kind=None, like=False):
+    """Refs for an object, in migration order: (kind, name, version, file, op_type, offset, line).
+
+    A bare constraint, policy or trigger name matches it on every table.
+    """
+    kinds = ', '.join(f"'{k}'" for k in TABLE_KEYED)
+    if like:
+        match = f"(r.name LIKE ? OR (r.kind IN ({kinds}) AND r.name LIKE '%.' || ?))"
+    else:
+        match = f"(r.name = ? OR (r.kind IN ({kinds}) AND substr(r.name, -length(?) - 1) = '.' || ?))"
+    sql = ("SELECT r.kind, r.name, r.version, m.file, r.op_type, r.offset, r.line "
+           "FROM refs r JOIN migrations m ON m.version = r.version "
+           f"WHERE {match}")
+    params = [name.lower()] * match.count('?')
+    if kind:
+        sql += " AND r.kind = ?"
+        params.append(kind)
+    sql += " ORDER BY r.version, r.offset"
+    return conn.execute(sql, params).fetchall()
+
+
+def touched_after(conn, kind, name, version):
+    """Versions after `version` that reference the object (`name` as op_refs gives it)."""
+    return [row[0] for row in conn.execute(
+        "SELECT DISTINCT version FROM refs WHERE name = ? AND kind = ? AND version > ? ORDER BY version",
+        (name, kind, version))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Which migrations touched an object, in order')
+    parser.add_argument('name', nargs='?', help='Object name (table, policy, function, index, ...; columns as table.column)')
+    parser.add_argument('--kind', choices=KINDS, help='Only refs of this object kind')
+    parser.add_argument('--like', action='store_true', help='Treat NAME as a SQL LIKE pattern')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f'Index path (default: {DEFAULT_DB_PATH})')
+    parser.add_argument('--migrations-dir', default=MIGRATIONS_DIR)
+    parser.add_argument('--rebuild', action='store_true', help='Drop and rebuild the index')
+    parser.add_argument('--no-update', action='store_true', help='Query without refreshing the index first')
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(args.db):
+        os.remove(args.db)
+    conn = connect(args.db)
+
+    if not args.no_update:
+        t0 = time.perf_counter()
+        indexed, removed = update_index(conn, discover(args.migrations_dir))
+        if indexed or removed:
+            print(f"Indexed {indexed} migration(s), removed {removed} in {time.perf_counter() - t0:.2f}s",
+                  file=sys.stderr)
+
+    if not args.name:
+        return
+
+    t0 = time.perf_counter()
+    rows = lookup(conn, args.name, kind=args.kind, like=args.like)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    for kind, name, version, file, op_type, offset, line in rows:
+        print(f"{version}  {op_type:<16} {kind}:{name:<40} {file}:{line}  (offset {offset})")
+    print(f"{len(rows)} ref(s) in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Parallel, cached parsing of migration files for triage.
+
+Each file's op list is cached on disk under the sha256 of its bytes plus
+LEXER_VERSION, so a re-run only lexes files whose content changed (or all
+of them after a lexer change). Cache misses are parsed on a process pool;
+the lexer is pure Python, so threads would serialize on the GIL.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sql_lexer import LEXER_VERSION, split_statements, classify_statement
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    '.cache', 'migration_triage')
+
+# Below this many misses, process start-up costs more than it saves.
+MIN_POOL_FILES = 8
+
+
+def content_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f'{key}.v{LEXER_VERSION}.json')
+
+
+def load_cached(cache_dir, key):
+    try:
+        with open(cache_path(cache_dir, key), 'r', encoding='utf-8') as f:
+            return json.load(f)['ops']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store_cached(cache_dir, key, ops):
+    path = cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'lexer_version': LEXER_VERSION, 'ops': ops}, f)
+    os.replace(tmp, path)
+
+
+def parse_sql(content):
+    """Lex and classify one file. Returns (ops, lex_seconds, classify_seconds)."""
+    t0 = time.perf_counter()
+    stmts = list(split_statements(content))
+    t1 = time.perf_counter()
+    ops = []
+    for stmt in stmts:
+        ops.extend(classify_statement(stmt, content))
+    t2 = time.perf_counter()
+    return ops, t1 - t0, t2 - t1
+
+
+def parse_files(paths, cache_dir=DEFAULT_CACHE_DIR, workers=None, use_cache=True):
+    """Parse migration files, reusing cached op lists where content is unchanged.
+
+    Returns (results, timings): results maps path -> {'content', 'ops'}
+    (or {'error'} if the file could not be read); timings holds seconds spent
+    in 'read', 'lex' and 'classify' (lex/classify summed across workers) and
+    the 'parsed' / 'cached' file counts.
+    """
+    timings = {'read': 0.0, 'lex': 0.0, 'classify': 0.0, 'parsed': 0, 'cached': 0}
+    results = {}
+    misses = []  # (path, key)
+
+    t0 = time.perf_counter()
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            results[path] = {'error': e}
+            continue
+        key = content_key(data)
+        content = data.decode('utf-8', errors='replace')
+        ops = load_cached(cache_dir, key) if use_cache else None
+        results[path] = {'content': content, 'ops': ops}
+        if ops is None:
+            misses.append((path, key))
+        else:
+            timings['cached'] += 1
+    timings['read'] = time.perf_counter() - t0
+
+    contents = [results[path]['content'] for path, _ in misses]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(misses) < MIN_POOL_FILES:
+        parsed = map(parse_sql, contents)
+        _collect(parsed, misses, results, timings, cache_dir, use_cache)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = pool.map(parse_sql, contents, chunksize=8)
+            _collect(parsed, misses, results, timings, cache_dir, use_cache)
+
+    return results, timings
+
+
+def _collect(parsed, misses, results, timings, cache_dir, use_cache):
+    for (path, key), (ops, lex_s, classify_s) in zip(misses, parsed):
+        results[path]['ops'] = ops
+        timings['lex'] += lex_s
+        timings['classify'] += classify_s
+        timings['parsed'] += 1
+        if use_cache:
+            store_cached(cache_dir, key, ops)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+RLS policy cost analyzer.
+
+Parses each policy's USING / WITH CHECK expression and reports what makes
+it expensive per row:
+
+  auth-call-per-row          auth.uid() / auth.jwt() / auth.role() /
+                             current_setting() not wrapped in (select ...):
+                             re-evaluated for every row instead of once as
+                             an initplan
+  correlated-subquery        a subquery referencing the policy's table:
+                             run once per row
+  function-per-row           a user-defined function called on the row's
+                             columns: a black box to the planner, run per row
+  function-not-wrapped       a user-defined function called without row
+                             arguments outside (select ...): still run per row
+  unindexed-filter           a column of the policy's table compared in USING
+                             (other than to true/false) with no index leading
+                             with it
+  unindexed-subquery-filter  a lookup subquery filtering its table on an
+                             unindexed column
+
+A table forces sequential scans when a USING policy on it has an
+unindexed filter, or filters only through correlated subqueries or
+per-row functions.
+
+Policies come from the audit dump of pg_policies
+(audit-output/06-db-raw/rls-policies.json), a catalog snapshot, or the
+final state of the migrations. Indexes and primary/unique keys always come
+from replaying the migrations, plus the snapshot's indexes when one is
+given. Columns come from the same places, plus the audit columns.json dump.
+
+Usage:
+    python scripts/migration_triage/rls_cost.py
+    python scripts/migration_triage/rls_cost.py --source migrations --table inspections
+    python scripts/migration_triage/rls_cost.py --catalog prod.json --source catalog --json rls_cost.json
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from catalog import Catalog  # noqa: E402
+from migration_lint import NOT_CALLS, schema_state  # noqa: E402
+from object_index import MIGRATIONS_DIR, REPO_ROOT, discover  # noqa: E402
+from parse_cache import DEFAULT_CACHE_DIR, parse_files  # noqa: E402
+from sql_lexer import tokenize  # noqa: E402
+
+AUDIT_DIR = os.path.join(REPO_ROOT, 'audit-output', '06-db-raw')
+AUDIT_POLICIES = os.path.join(AUDIT_DIR, 'rls-policies.json')
+AUDIT_COLUMNS = os.path.join(AUDIT_DIR, 'columns.json')
+
+AUTH_FUNCTIONS = frozenset(('auth.uid', 'auth.jwt', 'auth.role', 'auth.email', 'current_setting'))
+
+# Built-ins that are cheap and planner-transparent
+BUILTIN_FUNCTIONS = frozenset((
+    'coalesce', 'nullif', 'lower', 'upper', 'length', 'now', 'array_length', 'cardinality',
+    'greatest', 'least', 'storage.foldername', 'jsonb_array_elements_text',
+))
+
+# Words that end a FROM item's alias position
+_FROM_STOP = frozenset((
+    'WHERE', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'CROSS', 'ON', 'USING', 'GROUP', 'ORDER',
+    'LIMIT', 'OFFSET', 'HAVING', 'UNION', 'EXCEPT', 'INTERSECT', 'WINDOW', 'LATERAL', 'NATURAL',
+))
+
+
+def load_rows(path):
+    """Rows of an audit dump: either a plain list or a {'rows': [...]} envelope."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['rows'] if isinstance(data, dict) else data
+
+
+# ── Policy sources ──
+
+def _policy(table, name, cmd, using, with_check, source):
+    return {'table': table.lower(), 'name': name, 'cmd': (cmd or 'ALL').upper(),
+            'using': using, 'with_check': with_check, 'source': source}
+
+
+def policies_from_audit(rows):
+    out = []
+    for r in rows:
+        table = r['tablename'] if r.get('schemaname', 'public') == 'public' else f"{r['schemaname']}.{r['tablename']}"
+        out.append(_policy(table, r['policyname'], r.get('cmd'), r.get('qual'), r.get('with_check'), 'audit'))
+    return out
+
+
+def policies_from_catalog(catalog):
+    return [_policy(t, p['name'], p.get('cmd'), p.get('qual'), p.get('with_check'), 'catalog')
+            for (t, _), p in sorted(catalog.policies.items())]
+
+
+def policies_from_migrations(migrations):
+    """Policies left after replaying CREATE / DROP POLICY, DROP TABLE and RENAME TABLE."""
+    live = {}
+    for version, file, _, ops in migrations:
+        for op in ops:
+            args = [a.lower() for a in op['args']]
+            if op['type'] == 'CREATE_POLICY':
+                d = op.get('detail') or {}
+                live[(args[1], args[0])] = _policy(args[1], op['args'][0], d.get('cmd'), d.get('using'),
+                                                   d.get('with_check'), f"{file}:{op.get('offset', 0)}")
+            elif op['type'] == 'DROP_POLICY' and len(args) > 1:
+                live.pop((args[1], args[0]), None)
+            elif op['type'] == 'DROP_TABLE':
+                for key in [k for k in live if k[0] == args[0]]:
+                    del live[key]
+            elif op['type'] == 'RENAME_TABLE' and len(args) > 1:
+                for key in [k for k in live if k[0] == args[0]]:
+                    live[(args[1], key[1])] = dict(live.pop(key), table=args[1])
+    return [live[k] for k in sorted(live)]
+
+
+# ── Expression analysis ──
+
+def _groups(toks):
+    """Parenthesized groups as (open, close, is_select), and the innermost SELECT group owning each token."""
+    groups = []
+    stack = []
+    owner = [None] * len(toks)
+    select_stack = []
+    for k, t in enumerate(toks):
+        if t.kind == 'op' and t.value == '(':
+            is_select = k + 1 < len(toks) and toks[k + 1].upper in ('SELECT', 'WITH')
+            stack.append((k, is_select, len(groups)))
+            groups.append([k, None, is_select])
+            if is_select:
+                select_stack.append(len(groups) - 1)
+            owner[k] = select_stack[-1] if select_stack else None
+            continue
+        owner[k] = select_stack[-1] if select_stack else None
+        if t.kind == 'op' and t.value == ')' and stack:
+            _, is_select, gid = stack.pop()
+            groups[gid][1] = k
+            if is_select and select_stack and select_stack[-1] == gid:
+                select_stack.pop()
+    return groups, owner
+
+
+def _from_aliases(toks, owner, gid, start, end):
+    """alias -> table for the FROM / JOIN items directly inside SELECT group gid."""
+    aliases = {}
+    k = start
+    while k < end:
+        t = toks[k]
+        if owner[k] == gid and t.upper in ('FROM', 'JOIN') or (t.kind == 'op' and t.value == ','
+                                                              and owner[k] == gid and aliases):
+            k += 1
+            parts = []
+            while k < end and toks[k].kind in ('word', 'qident'):
+                parts.append(toks[k].value.lower() if toks[k].kind == 'word' else toks[k].value)
+                if k + 1 < end and toks[k + 1].kind == 'op' and toks[k + 1].value == '.':
+                    k += 2
+                else:
+                    k += 1
+                    break
+            if not parts:
+                continue
+            if parts[0] == 'public' and len(parts) > 1:
+                parts = parts[1:]
+            table = '.'.join(parts)
+            aliases[table.split('.')[-1]] = table
+            if k < end and toks[k].upper == 'AS':
+                k += 1
+            if k < end and toks[k].kind in ('word', 'qident') and toks[k].upper not in _FROM_STOP:
+                aliases[toks[k].value.lower()] = table
+                k += 1
+            continue
+        if owner[k] == gid and t.upper == 'WHERE':
+            break
+        k += 1
+    return aliases
+
+
+def _call_name(toks, k):
+    """Lowercased (schema-qualified) name of the call whose '(' is toks[k]."""
+    parts = [toks[k - 1].value]
+    j = k - 2
+    while j >= 1 and toks[j].kind == 'op' and toks[j].value == '.' and toks[j - 1].kind in ('word', 'qident'):
+        parts.insert(0, toks[j - 1].value)
+        j -= 2
+    if parts[0].lower() == 'public' and len(parts) > 1:
+        parts = parts[1:]
+    return '.'.join(parts).lower()
+
+
+def _column_refs(toks):
+    """(index, qualifier or None, column) for identifier references that aren't calls or keywords."""
+    refs = []
+    k = 0
+    n = len(toks)
+    while k < n:
+        t = toks[k]
+        if t.kind in ('word', 'qident'):
+            if k + 2 < n and toks[k + 1].kind == 'op' and toks[k + 1].value == '.' \
+                    and toks[k + 2].kind in ('word', 'qident'):
+                is_call = k + 3 < n and toks[k + 3].kind == 'op' and toks[k + 3].value == '('
+                if not is_call:
+                    refs.append((k + 2, t.value.lower(), toks[k + 2].value.lower()))
+                k += 3
+                continue
+            is_call = k + 1 < n and toks[k + 1].kind == 'op' and toks[k + 1].value == '('
+            prev = toks[k - 1] if k else None
+            after_cast = prev is not None and prev.kind == 'op' and prev.value == '::'
+            if not is_call and not after_cast:
+                refs.append((k, None, t.value.lower()))
+        k += 1
+    return refs
+
+
+def _matching_paren(toks, k):
+    depth = 0
+    for j in range(k, len(toks)):
+        if toks[j].kind == 'op':
+            depth += (toks[j].value == '(') - (toks[j].value == ')')
+            if depth == 0:
+                return j
+    return len(toks)
+
+
+def _compared(toks, k):
+    """Whether the reference at k sits on one side of `=` or before IN, not against true/false."""
+    nxt = toks[k + 1] if k + 1 < len(toks) else None
+    prev = toks[k - 1] if k else None
+    other = toks[k + 2] if nxt is not None and nxt.value == '=' and k + 2 < len(toks) else \
+        toks[k - 2] if prev is not None and prev.value == '=' and k >= 2 else None
+    if other is not None and other.upper in ('TRUE', 'FALSE'):
+        return False
+    if nxt is not None and ((nxt.kind == 'op' and nxt.value == '=') or nxt.upper == 'IN'):
+        return True
+    return prev is not None and prev.kind == 'op' and prev.value == '='
+
+
+def analyze_expression(sql, table, columns, user_functions=()):
+    """Per-row costs in one policy expression.
+
+    columns: table -> set of column names. Returns {'unwrapped_auth': [name],
+    'correlated': [subquery tables], 'per_row_functions': [name],
+    'unwrapped_functions': [name], 'filters': [column of `table`],
+    'subquery_filters': [(table, column)]}.
+    """
+    toks = list(tokenize(sql or ''))
+    groups, owner = _groups(toks)
+    bare = table.split('.')[-1]
+    outer_cols = columns.get(table, set())
+    result = {'unwrapped_auth': [], 'correlated': [], 'per_row_functions': [],
+              'unwrapped_functions': [], 'filters': [], 'subquery_filters': []}
+    refs = _column_refs(toks)
+
+    # Calls: auth helpers outside any SELECT, user functions taking the row's columns
+    for k, t in enumerate(toks):
+        if t.kind == 'op' and t.value == '(' and k and toks[k - 1].kind in ('word', 'qident'):
+            name = _call_name(toks, k)
+            if name in AUTH_FUNCTIONS and owner[k - 1] is None:
+                result['unwrapped_auth'].append(name)
+            elif owner[k - 1] is None and name not in AUTH_FUNCTIONS and name not in BUILTIN_FUNCTIONS \
+                    and name not in NOT_CALLS \
+                    and (not user_functions or name in user_functions):
+                close = _matching_paren(toks, k)
+                row_args = any(k < j < close and (qual in (None, bare, table) and col in outer_cols)
+                               for j, qual, col in refs)
+                result['per_row_functions' if row_args else 'unwrapped_functions'].append(name)
+
+    select_groups = [(gid, g) for gid, g in enumerate(groups) if g[2] and g[1] is not None]
+    aliases = {gid: _from_aliases(toks, owner, gid, g[0] + 1, g[1]) for gid, g in select_groups}
+
+    # Outer filters: the policy table's own columns compared outside subqueries
+    for k, qual, col in refs:
+        if owner[k] is not None or not _compared(toks, k):
+            continue
+        if (qual in (None, bare, table) and (col in outer_cols or not outer_cols and qual)) \
+                and col not in result['filters']:
+            result['filters'].append(col)
+
+    # Subqueries: correlation and their own filter columns
+    for gid, g in select_groups:
+        own = aliases[gid]
+        inner_cols = set().union(*(columns.get(t, set()) for t in own.values())) if own else set()
+        correlated = False
+        for k, qual, col in refs:
+            if not (g[0] < k < g[1]):
+                continue
+            if qual is not None:
+                if qual not in own and qual in (bare, table):
+                    correlated = True
+                elif qual in own and owner[k] == gid and _compared(toks, k):
+                    pair = (own[qual], col)
+                    if pair not in result['subquery_filters']:
+                        result['subquery_filters'].append(pair)
+            elif owner[k] == gid:
+                if col in outer_cols and inner_cols and col not in inner_cols:
+                    correlated = True
+                elif len(set(own.values())) == 1 and col in inner_cols and _compared(toks, k):
+                    pair = (next(iter(own.values())), col)
+                    if pair not in result['subquery_filters']:
+                        result['subquery_filters'].append(pair)
+        if correlated:
+            result['correlated'].append(', '.join(sorted(set(own.values()))) or '?')
+    return result
+
+
+# ── Report ──
+
+def analyze(policies, columns, covered, user_functions=()):
+    """Findings per policy plus a per-table verdict.
+
+    covered(table, [columns]) -> bool says whether an index leads with the columns.
+    Returns {table: {'policies': n, 'seq_scan': bool, 'findings': [...]}}.
+    """
+    tables = defaultdict(lambda: {'policies': 0, 'seq_scan': False, 'findings': []})
+    for p in policies:
+        entry = tables[p['table']]
+        entry['policies'] += 1
+        for clause in ('using', 'with_check'):
+            sql = p.get(clause)
+            if not sql:
+                continue
+            a = analyze_expression(sql, p['table'], columns, user_functions)
+
+            def add(rule, detail):
+                entry['findings'].append({'rule': rule, 'policy': p['name'], 'cmd': p['cmd'],
+                                          'clause': clause, 'detail': detail, 'source': p['source']})
+
+            for name in sorted(set(a['unwrapped_auth'])):
+                add('auth-call-per-row', f"{name}() — wrap as (select {name}())")
+            for tables_in in a['correlated']:
+                add('correlated-subquery', f"subquery on {tables_in} references {p['table']}")
+            for name in sorted(set(a['per_row_functions'])):
+                add('function-per-row', f"{name}() called on row columns")
+            for name in sorted(set(a['unwrapped_functions']) - set(a['per_row_functions'])):
+                add('function-not-wrapped', f"{name}() has no row arguments — wrap as (select {name}(...))")
+            # WITH CHECK runs against the written row, so only USING filters need an index
+            unindexed = [c for c in a['filters'] if clause == 'using' and not covered(p['table'], [c])]
+            for col in unindexed:
+                add('unindexed-filter', f"{p['table']}.{col} has no index")
+            for t, col in a['subquery_filters']:
+                if not covered(t, [col]):
+                    add('unindexed-subquery-filter', f"{t}.{col} has no index")
+
+            if clause == 'using':
+                indexed = [c for c in a['filters'] if c not in unindexed]
+                if unindexed or ((a['correlated'] or a['per_row_functions']) and not indexed):
+                    entry['seq_scan'] = True
+    return dict(tables)
+
+
+def write_markdown(f, tables):
+    flagged = sorted((t for t, e in tables.items() if e['seq_scan']))
+    f.write("# RLS policy cost\n\n")
+    f.write(f"{sum(e['policies'] for e in tables.values())} policies on {len(tables)} tables; "
+            f"{len(flagged)} tables have policies that force sequential scans.\n\n")
+    counts = defaultdict(int)
+    for e in tables.values():
+        for x in e['findings']:
+            counts[x['rule']] += 1
+    f.write("| Rule | Findings |\n|------|----------|\n")
+    for rule, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+        f.write(f"| {rule} | {n} |\n")
+    f.write("\n## Tables forcing sequential scans\n\n")
+    for t in flagged:
+        f.write(f"- `{t}`\n")
+    f.write("\n## Findings by table\n\n")
+    for t in sorted(tables, key=lambda t: (not tables[t]['seq_scan'], -len(tables[t]['findings']), t)):
+        e = tables[t]
+        if not e['findings']:
+            continue
+        f.write(f"### `{t}`{' — seq scan' if e['seq_scan'] else ''}\n\n")
+        for x in e['findings']:
+            f.write(f"- [{x['rule']}] \"{x['policy']}\" ({x['cmd']}, {x['clause']}): {x['detail']}\n")
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find RLS policies that are expensive per row')
+    parser.add_argument('--source', choices=('audit', 'catalog', 'migrations'), default='audit',
+                        help='Where policies come from (default: audit dump)')
+    parser.add_argument('--policies', default=AUDIT_POLICIES, help=f'pg_policies dump (default: {AUDIT_POLICIES})')
+    parser.add_argument('--columns', default=AUDIT_COLUMNS, help=f'Columns dump (default: {AUDIT_COLUMNS})')
+    parser.add_argument('--catalog', help='Catalog snapshot: policies for --source catalog, and PROD indexes')
+    parser.add_argument('--migrations-dir', default=MIGRATIONS_DIR)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--table', help='Only this table')
+    parser.add_argument('--out', help='Write the markdown report here (default: stdout)')
+    parser.add_argument('--json', metavar='PATH', help='Also write per-table findings as JSON')
+    args = parser.parse_args()
+
+    catalog = Catalog.load(args.catalog) if args.catalog else None
+    if args.source == 'catalog' and catalog is None:
+        parser.error('--source catalog needs --catalog')
+
+    local_map = discover(args.migrations_dir)
+    parsed, _ = parse_files([local_map[v] for v in sorted(local_map)], cache_dir=args.cache_dir)
+    migrations = [(v, os.path.basename(local_map[v]), parsed[local_map[v]]['content'], parsed[local_map[v]]['ops'])
+                  for v in sorted(local_map) if 'error' not in parsed[local_map[v]]]
+    state = schema_state(migrations, catalog)
+
+    columns = defaultdict(set)
+    for table, col in state.column_types:
+        columns[table].add(col)
+    if os.path.exists(args.columns):
+        for r in load_rows(args.columns):
+            columns[r['table_name'].lower()].add(r['column_name'].lower())
+
+    if args.source == 'audit':
+        policies = policies_from_audit(load_rows(args.policies))
+    elif args.source == 'catalog':
+        policies = policies_from_catalog(catalog)
+    else:
+        policies = policies_from_migrations(migrations)
+    if args.table:
+        policies = [p for p in policies if p['table'] == args.table.lower()]
+
+    user_functions = set(state.volatility) - AUTH_FUNCTIONS
+    tables = analyze(policies, columns, state.covered, user_functions)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            write_markdown(f, tables)
+        print(f"Report written to {args.out}", file=sys.stderr)
+    else:
+        write_markdown(sys.stdout, tables)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(tables, f, indent=1, sort_keys=True)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
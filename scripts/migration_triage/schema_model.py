@@ -0,0 +1,250 @@
+"""
+Expected final schema, built by replaying every local migration in order.
+
+Each op is mapped to the catalog object it writes, keyed the same way as
+catalog.Catalog.keys(): bare names for tables, indexes, functions, views and
+enums; "table.name" for columns and for constraints, policies and triggers,
+whose names are only unique per table; "enum.label" for enum values. Replay is
+last-writer-wins: every object remembers the migration version that last
+created or dropped it. Modifiers (ALTER COLUMN on a column the model
+already has) don't take over from the op that created the object. The
+expected state is then diffed against PROD once per object kind with set
+operations, and each op is judged from that diff:
+
+- 'superseded' - a later migration rewrote or dropped the object, so this
+  op's own effect no longer matters
+- 'present'    - the object's final expected state matches PROD
+- 'absent'     - it doesn't (missing from PROD, or still in PROD after the
+  final migration touching it dropped it)
+- 'drifted'    - the object exists in PROD, but its body (function source,
+  view query, policy expressions, trigger definition) fingerprints
+  differently from the last migration that wrote it
+- 'unclear'    - data ops, grants, extensions: nothing to diff
+"""
+
+KINDS = ('tables', 'columns', 'indexes', 'constraints', 'policies',
+         'functions', 'views', 'enums', 'enum_values', 'triggers', 'rls_enabled')
+
+# Kinds whose objects belong to a table and go away with it
+TABLE_SCOPED = ('indexes', 'constraints', 'policies', 'triggers')
+
+# Table-scoped kinds whose keys are "table.name"
+TABLE_KEYED = ('constraints', 'policies', 'triggers')
+
+# Kinds whose CREATE ops carry a body fingerprint (detail['body_fp'])
+FINGERPRINTED = ('functions', 'views', 'policies', 'triggers')
+
+# Ops that change an existing object without creating it
+MODIFIER_OPS = ('ALTER_COLUMN',)
+
+
+def op_target(op):
+    """(kind, key, exists_after) for the object an op writes, or None."""
+    op_type = op['type']
+    args = [a.lower() for a in op['args']]
+
+    if op_type == 'CREATE_TABLE':
+        return 'tables', args[0], True
+    if op_type == 'DROP_TABLE':
+        return 'tables', args[0], False
+    if op_type in ('ADD_COLUMN', 'ALTER_COLUMN'):
+        return 'columns', f"{args[0]}.{args[1]}", True
+    if op_type == 'DROP_COLUMN':
+        return 'columns', f"{args[0]}.{args[1]}", False
+    if op_type == 'RENAME_COLUMN' and len(args) > 2:
+        return 'columns', f"{args[0]}.{args[2]}", True
+    if op_type == 'RENAME_TABLE':
+        return 'tables', args[1], True
+    if op_type == 'ADD_CONSTRAINT':
+        return 'constraints', f"{args[0]}.{args[1]}", True
+    if op_type == 'DROP_CONSTRAINT':
+        return 'constraints', f"{args[0]}.{args[1]}", False
+    if op_type == 'CREATE_INDEX':
+        return 'indexes', args[0], True
+    if op_type == 'DROP_INDEX':
+        return 'indexes', args[0], False
+    if op_type == 'CREATE_POLICY':
+        return 'policies', f"{args[1]}.{args[0]}", True
+    if op_type == 'DROP_POLICY':
+        return 'policies', f"{args[1]}.{args[0]}", False
+    if op_type == 'CREATE_FUNCTION':
+        return 'functions', args[0], True
+    if op_type == 'DROP_FUNCTION':
+        return 'functions', args[0], False
+    if op_type == 'CREATE_VIEW':
+        return 'views', args[0], True
+    if op_type == 'DROP_VIEW':
+        return 'views', args[0], False
+    if op_type == 'CREATE_ENUM':
+        return 'enums', args[0], True
+    if op_type == 'DROP_TYPE':
+        return 'enums', args[0], False
+    if op_type == 'ALTER_ENUM_ADD' and len(args) > 1:
+        return 'enum_values', f"{args[0]}.{args[1]}", True
+    if op_type == 'CREATE_TRIGGER':
+        return 'triggers', f"{args[1]}.{args[0]}", True
+    if op_type == 'DROP_TRIGGER':
+        return 'triggers', f"{args[1]}.{args[0]}", False
+    if op_type == 'ENABLE_RLS':
+        return 'rls_enabled', args[0], True
+    if op_type == 'DISABLE_RLS':
+        return 'rls_enabled', args[0], False
+    return None
+
+
+class SchemaModel:
+    """Expected schema state after replaying migrations in version order."""
+
+    def __init__(self):
+        self.objects = {kind: set() for kind in KINDS}
+        # (kind, key) -> version that last created/altered/dropped it
+        self.writer = {}
+        # kind -> {key: table} for table-scoped objects
+        self.owner_table = {kind: {} for kind in TABLE_SCOPED}
+        # (kind, key) -> body fingerprint from the last writer
+        self.fingerprints = {}
+
+    def _write(self, kind, key, exists, version):
+        if exists:
+            self.objects[kind].add(key)
+        else:
+            self.objects[kind].discard(key)
+            self.fingerprints.pop((kind, key), None)
+        self.writer[(kind, key)] = version
+
+    def _drop_table_objects(self, table, version):
+        """Drop everything that lives on `table`, as DROP TABLE would."""
+        prefix = f"{table}."
+        for col in [c for c in self.objects['columns'] if c.startswith(prefix)]:
+            self._write('columns', col, False, version)
+        for kind in TABLE_SCOPED:
+            owned = [k for k, t in self.owner_table[kind].items() if t == table]
+            for key in owned:
+                del self.owner_table[kind][key]
+                self._write(kind, key, False, version)
+        if table in self.objects['rls_enabled']:
+            self._write('rls_enabled', table, False, version)
+
+    def _rename_table(self, old, new, version):
+        prefix = f"{old}."
+        for col in [c for c in self.objects['columns'] if c.startswith(prefix)]:
+            self._write('columns', col, False, version)
+            self._write('columns', new + col[len(old):], True, version)
+        for kind in TABLE_SCOPED:
+            owned = [k for k, t in self.owner_table[kind].items() if t == old]
+            for key in owned:
+                if kind in TABLE_KEYED:
+                    del self.owner_table[kind][key]
+                    fp = self.fingerprints.get((kind, key))
+                    self._write(kind, key, False, version)
+                    key = new + key[len(old):]
+                    self._write(kind, key, True, version)
+                    if fp:
+                        self.fingerprints[(kind, key)] = fp
+                self.owner_table[kind][key] = new
+        if old in self.objects['rls_enabled']:
+            self._write('rls_enabled', old, False, version)
+            self._write('rls_enabled', new, True, version)
+        self._write('tables', old, False, version)
+
+    def apply(self, op, version):
+        target = op_target(op)
+        if target is None:
+            return
+        kind, key, exists = target
+        args = [a.lower() for a in op['args']]
+        op_type = op['type']
+
+        if op_type in MODIFIER_OPS and key in self.objects[kind]:
+            # The op that created the object stays its writer. A modifier
+            # on an object the model doesn't have is the only sign it should
+            # exist, so that one is written like a create.
+            return
+
+        if op_type == 'DROP_TABLE':
+            self._drop_table_objects(key, version)
+        elif op_type == 'RENAME_TABLE':
+            self._rename_table(args[0], key, version)
+        elif op_type == 'RENAME_COLUMN' and len(args) > 2:
+            self._write('columns', f"{args[0]}.{args[1]}", False, version)
+        elif op_type == 'DROP_TYPE':
+            prefix = f"{key}."
+            for val in [v for v in self.objects['enum_values'] if v.startswith(prefix)]:
+                self._write('enum_values', val, False, version)
+        elif op_type == 'CREATE_TABLE':
+            for col in (op.get('detail') or {}).get('columns') or []:
+                self._write('columns', f"{key}.{col.lower()}", True, version)
+        elif op_type == 'CREATE_ENUM':
+            for label in (op.get('detail') or {}).get('labels') or []:
+                self._write('enum_values', f"{key}.{label.lower()}", True, version)
+
+        if kind in TABLE_SCOPED:
+            if exists:
+                table = args[0] if op_type == 'ADD_CONSTRAINT' else args[1]
+                self.owner_table[kind][key] = table
+            else:
+                self.owner_table[kind].pop(key, None)
+        self._write(kind, key, exists, version)
+        if exists and kind in FINGERPRINTED and op_type.startswith('CREATE_'):
+            fp = (op.get('detail') or {}).get('body_fp')
+            if fp:
+                self.fingerprints[(kind, key)] = fp
+            else:
+                self.fingerprints.pop((kind, key), None)
+
+    def replay(self, migrations):
+        """Apply (version, ops) pairs in version order."""
+        for version, ops in sorted(migrations, key=lambda m: m[0]):
+            for op in ops:
+                self.apply(op, version)
+        return self
+
+    def diff(self, prod, prod_fingerprints=None):
+        """Per-kind set diff against PROD: kind -> {'missing', 'lingering', 'drifted'}.
+
+        `prod` maps kind -> iterable of keys; kinds PROD can't report (e.g.
+        enum_values without a structured snapshot) are left out of the diff.
+        'missing' is expected but not in PROD; 'lingering' was dropped by the
+        last migration touching it but is still in PROD; 'drifted' exists on
+        both sides with a body fingerprint PROD doesn't have.
+        `prod_fingerprints` is catalog.Catalog.fingerprints() output.
+        """
+        prod_fingerprints = prod_fingerprints or {}
+        dropped = {kind: set() for kind in KINDS}
+        for (kind, key), _ in self.writer.items():
+            if key not in self.objects[kind]:
+                dropped[kind].add(key)
+        result = {}
+        for kind in KINDS:
+            if kind not in prod:
+                continue
+            actual = {k.lower() for k in prod[kind]}
+            prod_fps = prod_fingerprints.get(kind, {})
+            result[kind] = {
+                'missing': self.objects[kind] - actual,
+                'lingering': dropped[kind] & actual,
+                'drifted': {key for (k, key), fp in self.fingerprints.items()
+                            if k == kind and key in prod_fps and fp not in prod_fps[key]},
+            }
+        return result
+
+    def op_status(self, op, version, diff):
+        """Judge one op against the model diff; returns (status, writer)."""
+        target = op_target(op)
+        if target is None:
+            return 'unclear', None
+        kind, key, _ = target
+        writer = self.writer.get((kind, key))
+        # A modifier is judged by whether its object exists, unless the
+        # object was dropped or re-created after it
+        modifier_of_earlier = op['type'] in MODIFIER_OPS and writer is not None and writer < version
+        if writer != version and not modifier_of_earlier:
+            return 'superseded', writer
+        if kind not in diff:
+            return 'unclear', None
+        d = diff[kind]
+        if key in d['missing'] or key in d['lingering']:
+            return 'absent', writer
+        if key in d.get('drifted', ()):
+            return 'drifted', writer
+        return 'present', writer
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Shadow-database replay: apply supabase/migrations to a disposable local
+Postgres and compare the resulting catalog with the PROD snapshot.
+
+Unlike the static triage, this actually runs data ops and function
+definitions, so it catches everything Postgres itself would reject or
+produce differently.
+
+A template database (default: triage_shadow_tpl) caches the replayed state.
+It records every migration it has applied, with the file's content hash, in
+_shadow_replay.applied. A run:
+
+1. creates the template if needed (bootstrap SQL + checkpoint table);
+2. plans the replay: if the applied list is a prefix of the local
+   migrations (same versions, same hashes) only the newer files are
+   applied; otherwise (edited or back-dated migration) the template is
+   rebuilt from scratch;
+3. applies pending migrations to the template, one transaction per file
+   with its checkpoint row in the same transaction, stopping at the first
+   failure so the checkpoint stays clean (files with CREATE INDEX
+   CONCURRENTLY or their own BEGIN/COMMIT run outside a wrapper transaction
+   and are checkpointed dirty until they finish, so a part-way failure
+   forces a rebuild);
+4. clones the template into a scratch database, snapshots its catalog with
+   catalog_snapshot.build_snapshot(), drops the clone, and diffs the
+   snapshot structurally against PROD.
+
+Re-verifying after one new migration applies one file, not 587.
+
+Usage:
+    python scripts/migration_triage/shadow_replay.py --admin-url postgres://postgres@localhost:5432/postgres
+    python scripts/migration_triage/shadow_replay.py --prod-snapshot prod.json --out shadow_diff.json
+    python scripts/migration_triage/shadow_replay.py --rebuild
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from catalog_snapshot import DEFAULT_SNAPSHOT_PATH, build_snapshot, run_psql  # noqa: E402
+from object_index import MIGRATIONS_DIR, discover  # noqa: E402
+from parse_cache import content_key, parse_files  # noqa: E402
+from sql_lexer import has_transaction_control  # noqa: E402
+
+DEFAULT_TEMPLATE = 'triage_shadow_tpl'
+DEFAULT_BOOTSTRAP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shadow_bootstrap.sql')
+
+CHECKPOINT_SQL = """
+CREATE SCHEMA IF NOT EXISTS _shadow_replay;
+CREATE TABLE IF NOT EXISTS _shadow_replay.applied (
+  version     text PRIMARY KEY,
+  content_key text NOT NULL,
+  applied_at  timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+# Compared per kind: (identity fields, compared fields)
+SNAPSHOT_FIELDS = {
+    'tables': (('name',), ('rls_enabled',)),
+    'columns': (('table', 'name'), ('type', 'nullable', 'default')),
+    'indexes': (('name',), ('table', 'unique', 'columns', 'definition')),
+    'constraints': (('table', 'name'), ('type', 'definition')),
+    'policies': (('table', 'name'), ('cmd', 'permissive', 'roles', 'qual', 'with_check')),
+    'functions': (('name', 'signature'), ('returns', 'volatility', 'security_definer', 'language', 'body')),
+    'views': (('name',), ('materialized', 'definition')),
+    'enums': (('name',), ('labels',)),
+    'triggers': (('table', 'name'), ('function', 'definition')),
+}
+
+
+def db_url(base_url, dbname):
+    """Same server and credentials as base_url, different database."""
+    parts = urlsplit(base_url)
+    return urlunsplit((parts.scheme, parts.netloc, '/' + dbname, parts.query, parts.fragment))
+
+
+def plan_replay(local, applied):
+    """Decide what to replay.
+
+    local / applied: [(version, content_key)] in version order. Returns
+    ('incremental', pending) when applied is a prefix of local, else
+    ('rebuild', reason).
+    """
+    if len(applied) > len(local):
+        return 'rebuild', f"template has {len(applied)} migrations, repo has {len(local)}"
+    for (lv, lk), (av, ak) in zip(local, applied):
+        if ak.startswith(DIRTY_PREFIX):
+            return 'rebuild', f"migration {av} failed part-way outside a transaction"
+        if lv != av:
+            return 'rebuild', f"migration {lv} sorts before checkpointed {av}"
+        if lk != ak:
+            return 'rebuild', f"migration {lv} changed since it was replayed"
+    return 'incremental', local[len(applied):]
+
+
+def database_exists(admin_url, name):
+    return run_psql(admin_url, "SELECT 1 FROM pg_database WHERE datname = :'name';", {'name': name}) == '1'
+
+
+def drop_database(admin_url, name):
+    run_psql(admin_url, f'DROP DATABASE IF EXISTS "{name}";')
+
+
+def create_template(admin_url, name, bootstrap_path):
+    run_psql(admin_url, f'CREATE DATABASE "{name}";')
+    url = db_url(admin_url, name)
+    with open(bootstrap_path, 'r', encoding='utf-8') as f:
+        run_psql(url, f.read())
+    run_psql(url, CHECKPOINT_SQL)
+
+
+def applied_migrations(tpl_url):
+    out = run_psql(tpl_url, "SELECT coalesce(json_agg(json_build_array(version, content_key) "
+                            "ORDER BY version), '[]') FROM _shadow_replay.applied;")
+    return [tuple(row) for row in json.loads(out)]
+
+
+# A non-transactional file is checkpointed under this prefix before it runs
+# and re-keyed in the same session once it succeeds; a row still carrying it
+# means the file failed (or psql died) part-way, so the template is dirty.
+DIRTY_PREFIX = 'dirty:'
+
+CHECKPOINT_INSERT = ("INSERT INTO _shadow_replay.applied (version, content_key) "
+                     "VALUES (:'_shadow_version', :'_shadow_key');")
+CHECKPOINT_UPDATE = ("UPDATE _shadow_replay.applied SET content_key = :'_shadow_key', applied_at = now() "
+                     "WHERE version = :'_shadow_version';")
+
+
+def _include(path):
+    return "\\i '" + path.replace("'", "''") + "'\n"
+
+
+def apply_migration(tpl_url, version, path, key, single_transaction=True):
+    """Apply one file and checkpoint it; returns stderr on failure, None on success.
+
+    The file and its checkpoint row run in one psql session: in one
+    transaction normally, so either both land or neither does. Files that
+    can't run in psql's wrapper transaction (see needs_no_transaction) get
+    a dirty row first, re-keyed after the file succeeds; until then
+    plan_replay() rebuilds the template.
+    """
+    cmd = ["psql", tpl_url, "-X", "-q", "-v", "ON_ERROR_STOP=1",
+           "-v", f"_shadow_version={version}", "-v", f"_shadow_key={key}"]
+    if single_transaction:
+        cmd.append("--single-transaction")
+        script = _include(path) + CHECKPOINT_INSERT + "\n"
+    else:
+        run_psql(tpl_url, CHECKPOINT_INSERT, {'_shadow_version': version, '_shadow_key': DIRTY_PREFIX + key})
+        script = _include(path) + CHECKPOINT_UPDATE + "\n"
+    proc = subprocess.run(cmd + ["-f", "-"], input=script, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return proc.stderr.strip() or f"psql exited {proc.returncode}"
+    return None
+
+
+def needs_no_transaction(ops, sql=''):
+    """True for files psql can't wrap in one transaction: CREATE INDEX
+    CONCURRENTLY, or their own BEGIN/COMMIT (which ends the wrapper early)."""
+    return has_transaction_control(sql) or any(
+        op['type'] == 'CREATE_INDEX' and (op.get('detail') or {}).get('concurrently') for op in ops)
+
+
+def compare_snapshots(expected, actual):
+    """Structural diff of two snapshots, kind by kind.
+
+    Returns kind -> {'missing': [id], 'extra': [id], 'changed': [{'id', 'fields'}]}
+    where 'missing' is in `expected` (the shadow replay) but not `actual`
+    (PROD), and 'fields' maps each differing field to [expected, actual].
+    Kinds with no differences are omitted.
+    """
+    result = {}
+    for kind, (id_fields, fields) in SNAPSHOT_FIELDS.items():
+        def keyed(snapshot):
+            return {'.'.join(str(row.get(f) or '').lower() for f in id_fields): row
+                    for row in snapshot.get(kind, [])}
+        exp, act = keyed(expected), keyed(actual)
+        changed = []
+        for ident in sorted(exp.keys() & act.keys()):
+            diffs = {f: [exp[ident].get(f), act[ident].get(f)] for f in fields
+                     if exp[ident].get(f) != act[ident].get(f)}
+            if diffs:
+                changed.append({'id': ident, 'fields': diffs})
+        entry = {
+            'missing': sorted(exp.keys() - act.keys()),
+            'extra': sorted(act.keys() - exp.keys()),
+            'changed': changed,
+        }
+        if any(entry.values()):
+            result[kind] = entry
+    return result
+
+
+def replay(admin_url, template, migrations_dir, bootstrap_path, rebuild=False):
+    """Bring the template up to date. Returns (applied_count, failure or None)."""
+    local_map = discover(migrations_dir)
+    local = []
+    for version in sorted(local_map):
+        with open(local_map[version], 'rb') as f:
+            local.append((version, content_key(f.read())))
+
+    tpl_url = db_url(admin_url, template)
+    if rebuild:
+        mode, reason = 'rebuild', 'requested'
+    elif not database_exists(admin_url, template):
+        mode, reason = 'rebuild', 'no template yet'
+    else:
+        mode, pending = plan_replay(local, applied_migrations(tpl_url))
+        reason = pending
+    if mode == 'rebuild':
+        print(f"Rebuilding template {template}: {reason}")
+        drop_database(admin_url, template)
+        create_template(admin_url, template, bootstrap_path)
+        pending = local
+    print(f"Replaying {len(pending)} migration(s) into {template}")
+
+    parsed, _ = parse_files([local_map[v] for v, _ in pending])
+    for n, (version, key) in enumerate(pending, 1):
+        path = local_map[version]
+        ops = parsed[path].get('ops') or []
+        t0 = time.perf_counter()
+        single = not needs_no_transaction(ops, parsed[path].get('content') or '')
+        error = apply_migration(tpl_url, version, path, key, single_transaction=single)
+        if error:
+            print(f"  [{n}/{len(pending)}] {os.path.basename(path)} FAILED")
+            return n - 1, {'version': version, 'file': os.path.basename(path), 'error': error,
+                           'dirty': not single}
+        print(f"  [{n}/{len(pending)}] {os.path.basename(path)} ({time.perf_counter() - t0:.2f}s)")
+    return len(pending), None
+
+
+def snapshot_template(admin_url, template, schemas):
+    """Snapshot a throwaway clone so the template never has open sessions."""
+    scratch = f"{template}_run"
+    drop_database(admin_url, scratch)
+    run_psql(admin_url, f'CREATE DATABASE "{scratch}" TEMPLATE "{template}";')
+    try:
+        return build_snapshot(db_url(admin_url, scratch), schemas)
+    finally:
+        drop_database(admin_url, scratch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay migrations into a shadow Postgres and diff against PROD')
+    parser.add_argument('--admin-url', default=os.environ.get('SHADOW_DATABASE_URL'),
+                        help='Local Postgres URL with CREATE DATABASE rights (default: $SHADOW_DATABASE_URL)')
+    parser.add_argument('--template', default=DEFAULT_TEMPLATE, help=f'Template database (default: {DEFAULT_TEMPLATE})')
+    parser.add_argument('--migrations-dir', default=MIGRATIONS_DIR)
+    parser.add_argument('--bootstrap', default=DEFAULT_BOOTSTRAP, help='SQL run once when creating the template')
+    parser.add_argument('--prod-snapshot', default=DEFAULT_SNAPSHOT_PATH,
+                        help=f'PROD catalog snapshot (default: {DEFAULT_SNAPSHOT_PATH})')
+    parser.add_argument('--schemas', default='public', help='Comma-separated schemas to compare (default: public)')
+    parser.add_argument('--out', help='Write the structural diff as JSON here')
+    parser.add_argument('--rebuild', action='store_true', help='Drop the template and replay everything')
+    args = parser.parse_args()
+
+    if not args.admin_url:
+        parser.error('--admin-url or $SHADOW_DATABASE_URL is required')
+
+    t0 = time.perf_counter()
+    applied, failure = replay(args.admin_url, args.template, args.migrations_dir,
+                              args.bootstrap, rebuild=args.rebuild)
+    if failure:
+        print(f"\nReplay stopped at {failure['file']}:\n{failure['error']}")
+        if failure['dirty']:
+            print("It ran outside a single transaction, so the template is marked dirty; the next run rebuilds it.")
+        else:
+            print("The template is checkpointed before that file; fix it and re-run.")
+        sys.exit(1)
+
+    schemas = [s.strip() for s in args.schemas.split(',') if s.strip()]
+    shadow = snapshot_template(args.admin_url, args.template, schemas)
+    with open(args.prod_snapshot, 'r', encoding='utf-8') as f:
+        prod = json.load(f)
+    diff = compare_snapshots(shadow, prod)
+
+    print(f"\nShadow vs PROD ({applied} migration(s) replayed, {time.perf_counter() - t0:.1f}s):")
+    if not diff:
+        print("  no structural differences")
+    for kind, d in diff.items():
+        print(f"  {kind}: {len(d['missing'])} missing from PROD, {len(d['extra'])} only in PROD, "
+              f"{len(d['changed'])} changed")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(diff, f, indent=1)
+            f.write('\n')
+        print(f"Diff written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1119 @@
+"""
+Streaming SQL lexer for migration triage.
+
+Understands -- and nested /* */ comments, '...' / E'...' string literals,
+"quoted" identifiers and $tag$ dollar-quoted bodies, so comment markers and
+semicolons inside literals or function bodies never split or hide a
+statement. The file is tokenized once, split into statements at top-level
+semicolons, and each statement is classified from its leading keywords in
+a single pass. Every scanner alternative is anchored and bounded, so cost is
+linear in file size with no backtracking across the file.
+
+DO blocks are executed at migration time, so their bodies are lexed and
+the DDL/DML inside them is classified too. Function bodies are not: they
+define code, they don't run it.
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+# Bump whenever tokenizing or classification output changes; cached parse
+# results from other versions are ignored (see parse_cache.py).
+LEXER_VERSION = 5
+
+# kind: 'word' | 'qident' | 'string' | 'dollar' | 'number' | 'op'
+# value: identifier text / literal contents / operator
+# pos: offset of the token in the source
+# upper: uppercased text for words, None otherwise
+Token = namedtuple('Token', 'kind value pos upper')
+
+Statement = namedtuple('Statement', 'tokens start end')
+
+_SCAN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<dollar>\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$)
+  | (?P<estring>[Ee]'(?:[^'\\]|\\.|'')*')
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<qident>"(?:[^"]|"")*")
+  | (?P<number>\d+(?:\.\d*)?(?:[Ee][+-]?\d+)?|\.\d+)
+  | (?P<word>[A-Za-z_\u0080-\uffff][A-Za-z0-9_$\u0080-\uffff]*)
+  | (?P<op>::|<=|>=|<>|!=|->>|->|\#>>|\#>|@>|<@|\|\||[^\s])
+""", re.VERBOSE)
+
+
+def tokenize(sql, base=0):
+    """Yield Tokens for `sql`; comments and whitespace are dropped."""
+    pos = 0
+    n = len(sql)
+    match = _SCAN_RE.match
+    while pos < n:
+        m = match(sql, pos)
+        kind = m.lastgroup
+        end = m.end()
+        if kind == 'ws' or kind == 'line_comment':
+            pass
+        elif kind == 'block_comment':
+            end = _skip_block_comment(sql, end)
+        elif kind == 'dollar':
+            tag = m.group()
+            close = sql.find(tag, end)
+            if close < 0:
+                close = n
+            yield Token('dollar', sql[end:close], base + pos, None)
+            end = min(n, close + len(tag))
+        elif kind == 'string':
+            yield Token('string', m.group()[1:-1].replace("''", "'"), base + pos, None)
+        elif kind == 'estring':
+            yield Token('string', m.group()[2:-1], base + pos, None)
+        elif kind == 'qident':
+            yield Token('qident', m.group()[1:-1].replace('""', '"'), base + pos, None)
+        elif kind == 'word':
+            w = m.group()
+            yield Token('word', w, base + pos, w.upper())
+        else:
+            yield Token(kind, m.group(), base + pos, None)
+        pos = end
+
+
+def _skip_block_comment(sql, pos):
+    """Return the offset just past a (possibly nested) block comment."""
+    depth = 1
+    n = len(sql)
+    while depth and pos < n:
+        nxt_close = sql.find('*/', pos)
+        if nxt_close < 0:
+            return n
+        nxt_open = sql.find('/*', pos, nxt_close)
+        if nxt_open >= 0:
+            depth += 1
+            pos = nxt_open + 2
+        else:
+            depth -= 1
+            pos = nxt_close + 2
+    return pos
+
+
+def split_statements(sql, base=0):
+    """Yield Statements split at top-level semicolons."""
+    tokens = []
+    for tok in tokenize(sql, base):
+        if tok.kind == 'op' and tok.value == ';':
+            if tokens:
+                yield Statement(tokens, tokens[0].pos, tok.pos + 1)
+            tokens = []
+        else:
+            tokens.append(tok)
+    if tokens:
+        last = tokens[-1]
+        yield Statement(tokens, tokens[0].pos, last.pos + max(1, len(last.value)))
+
+
+# ── Body fingerprints ──────────────────────────────────────────────────────────
+
+# Words that can continue a type name after `::`
+_CAST_CONTINUATIONS = {'VARYING', 'PRECISION'}
+
+# Words that end a FROM item instead of aliasing it
+_NOT_ALIASES = frozenset([
+    'WHERE', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'CROSS', 'NATURAL', 'ON', 'USING', 'GROUP',
+    'ORDER', 'LIMIT', 'OFFSET', 'HAVING', 'WINDOW', 'UNION', 'EXCEPT', 'INTERSECT', 'FOR',
+    'RETURNING', 'FETCH', 'AND', 'OR', 'THEN', 'ELSE', 'END', 'WHEN', 'TABLESAMPLE'])
+_JOIN_WORDS = frozenset(['JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'CROSS', 'NATURAL'])
+
+# Binding strength of operators when deciding whether parentheses matter
+# (Postgres precedence, loosest first); other symbols rank as 7
+_PRECEDENCE = {
+    'OR': 1, 'AND': 2, 'NOT': 3, 'IS': 4, 'ISNULL': 4, 'NOTNULL': 4,
+    '<': 5, '>': 5, '=': 5, '<=': 5, '>=': 5, '<>': 5, '!=': 5,
+    'BETWEEN': 6, 'IN': 6, 'LIKE': 6, 'ILIKE': 6, 'SIMILAR': 6,
+    '+': 8, '-': 8, '*': 9, '/': 9, '%': 9, '^': 10,
+}
+_OTHER_OPERATOR = 7
+_TIGHTEST = 99
+
+# Words after which `(` groups an expression rather than calling a function
+# or opening a list
+_GROUPING_AFTER = frozenset([
+    'AND', 'OR', 'NOT', 'WHERE', 'WHEN', 'THEN', 'ELSE', 'CASE', 'SELECT', 'ON', 'HAVING',
+    'RETURN', 'BY', 'LIMIT', 'OFFSET', 'DISTINCT', 'USING', 'CHECK', 'FROM', 'JOIN'])
+
+
+def _single_relation_names(toks):
+    """Lowercased name and alias of every FROM that reads exactly one relation.
+
+    Postgres qualifies columns inside subqueries when it deparses them
+    (members.org_id), where migrations usually don't; with one relation in
+    scope the qualifier carries nothing, so these are dropped. Joins keep
+    their qualifiers.
+    """
+    names = set()
+    n = len(toks)
+    for i, t in enumerate(toks):
+        if t.upper != 'FROM' or (i and toks[i - 1].upper == 'DISTINCT'):
+            continue
+        j = i + 1
+        while j < n and (toks[j].kind == 'op' and toks[j].value == '(' or toks[j].upper in ('LATERAL', 'ONLY')):
+            j += 1
+        if j >= n or toks[j].kind not in ('word', 'qident') or toks[j].upper in ('SELECT', 'WITH', 'VALUES'):
+            continue
+        while j + 2 < n and toks[j + 1].kind == 'op' and toks[j + 1].value == '.' \
+                and toks[j + 2].kind in ('word', 'qident'):
+            j += 2
+        found = [toks[j].value.lower()]
+        j += 1
+        if j < n and toks[j].upper == 'AS':
+            j += 1
+        if j < n and (toks[j].kind == 'qident' or toks[j].kind == 'word' and toks[j].upper not in _NOT_ALIASES):
+            found.append(toks[j].value.lower())
+            j += 1
+        if j < n and (toks[j].upper in _JOIN_WORDS or toks[j].kind == 'op' and toks[j].value == ','):
+            continue
+        names.update(found)
+    return names
+
+
+def _is_operator(s):
+    """Is this normalized token an operator symbol (not a name, literal or number)?"""
+    c = s[0]
+    return not (c.isalnum() or c in '_\'"$' or ord(c) > 127 or (c == '.' and len(s) > 1))
+
+
+def _prefix_position(prev):
+    """Does an operator after `prev` start an operand (NOT x, -x) rather than join two?"""
+    if prev is None:
+        return True
+    if isinstance(prev, list):
+        return False
+    if _is_operator(prev):
+        return prev not in (')', ']')
+    return prev in _PRECEDENCE or prev in _GROUPING_AFTER
+
+
+def _content_level(items):
+    """Loosest operator at the top level of a group; None if it holds a list."""
+    level = _TIGHTEST
+    brackets = cases = 0
+    prev = None
+    for x in items:
+        if isinstance(x, list):
+            prev = x
+            continue
+        if x == '[':
+            brackets += 1
+        elif x == ']':
+            brackets -= 1
+        elif x == 'CASE':
+            cases += 1
+        elif x == 'END' and cases:
+            cases -= 1
+        elif not brackets and not cases:
+            if x == ',':
+                return None
+            if x == 'NOT':
+                if _prefix_position(prev):
+                    level = min(level, _PRECEDENCE['NOT'])
+            elif x in _PRECEDENCE:
+                if not (x in ('-', '+') and _prefix_position(prev)):
+                    level = min(level, _PRECEDENCE[x])
+            elif _is_operator(x) and x != '.':
+                level = min(level, _OTHER_OPERATOR)
+        prev = x
+    return level
+
+
+def _neighbor_level(s, before):
+    """How tightly the token next to a group pulls on it (0 = not at all)."""
+    if s is None or isinstance(s, list) or s == ',':
+        return 0
+    if s in ('.', '['):
+        return _TIGHTEST
+    if s == 'NOT':
+        return _PRECEDENCE['NOT'] if before else _PRECEDENCE['IN']  # NOT x / (x) NOT IN
+    if s in _PRECEDENCE:
+        return _PRECEDENCE[s]
+    return _OTHER_OPERATOR if _is_operator(s) else 0
+
+
+def _drop_redundant_parens(seq):
+    """Splice out groups whose parentheses don't change how the expression binds.
+
+    `seq` is a paren tree (groups as lists); inner groups go first, so
+    ((a OR b)) after AND keeps one pair.
+    """
+    result = []
+    for k, x in enumerate(seq):
+        if not isinstance(x, list):
+            result.append(x)
+            continue
+        inner = _drop_redundant_parens(x)
+        prev = result[-1] if result else None
+        following = seq[k + 1] if k + 1 < len(seq) else None
+        grouping = prev is None or (not isinstance(prev, list) and (
+            prev in _GROUPING_AFTER if not _is_operator(prev) else prev not in (')', ']')))
+        level = _content_level(inner) if grouping and inner and inner[0] not in ('SELECT', 'WITH', 'VALUES') \
+            else None
+        if level is not None:
+            outside = max(_neighbor_level(prev, True), _neighbor_level(following, False))
+            # AND and OR are associative: (a AND b) AND c needs no parentheses
+            if level > outside or level == outside and level in (_PRECEDENCE['OR'], _PRECEDENCE['AND']):
+                result.extend(inner)
+                continue
+        result.append(inner)
+    return result
+
+
+# Postgres deparses LIKE and ILIKE as their operator spellings; the lexer
+# scans those one character at a time
+_LIKE_OPERATORS = (
+    (('!', '~', '~', '*'), ['NOT', 'ILIKE']),
+    (('!', '~', '~'), ['NOT', 'LIKE']),
+    (('~', '~', '*'), ['ILIKE']),
+    (('~', '~'), ['LIKE']),
+)
+
+
+def _like_operator(toks, i):
+    """(symbols, words) for a ~~-style operator starting at toks[i], else None."""
+    for symbols, words in _LIKE_OPERATORS:
+        window = toks[i:i + len(symbols)]
+        if len(window) == len(symbols) and all(t.kind == 'op' and t.value == v for t, v in zip(window, symbols)):
+            return symbols, words
+    return None
+
+
+def _is_literal(s):
+    return s[0] == "'" or s[0].isdigit()
+
+
+def _fold_in_lists(items):
+    """x [NOT] IN ('a', 'b') as Postgres deparses it: x = ANY (ARRAY['a', 'b']) / x <> ALL (...)."""
+    out = []
+    i = 0
+    n = len(items)
+    while i < n:
+        if items[i] == 'IN' and i + 1 < n and items[i + 1] == '(':
+            j = i + 2
+            values = []
+            while j < n and _is_literal(items[j]):
+                values.append(items[j])
+                if j + 1 < n and items[j + 1] == ',':
+                    j += 2
+                else:
+                    j += 1
+                    break
+            if values and j < n and items[j] == ')' and items[j - 1] != ',':
+                negated = bool(out) and out[-1] == 'NOT'
+                if negated:
+                    out.pop()
+                out += ['<>', 'ALL'] if negated else ['=', 'ANY']
+                out += ['(', 'ARRAY', '[']
+                for k, v in enumerate(values):
+                    out += [',', v] if k else [v]
+                out += [']', ')']
+                i = j + 1
+                continue
+        out.append(items[i])
+        i += 1
+    return out
+
+
+def _paren_tree(items):
+    stack = [[]]
+    for s in items:
+        if s == '(':
+            stack.append([])
+        elif s == ')' and len(stack) > 1:
+            group = stack.pop()
+            stack[-1].append(group)
+        else:
+            stack[-1].append(s)
+    while len(stack) > 1:
+        group = stack.pop()
+        stack[-1].append(group)
+    return stack[0]
+
+
+def _flatten(seq, out):
+    for x in seq:
+        if isinstance(x, list):
+            out.append('(')
+            _flatten(x, out)
+            out.append(')')
+        else:
+            out.append(x)
+    return out
+
+
+def normalize_tokens(toks):
+    """
+    Canonical token stream for comparing SQL bodies: comments and
+    whitespace are already gone; keywords and unquoted names are
+    case-folded, a trailing `;`, `::type` casts and `public.` qualifiers
+    are dropped, EXECUTE PROCEDURE is read as EXECUTE FUNCTION, ~~ as LIKE,
+    and IN over a list of literals as = ANY (ARRAY[...]). Column
+    qualifiers naming the only relation of a FROM are dropped, and so are
+    parentheses that don't change precedence, since Postgres adds both when
+    it deparses. That lets source text from a migration match Postgres'
+    deparsed form (pg_get_expr / pg_get_viewdef / pg_get_triggerdef) for
+    the common cases, while (a AND b) OR c and a AND (b OR c) still differ.
+    """
+    toks = list(toks)
+    while toks and toks[-1].kind == 'op' and toks[-1].value == ';':
+        toks.pop()
+    qualifiers = _single_relation_names(toks)
+    out = []
+    i = 0
+    n = len(toks)
+    while i < n:
+        t = toks[i]
+        if t.kind == 'op':
+            if t.value == '::':
+                i += 2  # the type name
+                while i + 1 < n and toks[i].kind == 'op' and toks[i].value == '.':
+                    i += 2
+                while i < n and toks[i].upper in _CAST_CONTINUATIONS:
+                    i += 1
+                if i < n and toks[i].value == '(' and toks[i].kind == 'op':
+                    while i < n and not (toks[i].kind == 'op' and toks[i].value == ')'):
+                        i += 1  # type modifier, e.g. varchar(10)
+                    i += 1
+                if i + 2 < n and toks[i].upper in ('WITH', 'WITHOUT') and toks[i + 1].upper == 'TIME':
+                    i += 3
+                while i + 1 < n and toks[i].value == '[' and toks[i + 1].value == ']':
+                    i += 2
+                continue
+            like = _like_operator(toks, i)
+            if like:
+                out += like[1]
+                i += len(like[0])
+                continue
+            out.append(t.value)
+        elif t.kind in ('word', 'qident') and i + 2 < n and toks[i + 1].kind == 'op' \
+                and toks[i + 1].value == '.' and toks[i + 2].kind in ('word', 'qident') \
+                and (t.upper == 'PUBLIC' or t.value.lower() in qualifiers) and not (out and out[-1] == '.'):
+            i += 2
+            continue
+        elif t.kind == 'word':
+            if t.upper == 'PROCEDURE' and out and out[-1] == 'EXECUTE':
+                out.append('FUNCTION')
+            else:
+                out.append(t.upper)
+        elif t.kind == 'string':
+            out.append("'" + t.value)
+        elif t.kind == 'qident':
+            out.append('"' + t.value)
+        elif t.kind == 'dollar':
+            out.append('$' + ' '.join(normalize_tokens(tokenize(t.value))))
+        else:
+            out.append(t.value)
+        i += 1
+    return _flatten(_drop_redundant_parens(_paren_tree(_fold_in_lists(out))), [])
+
+
+def fingerprint_tokens(toks):
+    """Short stable hash of a normalized token stream."""
+    return hashlib.sha1('\x1f'.join(normalize_tokens(toks)).encode('utf-8')).hexdigest()[:16]
+
+
+def fingerprint_sql(sql):
+    return fingerprint_tokens(tokenize(sql or ''))
+
+
+def tokens_sql(toks):
+    """Re-render tokens as single-spaced SQL (quotes restored)."""
+    parts = []
+    for t in toks:
+        if t.kind == 'string':
+            parts.append("'" + t.value.replace("'", "''") + "'")
+        elif t.kind == 'qident':
+            parts.append('"' + t.value.replace('"', '""') + '"')
+        elif t.kind == 'dollar':
+            parts.append('$$' + t.value + '$$')
+        else:
+            parts.append(t.value)
+    return ' '.join(parts)
+
+
+# ── Statement classification ──────────────────────────────────────────────────
+
+STATEMENT_KEYWORDS = {'CREATE', 'DROP', 'ALTER', 'INSERT', 'UPDATE', 'DELETE', 'GRANT'}
+
+
+class _Cursor:
+    """Keyword-matching cursor over one statement's tokens."""
+
+    __slots__ = ('toks', 'i')
+
+    def __init__(self, toks, i=0):
+        self.toks = toks
+        self.i = i
+
+    def done(self):
+        return self.i >= len(self.toks)
+
+    def peek(self, k=0):
+        j = self.i + k
+        return self.toks[j] if j < len(self.toks) else None
+
+    def is_kw(self, *kws, k=0):
+        t = self.peek(k)
+        return t is not None and t.upper in kws
+
+    def accept(self, *seq):
+        """Consume the keyword sequence if it is next; return whether it was."""
+        for k, kw in enumerate(seq):
+            if not self.is_kw(kw, k=k):
+                return False
+        self.i += len(seq)
+        return True
+
+    def accept_op(self, op):
+        t = self.peek()
+        if t is not None and t.kind == 'op' and t.value == op:
+            self.i += 1
+            return True
+        return False
+
+    def name(self):
+        """Read a possibly-qualified identifier; None if the next token isn't one."""
+        parts = []
+        while True:
+            t = self.peek()
+            if t is None or t.kind not in ('word', 'qident'):
+                break
+            parts.append(t.value.lower() if t.kind == 'word' else t.value)
+            self.i += 1
+            if not self.accept_op('.'):
+                break
+        if not parts:
+            return None
+        if len(parts) > 1 and parts[0] == 'public':
+            parts = parts[1:]
+        return '.'.join(parts)
+
+    def skip_group(self):
+        """Skip a balanced (...) group if one is next."""
+        if not self.accept_op('('):
+            return
+        depth = 1
+        while depth and not self.done():
+            t = self.toks[self.i]
+            if t.kind == 'op':
+                if t.value == '(':
+                    depth += 1
+                elif t.value == ')':
+                    depth -= 1
+            self.i += 1
+
+    def group_items(self):
+        """
+        Consume a balanced (...) group and return its top-level
+        comma-separated items as token lists.
+        """
+        items = []
+        if not self.accept_op('('):
+            return items
+        depth = 1
+        cur = []
+        while not self.done():
+            t = self.toks[self.i]
+            self.i += 1
+            if t.kind == 'op':
+                if t.value == '(':
+                    depth += 1
+                elif t.value == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                elif t.value == ',' and depth == 1:
+                    items.append(cur)
+                    cur = []
+                    continue
+            cur.append(t)
+        if cur:
+            items.append(cur)
+        return items
+
+    def name_list(self):
+        """Read `name[(args)], name[(args)] ...`."""
+        names = []
+        while True:
+            n = self.name()
+            if n is None:
+                break
+            names.append(n)
+            self.skip_group()
+            if not self.accept_op(','):
+                break
+        return names
+
+
+def _op(op_type, args, **detail):
+    op = {'type': op_type, 'args': [a for a in args if a is not None]}
+    if detail:
+        op['detail'] = detail
+    return op
+
+
+def _split_top_level(toks, start):
+    """Split toks[start:] at depth-0 commas."""
+    parts = []
+    cur = []
+    depth = 0
+    for t in toks[start:]:
+        if t.kind == 'op':
+            if t.value == '(':
+                depth += 1
+            elif t.value == ')':
+                depth -= 1
+            elif t.value == ',' and depth == 0:
+                parts.append(cur)
+                cur = []
+                continue
+        cur.append(t)
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+_TABLE_CONSTRAINT_KWS = frozenset(
+    ('CONSTRAINT', 'PRIMARY', 'UNIQUE', 'FOREIGN', 'CHECK', 'EXCLUDE', 'LIKE'))
+
+# Keywords that end a column's type / DEFAULT expression
+_COLUMN_CONSTRAINT_KWS = frozenset(
+    ('CONSTRAINT', 'NOT', 'NULL', 'DEFAULT', 'REFERENCES', 'PRIMARY', 'UNIQUE',
+     'CHECK', 'GENERATED', 'COLLATE'))
+
+
+def _column_detail(toks):
+    """Type, DEFAULT expression, REFERENCES target and key flag of a column definition (after its name)."""
+    segments = [[]]
+    depth = 0
+    for t in toks:
+        if t.kind == 'op':
+            depth += (t.value == '(') - (t.value == ')')
+        elif depth == 0 and t.upper in _COLUMN_CONSTRAINT_KWS:
+            segments.append([])
+        segments[-1].append(t)
+    detail = {'type': tokens_sql(segments[0]) or None, 'default': None, 'references': None, 'key': False}
+    for seg in segments[1:]:
+        head = seg[0].upper
+        if head == 'DEFAULT':
+            detail['default'] = tokens_sql(seg[1:]) or None
+        elif head == 'REFERENCES':
+            detail['references'] = _Cursor(seg, 1).name()
+        elif head in ('PRIMARY', 'UNIQUE'):
+            detail['key'] = True
+    return detail
+
+
+def _key_columns(c):
+    """Column names of the (...) list at the cursor; None for expressions."""
+    return [item[0].value.lower() if item[0].kind == 'word' else item[0].value
+            for item in c.group_items() if item]
+
+
+def _table_constraint(c):
+    """(kind, columns, referenced table) for PRIMARY KEY / UNIQUE / FOREIGN KEY at the cursor."""
+    if c.accept('PRIMARY', 'KEY'):
+        return 'primary', _key_columns(c), None
+    if c.accept('UNIQUE'):
+        c.accept('NULLS', 'NOT', 'DISTINCT')
+        return 'unique', _key_columns(c), None
+    if c.accept('FOREIGN', 'KEY'):
+        columns = _key_columns(c)
+        c.accept('REFERENCES')
+        return 'foreign', columns, c.name()
+    return None, [], None
+
+
+def _policy_detail(c):
+    """cmd / roles / USING / WITH CHECK of a CREATE POLICY, after `ON table`."""
+    cmd = 'ALL'
+    roles = []
+    using = check = None
+    while not c.done():
+        if c.accept('FOR'):
+            t = c.peek()
+            cmd = t.upper if t is not None and t.upper else cmd
+            c.i += 1
+        elif c.accept('TO'):
+            while not c.done():
+                t = c.peek()
+                roles.append(t.value.lower() if t.kind == 'word' else t.value)
+                c.i += 1
+                if not c.accept_op(','):
+                    break
+        elif c.accept('USING'):
+            using = _group_tokens(c)
+        elif c.accept('WITH', 'CHECK'):
+            check = _group_tokens(c)
+        else:
+            c.i += 1
+    return {
+        'cmd': cmd,
+        'roles': roles or ['public'],
+        'using': tokens_sql(using) if using is not None else None,
+        'with_check': tokens_sql(check) if check is not None else None,
+        'body_fp': policy_fingerprint(cmd, using, check),
+    }
+
+
+def policy_fingerprint(cmd, using_toks, check_toks):
+    """Fingerprint of a policy's command and expressions (token lists or None)."""
+    toks = [Token('word', (cmd or 'ALL').upper(), 0, (cmd or 'ALL').upper()),
+            Token('word', 'USING', 0, 'USING')] + list(using_toks or []) + \
+           [Token('word', 'CHECK', 0, 'CHECK')] + list(check_toks or [])
+    return fingerprint_tokens(toks)
+
+
+def _group_tokens(c):
+    """Tokens inside the balanced (...) group at the cursor (exclusive)."""
+    start = c.i + 1
+    c.skip_group()
+    return c.toks[start:c.i - 1]
+
+
+def _function_detail(c):
+    """Language, volatility, SECURITY DEFINER and body fingerprint of a CREATE FUNCTION."""
+    c.skip_group()  # arguments
+    detail = {'language': None, 'volatility': 'VOLATILE', 'security_definer': False, 'body_fp': None}
+    while not c.done():
+        t = c.peek()
+        if c.accept('LANGUAGE'):
+            lang = c.peek()
+            if lang is not None:
+                detail['language'] = lang.value.lower()
+                c.i += 1
+        elif t.upper in ('IMMUTABLE', 'STABLE', 'VOLATILE'):
+            detail['volatility'] = t.upper
+            c.i += 1
+        elif c.accept('SECURITY', 'DEFINER'):
+            detail['security_definer'] = True
+        elif c.accept('AS'):
+            body = c.peek()
+            if body is not None and body.kind in ('dollar', 'string'):
+                detail['body_fp'] = fingerprint_sql(body.value)
+                c.i += 1
+        else:
+            c.i += 1
+    return detail
+
+
+def _classify_create(c):
+    c.accept('OR', 'REPLACE')
+    unique = c.accept('UNIQUE')
+    c.accept('TEMPORARY') or c.accept('TEMP')
+    c.accept('UNLOGGED')
+    c.accept('CONSTRAINT')
+
+    if c.accept('TABLE'):
+        c.accept('IF', 'NOT', 'EXISTS')
+        table = c.name()
+        if not table:
+            return []
+        columns = []
+        keys = []          # column lists backed by a PRIMARY KEY / UNIQUE index
+        foreign_keys = []  # column lists with a REFERENCES clause
+        types = {}
+        for item in c.group_items():
+            first = item[0] if item else None
+            if first is None:
+                continue
+            if first.upper in _TABLE_CONSTRAINT_KWS:
+                ic = _Cursor(item)
+                if ic.accept('CONSTRAINT'):
+                    ic.name()
+                kind, cols, _ = _table_constraint(ic)
+                if kind == 'foreign':
+                    foreign_keys.append(cols)
+                elif kind:
+                    keys.append(cols)
+                continue
+            if first.kind not in ('word', 'qident'):
+                continue
+            col = first.value.lower() if first.kind == 'word' else first.value
+            columns.append(col)
+            col_detail = _column_detail(item[1:])
+            types[col] = col_detail['type']
+            if col_detail['references']:
+                foreign_keys.append([col])
+            if col_detail['key']:
+                keys.append([col])
+        return [_op('CREATE_TABLE', [table], columns=columns, types=types,
+                    keys=keys, foreign_keys=foreign_keys)]
+
+    if c.accept('INDEX'):
+        concurrently = c.accept('CONCURRENTLY')
+        c.accept('IF', 'NOT', 'EXISTS')
+        name = None if c.is_kw('ON') else c.name()
+        if not c.accept('ON'):
+            return []
+        c.accept('ONLY')
+        table = c.name()
+        if c.accept('USING'):
+            c.name()
+        columns = []
+        for item in c.group_items():
+            head = item[0] if item else None
+            if (head is not None and head.kind in ('word', 'qident')
+                    and not (len(item) > 1 and item[1].kind == 'op')):
+                # plain column, possibly with ASC/DESC/opclass
+                columns.append(head.value.lower() if head.kind == 'word' else head.value)
+            else:
+                columns.append(None)  # expression
+        if name is None and table:
+            # Postgres' generated name for simple column indexes
+            simple = [col for col in columns if col]
+            name = f"{table.split('.')[-1]}_{'_'.join(simple) or 'expr'}_idx"
+        return [_op('CREATE_INDEX', [name, table], unique=unique,
+                    concurrently=concurrently, columns=columns)] if table else []
+
+    if c.accept('POLICY'):
+        name = c.name()
+        if not c.accept('ON'):
+            return []
+        table = c.name()
+        if not (name and table):
+            return []
+        return [_op('CREATE_POLICY', [name, table], **_policy_detail(c))]
+
+    if c.accept('FUNCTION') or c.accept('PROCEDURE'):
+        name = c.name()
+        if not name:
+            return []
+        return [_op('CREATE_FUNCTION', [name], **_function_detail(c))]
+
+    c.accept('RECURSIVE')
+    if c.accept('VIEW'):
+        c.accept('IF', 'NOT', 'EXISTS')
+        name = c.name()
+        if not name:
+            return []
+        c.skip_group()  # column list
+        while not c.done() and not c.is_kw('AS'):
+            c.i += 1  # WITH (options)
+        c.accept('AS')
+        return [_op('CREATE_VIEW', [name], body_fp=fingerprint_tokens(c.toks[c.i:]))]
+
+    if c.accept('TYPE'):
+        name = c.name()
+        if name and c.accept('AS', 'ENUM'):
+            labels = [t[0].value for t in c.group_items() if t and t[0].kind == 'string']
+            return [_op('CREATE_ENUM', [name], labels=labels)]
+        return []
+
+    if c.accept('TRIGGER'):
+        name = c.name()
+        definition = c.toks[c.i:]
+        while not c.done() and not c.is_kw('ON'):
+            c.i += 1
+        if not c.accept('ON'):
+            return []
+        table = c.name()
+        if not (name and table):
+            return []
+        return [_op('CREATE_TRIGGER', [name, table], body_fp=fingerprint_tokens(definition))]
+
+    if c.accept('EXTENSION'):
+        c.accept('IF', 'NOT', 'EXISTS')
+        name = c.name()
+        return [_op('CREATE_EXTENSION', [name])] if name else []
+
+    if c.accept('SCHEMA'):
+        c.accept('IF', 'NOT', 'EXISTS')
+        name = c.name()
+        return [_op('CREATE_SCHEMA', [name])] if name else []
+
+    return []
+
+
+_DROP_KINDS = {
+    'TABLE': 'DROP_TABLE',
+    'INDEX': 'DROP_INDEX',
+    'FUNCTION': 'DROP_FUNCTION',
+    'PROCEDURE': 'DROP_FUNCTION',
+    'VIEW': 'DROP_VIEW',
+    'TYPE': 'DROP_TYPE',
+}
+
+
+def _classify_drop(c):
+    for kw, op_type in _DROP_KINDS.items():
+        if c.accept(kw):
+            c.accept('CONCURRENTLY')
+            c.accept('IF', 'EXISTS')
+            return [_op(op_type, [n]) for n in c.name_list()]
+
+    for kw, op_type in (('POLICY', 'DROP_POLICY'), ('TRIGGER', 'DROP_TRIGGER')):
+        if c.accept(kw):
+            c.accept('IF', 'EXISTS')
+            name = c.name()
+            if not c.accept('ON'):
+                return []
+            table = c.name()
+            return [_op(op_type, [name, table])] if name and table else []
+
+    return []
+
+
+def _classify_alter_action(table, toks):
+    c = _Cursor(toks)
+
+    if c.accept('ADD'):
+        name = c.name() if c.accept('CONSTRAINT') else None
+        if name or c.is_kw('PRIMARY', 'UNIQUE', 'FOREIGN', 'CHECK', 'EXCLUDE'):
+            kind, cols, ref = _table_constraint(c)
+            if name is None and kind and all(cols):
+                # Postgres' generated constraint names
+                base = table.split('.')[-1]
+                name = {'primary': f"{base}_pkey",
+                        'unique': f"{base}_{'_'.join(cols)}_key",
+                        'foreign': f"{base}_{'_'.join(cols)}_fkey"}[kind]
+            if not name:
+                return []
+            detail = {}
+            if kind == 'foreign':
+                detail = {'foreign_key': cols, 'references': ref}
+            elif kind:
+                detail = {'key': cols}
+            return [_op('ADD_CONSTRAINT', [table, name], **detail)]
+        c.accept('COLUMN')
+        c.accept('IF', 'NOT', 'EXISTS')
+        col = c.name()
+        return [_op('ADD_COLUMN', [table, col], **_column_detail(c.toks[c.i:]))] if col else []
+
+    if c.accept('DROP'):
+        if c.accept('CONSTRAINT'):
+            c.accept('IF', 'EXISTS')
+            name = c.name()
+            return [_op('DROP_CONSTRAINT', [table, name])] if name else []
+        c.accept('COLUMN')
+        c.accept('IF', 'EXISTS')
+        col = c.name()
+        return [_op('DROP_COLUMN', [table, col])] if col else []
+
+    if c.accept('ALTER'):
+        if c.is_kw('CONSTRAINT'):
+            return []
+        c.accept('COLUMN')
+        col = c.name()
+        action = None
+        if c.accept('SET', 'DATA', 'TYPE') or c.accept('TYPE'):
+            type_toks = c.toks[c.i:]
+            for k, t in enumerate(type_toks):
+                if t.upper in ('USING', 'COLLATE'):
+                    type_toks = type_toks[:k]
+                    break
+            return [_op('ALTER_COLUMN', [table, col], action='type', type=tokens_sql(type_toks),
+                        using=c.is_kw('USING', k=len(type_toks)))] if col else []
+        elif c.accept('SET', 'DEFAULT') or c.accept('DROP', 'DEFAULT'):
+            action = 'default'
+        elif c.accept('SET', 'NOT', 'NULL') or c.accept('DROP', 'NOT', 'NULL'):
+            action = 'nullability'
+        return [_op('ALTER_COLUMN', [table, col], action=action)] if col else []
+
+    if c.accept('RENAME'):
+        if c.accept('TO'):
+            new = c.name()
+            return [_op('RENAME_TABLE', [table, new])] if new else []
+        if c.is_kw('CONSTRAINT'):
+            return []
+        c.accept('COLUMN')
+        old = c.name()
+        if old and c.accept('TO'):
+            new = c.name()
+            return [_op('RENAME_COLUMN', [table, old, new])] if new else []
+        return []
+
+    if c.accept('ENABLE', 'ROW', 'LEVEL', 'SECURITY'):
+        return [_op('ENABLE_RLS', [table])]
+    if c.accept('DISABLE', 'ROW', 'LEVEL', 'SECURITY'):
+        return [_op('DISABLE_RLS', [table])]
+
+    return []
+
+
+def _classify_alter(c):
+    if c.accept('TABLE'):
+        c.accept('IF', 'EXISTS')
+        c.accept('ONLY')
+        table = c.name()
+        if not table:
+            return []
+        ops = []
+        for action in _split_top_level(c.toks, c.i):
+            ops.extend(_classify_alter_action(table, action))
+        return ops
+
+    if c.accept('TYPE'):
+        name = c.name()
+        if name and c.accept('ADD', 'VALUE'):
+            c.accept('IF', 'NOT', 'EXISTS')
+            t = c.peek()
+            label = t.value if t is not None and t.kind == 'string' else None
+            return [_op('ALTER_ENUM_ADD', [name, label])]
+        return []
+
+    return []
+
+
+def _classify_grant(c):
+    depth = 0
+    while not c.done():
+        t = c.peek()
+        if t.kind == 'op':
+            depth += (t.value == '(') - (t.value == ')')
+        elif depth == 0 and t.upper == 'ON':
+            c.i += 1
+            c.accept('TABLE') or c.accept('FUNCTION') or c.accept('SEQUENCE') or c.accept('SCHEMA')
+            if c.accept('ALL'):
+                c.name()  # TABLES / FUNCTIONS / SEQUENCES
+                c.accept('IN', 'SCHEMA')
+            name = c.name()
+            return [_op('GRANT', [name])] if name else []
+        c.i += 1
+    return []
+
+
+def _classify_dml(c):
+    # Skip a leading WITH ... CTE list to the first top-level DML keyword
+    if c.accept('WITH'):
+        c.accept('RECURSIVE')
+        depth = 0
+        while not c.done():
+            t = c.peek()
+            if t.kind == 'op':
+                depth += (t.value == '(') - (t.value == ')')
+            elif depth == 0 and t.upper in ('INSERT', 'UPDATE', 'DELETE'):
+                break
+            c.i += 1
+
+    if c.accept('INSERT', 'INTO'):
+        table = c.name()
+        return [_op('INSERT_INTO', [table])] if table else []
+    if c.accept('UPDATE'):
+        c.accept('ONLY')
+        table = c.name()
+        return [_op('UPDATE_TABLE', [table])] if table else []
+    if c.accept('DELETE', 'FROM'):
+        c.accept('ONLY')
+        table = c.name()
+        return [_op('DELETE_FROM', [table])] if table else []
+    return []
+
+
+def classify_tokens(toks):
+    """Classify one statement's tokens into zero or more ops."""
+    if not toks:
+        return []
+    c = _Cursor(toks)
+    head = toks[0].upper
+    if head == 'CREATE':
+        c.i = 1
+        return _classify_create(c)
+    if head == 'DROP':
+        c.i = 1
+        return _classify_drop(c)
+    if head == 'ALTER':
+        c.i = 1
+        return _classify_alter(c)
+    if head == 'GRANT':
+        c.i = 1
+        return _classify_grant(c)
+    if head in ('INSERT', 'UPDATE', 'DELETE', 'WITH'):
+        return _classify_dml(c)
+    return []
+
+
+def _literal_start(tok, text, base):
+    """Offset where a string or dollar literal's contents begin."""
+    if tok.kind == 'dollar':
+        return text.index('$', tok.pos - base + 1) + 1 + base
+    return tok.pos + 1
+
+
+def _classify_do_body(body, base):
+    """Classify statements executed inside a DO block's PL/pgSQL body."""
+    ops = []
+    for stmt in split_statements(body, base):
+        toks = stmt.tokens
+        # Skip PL/pgSQL control flow (BEGIN, IF ... THEN, LOOP, ...) to the
+        # first top-level statement keyword.
+        depth = 0
+        for k, t in enumerate(toks):
+            if t.kind == 'op':
+                depth += (t.value == '(') - (t.value == ')')
+            elif depth == 0 and t.upper in STATEMENT_KEYWORDS:
+                found = classify_tokens(toks[k:])
+                for op in found:
+                    op['_pos'] = t.pos
+                ops.extend(found)
+                break
+            elif depth == 0 and t.upper == 'EXECUTE' and k + 2 == len(toks) \
+                    and toks[k + 1].kind in ('dollar', 'string'):
+                # EXECUTE of one constant literal is static SQL; anything
+                # concatenated is dynamic and can't be known statically.
+                lit = toks[k + 1]
+                start = _literal_start(lit, body, base)
+                for inner in split_statements(lit.value, start):
+                    for op in classify_tokens(inner.tokens):
+                        op['_pos'] = inner.start
+                        ops.append(op)
+                break
+    return ops
+
+
+def _snippet(sql, start, end):
+    return ' '.join(sql[start:min(end, start + 400)].split())[:120]
+
+
+def classify_statement(stmt, sql):
+    """Classify a Statement from `sql`; returns ops with offsets and snippets."""
+    toks = stmt.tokens
+    if toks[0].upper == 'DO':
+        body = next((t for t in toks if t.kind == 'dollar'), None)
+        if body is None:
+            return []
+        # Body text starts just after the opening $tag$
+        body_start = sql.index('$', body.pos + 1) + 1
+        ops = _classify_do_body(body.value, body_start)
+        for op in ops:
+            pos = op.pop('_pos')
+            op['offset'] = pos
+            op['match'] = _snippet(sql, pos, stmt.end)
+            op['in_do_block'] = True
+        return ops
+
+    ops = classify_tokens(toks)
+    for op in ops:
+        op['offset'] = stmt.start
+        op['match'] = _snippet(sql, stmt.start, stmt.end)
+    return ops
+
+
+_TRANSACTION_HEADS = frozenset(['BEGIN', 'START', 'COMMIT', 'END', 'ROLLBACK', 'ABORT'])
+_TRANSACTION_NEXT = frozenset(['WORK', 'TRANSACTION', 'ISOLATION', 'READ', 'AND'])
+
+
+def has_transaction_control(sql_content):
+    """True if the file runs its own top-level BEGIN / COMMIT / ROLLBACK.
+
+    Bodies of DO blocks and functions are dollar-quoted, so their PL/pgSQL
+    BEGIN ... END never counts.
+    """
+    for stmt in split_statements(sql_content):
+        toks = stmt.tokens
+        if toks[0].upper in _TRANSACTION_HEADS and (len(toks) == 1 or toks[1].upper in _TRANSACTION_NEXT):
+            return True
+    return False
+
+
+def extract_ddl_ops(sql_content):
+    """Extract DDL/DML operations from migration SQL in one pass."""
+    ops = []
+    for stmt in split_statements(sql_content):
+        ops.extend(classify_statement(stmt, sql_content))
+    return ops
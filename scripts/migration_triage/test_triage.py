@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Test the migration triage tooling (sql_lexer.py) against inline SQL.
+No database access.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from sql_lexer import tokenize, split_statements, extract_ddl_ops, fingerprint_sql
+from parse_cache import parse_files
+from schema_model import SchemaModel
+import object_index
+from catalog import Catalog, SNAPSHOT_FORMAT
+from shadow_replay import DIRTY_PREFIX, plan_replay, compare_snapshots, needs_no_transaction
+import triage_store
+import migration_lint
+import rls_cost
+
+
+def op_list(sql):
+    return [(op['type'], op['args']) for op in extract_ddl_ops(sql)]
+
+
+# ============================================================================
+# TEST CASES
+# ============================================================================
+
+def test_comment_markers_inside_literals():
+    """'--' and '/*' inside strings or dollar bodies are not comments."""
+    sql = (
+        "INSERT INTO notes (body) VALUES ('a -- b; /* c');\n"
+        "-- CREATE TABLE commented_out (id int);\n"
+        "/* outer /* nested */ DROP TABLE still_comment; */\n"
+        "CREATE TABLE real_one (id int);\n"
+    )
+    assert op_list(sql) == [('INSERT_INTO', ['notes']), ('CREATE_TABLE', ['real_one'])], op_list(sql)
+    return "PASS"
+
+
+def test_statement_split_respects_quoting():
+    sql = "SELECT ';';\nSELECT $x$ ; $x$;\nSELECT \"a;b\" FROM t"
+    stmts = list(split_statements(sql))
+    assert len(stmts) == 3, len(stmts)
+    assert sql[stmts[2].start:stmts[2].end].startswith("SELECT \"a;b\"")
+    return "PASS"
+
+
+def test_function_body_not_classified():
+    """DDL inside a CREATE FUNCTION body is not the migration's own DDL."""
+    sql = (
+        "CREATE OR REPLACE FUNCTION public.reset_things() RETURNS void AS $$\n"
+        "BEGIN\n"
+        "  DELETE FROM things;\n"
+        "  EXECUTE 'DROP TABLE ' || quote_ident(t);\n"
+        "END;\n"
+        "$$ LANGUAGE plpgsql;\n"
+    )
+    assert op_list(sql) == [('CREATE_FUNCTION', ['reset_things'])], op_list(sql)
+    return "PASS"
+
+
+def test_do_block_ddl_classified():
+    sql = (
+        "DO $$\n"
+        "BEGIN\n"
+        "  IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'tier') THEN\n"
+        "    CREATE TYPE tier AS ENUM ('free', 'pro');\n"
+        "  END IF;\n"
+        "  ALTER TABLE orgs ADD COLUMN IF NOT EXISTS tier tier;\n"
+        "END $$;\n"
+    )
+    ops = extract_ddl_ops(sql)
+    assert [(o['type'], o['args']) for o in ops] == [
+        ('CREATE_ENUM', ['tier']), ('ADD_COLUMN', ['orgs', 'tier'])], ops
+    assert all(o['in_do_block'] for o in ops)
+    assert sql[ops[1]['offset']:].startswith("ALTER TABLE orgs")
+    return "PASS"
+
+
+def test_execute_of_literal_is_static_sql():
+    sql = (
+        "DO $$ BEGIN\n"
+        "  EXECUTE 'CREATE INDEX idx_orgs_name ON orgs (name)';\n"
+        "  EXECUTE format('DROP TABLE %I', tbl);\n"
+        "END $$;\n"
+    )
+    assert op_list(sql) == [('CREATE_INDEX', ['idx_orgs_name', 'orgs'])], op_list(sql)
+    return "PASS"
+
+
+def test_quoted_policy_names_with_spaces():
+    sql = (
+        'DROP POLICY IF EXISTS "Members can read" ON public.orgs;\n'
+        'CREATE POLICY "Members can read" ON public.orgs FOR SELECT USING (true);\n'
+    )
+    assert op_list(sql) == [
+        ('DROP_POLICY', ['Members can read', 'orgs']),
+        ('CREATE_POLICY', ['Members can read', 'orgs'])], op_list(sql)
+    return "PASS"
+
+
+def test_multi_action_alter_table():
+    sql = (
+        "ALTER TABLE public.orgs\n"
+        "  ADD COLUMN plan text DEFAULT 'free',\n"
+        "  ADD CONSTRAINT orgs_plan_check CHECK (plan IN ('free', 'pro')),\n"
+        "  ALTER COLUMN name SET NOT NULL,\n"
+        "  DROP COLUMN IF EXISTS legacy;\n"
+    )
+    assert op_list(sql) == [
+        ('ADD_COLUMN', ['orgs', 'plan']),
+        ('ADD_CONSTRAINT', ['orgs', 'orgs_plan_check']),
+        ('ALTER_COLUMN', ['orgs', 'name']),
+        ('DROP_COLUMN', ['orgs', 'legacy'])], op_list(sql)
+    return "PASS"
+
+
+def test_grant_and_trigger_table():
+    sql = (
+        "GRANT SELECT, INSERT ON TABLE public.orgs TO authenticated;\n"
+        "CREATE TRIGGER set_updated_at BEFORE UPDATE OF name, plan ON public.orgs\n"
+        "  FOR EACH ROW EXECUTE FUNCTION set_updated_at();\n"
+    )
+    assert op_list(sql) == [
+        ('GRANT', ['orgs']),
+        ('CREATE_TRIGGER', ['set_updated_at', 'orgs'])], op_list(sql)
+    return "PASS"
+
+
+def test_tokenizer_offsets():
+    sql = "create table \"Mixed Case\" (id int);"
+    toks = list(tokenize(sql))
+    assert [t.pos for t in toks] == [0, 7, 13, 26, 27, 30, 33, 34], [t.pos for t in toks]
+    assert toks[2].kind == 'qident' and toks[2].value == 'Mixed Case'
+    assert op_list(sql) == [('CREATE_TABLE', ['Mixed Case'])], op_list(sql)
+    return "PASS"
+
+
+def test_parse_cache_reparses_only_changed_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = []
+        for i in range(10):
+            path = tmp / f"2026010100000{i}_m{i}.sql"
+            path.write_text(f"CREATE TABLE t{i} (id int);\n")
+            paths.append(str(path))
+        cache_dir = str(tmp / "cache")
+
+        first, timings = parse_files(paths, cache_dir=cache_dir, workers=2)
+        assert (timings['parsed'], timings['cached']) == (10, 0), timings
+
+        Path(paths[3]).write_text("DROP TABLE t3;\n")
+        second, timings = parse_files(paths, cache_dir=cache_dir, workers=2)
+        assert (timings['parsed'], timings['cached']) == (1, 9), timings
+        assert [(o['type'], o['args']) for o in second[paths[3]]['ops']] == [('DROP_TABLE', ['t3'])]
+        assert second[paths[0]]['ops'] == first[paths[0]]['ops']
+    return "PASS"
+
+
+def replay(*migrations):
+    return SchemaModel().replay((v, extract_ddl_ops(sql)) for v, sql in migrations)
+
+
+def test_model_later_drop_supersedes_create():
+    model = replay(
+        ("001", "CREATE TABLE scratch (id int);\nCREATE POLICY \"Read\" ON scratch USING (true);"),
+        ("002", "DROP TABLE scratch;"),
+    )
+    diff = model.diff({'tables': set(), 'policies': set()})
+    assert diff['tables']['missing'] == set() and diff['policies']['missing'] == set(), diff
+    for op in extract_ddl_ops("CREATE TABLE scratch (id int);"):
+        assert model.op_status(op, "001", diff) == ('superseded', "002")
+    # DROP TABLE cascades to the table's policies
+    assert model.writer[('policies', 'scratch.read')] == "002"
+    return "PASS"
+
+
+def test_model_same_file_drop_then_create():
+    sql = 'DROP POLICY IF EXISTS "Read" ON orgs;\nCREATE POLICY "Read" ON orgs USING (true);'
+    model = replay(("001", sql))
+    diff = model.diff({'policies': {'orgs.read'}})
+    assert [model.op_status(op, "001", diff)[0] for op in extract_ddl_ops(sql)] == ['present', 'present']
+    diff = model.diff({'policies': set()})
+    assert [model.op_status(op, "001", diff)[0] for op in extract_ddl_ops(sql)] == ['absent', 'absent']
+    return "PASS"
+
+
+def test_model_rename_and_lingering_drop():
+    model = replay(
+        ("001", "CREATE TABLE old_name (id int, note text);\nCREATE INDEX idx_note ON old_name (note);"),
+        ("002", "ALTER TABLE old_name RENAME TO new_name;\nDROP INDEX idx_note;"),
+    )
+    assert model.objects['tables'] == {'new_name'}
+    assert model.objects['columns'] == {'new_name.id', 'new_name.note'}
+    diff = model.diff({'tables': {'new_name'}, 'indexes': {'idx_note'}})
+    assert diff['indexes']['lingering'] == {'idx_note'}, diff
+    drop = extract_ddl_ops("DROP INDEX idx_note;")[0]
+    assert model.op_status(drop, "002", diff) == ('absent', "002")
+    return "PASS"
+
+
+def test_alter_column_does_not_supersede_add():
+    """ALTER COLUMN after ADD COLUMN leaves the ADD judged against PROD, not superseded."""
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from tmp_triage_migrations import triage_file
+
+    add = "ALTER TABLE orgs ADD COLUMN plan text;\n"
+    alter = "ALTER TABLE orgs ALTER COLUMN plan SET DEFAULT 'free';\n"
+    model = replay(("001", add), ("002", alter))
+    catalog = Catalog(make_snapshot())  # orgs has only id
+    diff = model.diff(catalog.keys())
+    [add_op], [alter_op] = extract_ddl_ops(add), extract_ddl_ops(alter)
+    assert model.op_status(add_op, "001", diff) == ('absent', "001")
+    assert model.op_status(alter_op, "002", diff) == ('absent', "001")
+    conn = object_index.connect(':memory:')
+    assert triage_file("001", "001_add.sql", add, [add_op], catalog, model, diff, conn)["category"] == \
+        'NOT_APPLIED_REAL'
+
+    # Dropping the column afterwards still supersedes both
+    model = replay(("001", add), ("002", alter), ("003", "ALTER TABLE orgs DROP COLUMN plan;"))
+    diff = model.diff(catalog.keys())
+    assert model.op_status(add_op, "001", diff) == model.op_status(alter_op, "002", diff) == ('superseded', "003")
+    return "PASS"
+
+
+def test_object_index_incremental():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        mdir = tmp / "migrations"
+        mdir.mkdir()
+        (mdir / "001_orgs.sql").write_text("CREATE TABLE orgs (id int);\n")
+        (mdir / "002_policy.sql").write_text('\nCREATE POLICY "Read" ON public.orgs USING (true);\n')
+        conn = object_index.connect(str(tmp / "objects.sqlite"))
+        cache_dir = str(tmp / "cache")
+
+        local_map = object_index.discover(str(mdir))
+        assert object_index.update_index(conn, local_map, cache_dir=cache_dir) == (2, 0)
+        assert object_index.update_index(conn, local_map, cache_dir=cache_dir) == (0, 0)
+
+        rows = object_index.lookup(conn, "orgs", kind="tables")
+        assert [(r[2], r[4], r[6]) for r in rows] == [("001", "CREATE_TABLE", 1), ("002", "CREATE_POLICY", 2)], rows
+        assert object_index.touched_after(conn, "tables", "orgs", "001") == ["002"]
+
+        (mdir / "002_policy.sql").unlink()
+        (mdir / "003_drop.sql").write_text("DROP TABLE orgs;\n")
+        local_map = object_index.discover(str(mdir))
+        assert object_index.update_index(conn, local_map, cache_dir=cache_dir) == (1, 1)
+        assert [r[2] for r in object_index.lookup(conn, "orgs")] == ["001", "003"]
+        assert object_index.lookup(conn, "read") == []
+
+        # Policy names repeat across tables; each table's policy is its own object
+        (mdir / "004_users.sql").write_text('CREATE POLICY "Users can view own data" ON users USING (true);\n')
+        (mdir / "005_notes.sql").write_text('CREATE POLICY "Users can view own data" ON notes USING (true);\n')
+        local_map = object_index.discover(str(mdir))
+        assert object_index.update_index(conn, local_map, cache_dir=cache_dir) == (2, 0)
+        assert object_index.touched_after(conn, "policies", "users.users can view own data", "004") == []
+        assert [(r[1], r[2]) for r in object_index.lookup(conn, "Users can view own data", kind="policies")] == \
+            [("users.users can view own data", "004"), ("notes.users can view own data", "005")]
+        assert len(object_index.lookup(conn, "users can view%", like=True)) == 2
+        conn.close()
+    return "PASS"
+
+
+def make_snapshot():
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "migrations": [{"version": "001", "name": "orgs"}],
+        "tables": [{"name": "orgs", "rls_enabled": True}],
+        "columns": [{"table": "orgs", "name": "id", "type": "uuid", "nullable": False}],
+        "indexes": [{"name": "orgs_pkey", "table": "orgs", "unique": True, "columns": ["id"]}],
+        "constraints": [{"name": "orgs_pkey", "table": "orgs", "type": "p"}],
+        "policies": [{"name": "Members can read", "table": "orgs", "cmd": "SELECT"}],
+        "functions": [{"name": "is_member", "signature": "org uuid"}],
+        "enums": [{"name": "tier", "labels": ["free", "pro"]}],
+        "triggers": [],
+    }
+
+
+def test_catalog_scoped_lookups_and_enum_values():
+    catalog = Catalog(make_snapshot())
+    assert catalog.remote_versions == {"001"} and catalog.migrations["001"] == "orgs"
+    assert catalog.index("ORGS_PKEY")["table"] == "orgs"
+    assert catalog.constraint("orgs", "orgs_pkey") and not catalog.constraint("other", "orgs_pkey")
+    assert catalog.column("orgs", "id")["type"] == "uuid"
+    assert catalog.enum_labels("tier") == ["free", "pro"]
+    assert catalog.function_signatures("is_member") == ["org uuid"]
+
+    sql = ("ALTER TYPE tier ADD VALUE 'pro';\nALTER TYPE tier ADD VALUE 'team';\n"
+           "ALTER TABLE orgs ADD CONSTRAINT orgs_pkey PRIMARY KEY (id);\n"
+           "CREATE POLICY \"Members can read\" ON other_table USING (true);\n")
+    model = replay(("001", sql))
+    diff = model.diff(catalog.keys())
+    statuses = [model.op_status(op, "001", diff)[0] for op in extract_ddl_ops(sql)]
+    # the policy name exists in PROD, but on a different table
+    assert statuses == ['present', 'absent', 'present', 'absent'], statuses
+    return "PASS"
+
+
+def test_catalog_legacy_text_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "remote_versions.txt": "001\n002\n",
+            "prod_tables.txt": "orgs\n",
+            "prod_columns.txt": "orgs.id\n",
+            "prod_indexes.txt": "orgs_pkey\n",
+            "prod_constraints.txt": "orgs_pkey\n",
+            "prod_policies.txt": "Members can read@orgs\n",
+            "prod_functions.txt": "",
+            "prod_views.txt": "",
+            "prod_enums.txt": "tier\n",
+            "prod_triggers.txt": "",
+            "prod_rls_enabled.txt": "orgs\n",
+        }
+        for name, text in files.items():
+            (Path(tmp) / name).write_text(text)
+        catalog = Catalog.from_legacy_dir(tmp)
+    keys = catalog.keys()
+    assert catalog.remote_versions == {"001", "002"}
+    assert keys['policies'] == {"orgs.members can read"} and keys['rls_enabled'] == {"orgs"}
+    # no constraint tables or enum labels in the legacy files
+    assert 'constraints' not in keys and 'enum_values' not in keys
+    assert catalog.enum_labels("tier") is None
+    return "PASS"
+
+
+def test_fingerprint_normalization():
+    """Case, whitespace, comments, redundant parens, casts and public. don't change a fingerprint."""
+    a = "SELECT org_id FROM public.members WHERE user_id = auth.uid()::uuid -- mine\n"
+    b = "select  ((org_id)) from members\n  where (user_id = (auth.uid()))"
+    assert fingerprint_sql(a) == fingerprint_sql(b)
+    assert fingerprint_sql(a) != fingerprint_sql(a.replace("user_id", "owner_id"))
+    assert fingerprint_sql("SELECT 'x'::character varying(10)") == fingerprint_sql("select 'x'")
+    # Parentheses that change precedence still count
+    assert fingerprint_sql("a AND (b OR c)") != fingerprint_sql("(a AND b) OR c")
+    assert fingerprint_sql("((a AND b) OR c)") == fingerprint_sql("a AND b OR c")
+    assert fingerprint_sql("x AND ((a OR b))") == fingerprint_sql("x AND (a OR b)")
+    assert fingerprint_sql("NOT (a OR b)") != fingerprint_sql("NOT a OR b")
+    # Qualifiers are dropped for a lone FROM relation only; joins keep them
+    assert fingerprint_sql("SELECT m.id FROM members m WHERE m.a = 1") == \
+        fingerprint_sql("SELECT id FROM members m WHERE a = 1")
+    assert fingerprint_sql("SELECT l.id FROM locations l JOIN orgs o ON o.id = l.org_id") != \
+        fingerprint_sql("SELECT o.id FROM locations l JOIN orgs o ON o.id = l.org_id")
+    return "PASS"
+
+
+def test_body_drift_against_catalog():
+    """Same-named objects whose bodies differ from PROD are drifted, not present."""
+    sql = ("CREATE FUNCTION is_member(org uuid) RETURNS boolean LANGUAGE sql STABLE AS $$\n"
+           "  SELECT EXISTS (SELECT 1 FROM members WHERE org_id = org AND user_id = auth.uid())\n$$;\n"
+           "CREATE POLICY \"Members can read\" ON orgs FOR SELECT USING (is_member(id));\n")
+    snapshot = make_snapshot()
+    snapshot["functions"][0]["body"] = ("\n SELECT EXISTS (SELECT 1 FROM public.members\n"
+                                        "   WHERE org_id = org AND user_id = auth.uid()) ")
+    snapshot["policies"][0]["qual"] = "is_member(id)"
+    catalog = Catalog(snapshot)
+    model = replay(("001", sql))
+    diff = model.diff(catalog.keys(), catalog.fingerprints())
+    assert not diff["functions"]["drifted"] and not diff["policies"]["drifted"]
+
+    snapshot["policies"][0]["qual"] = "(is_member(id) OR is_admin())"
+    catalog = Catalog(snapshot)
+    diff = model.diff(catalog.keys(), catalog.fingerprints())
+    assert diff["policies"]["drifted"] == {"orgs.members can read"}
+    statuses = [model.op_status(op, "001", diff)[0] for op in extract_ddl_ops(sql)]
+    assert statuses == ["present", "drifted"], statuses
+
+    # Views and subquery policies as pg_get_viewdef / pg_get_expr print them
+    sql = ("CREATE VIEW active_orgs AS SELECT id, name FROM orgs WHERE active;\n"
+           "CREATE POLICY \"Users can view activity logs in their organization\" ON activity_logs FOR SELECT\n"
+           "  USING (organization_id IN (\n"
+           "    SELECT organization_id FROM user_location_access WHERE user_id = auth.uid()));\n"
+           "CREATE POLICY \"Users can read corrective actions for their org locations\" ON ai_corrective_actions\n"
+           "  FOR SELECT USING (location_id IN (SELECT l.id FROM locations l\n"
+           "    JOIN user_profiles up ON up.organization_id = l.organization_id WHERE up.id = auth.uid()));\n"
+           "CREATE POLICY admin_only ON crawl_runs USING (\n"
+           "  (auth.jwt() ->> 'email') LIKE '%@getevidly.com' AND role IN ('owner', 'admin'));\n")
+    snapshot["views"] = [{"name": "active_orgs", "definition": " SELECT id,\n    name\n   FROM orgs\n  WHERE active;"}]
+    snapshot["policies"] = [
+        {"name": "Users can view activity logs in their organization", "table": "activity_logs", "cmd": "SELECT",
+         "qual": "(organization_id IN ( SELECT user_location_access.organization_id\n   FROM user_location_access\n"
+                 "  WHERE (user_location_access.user_id = auth.uid())))", "with_check": None},
+        {"name": "Users can read corrective actions for their org locations", "table": "ai_corrective_actions",
+         "cmd": "SELECT",
+         "qual": "(location_id IN ( SELECT l.id\n   FROM (locations l\n     JOIN user_profiles up ON "
+                 "((up.organization_id = l.organization_id)))\n  WHERE (up.id = auth.uid())))", "with_check": None},
+        {"name": "admin_only", "table": "crawl_runs", "cmd": "ALL",
+         "qual": "(((auth.jwt() ->> 'email'::text) ~~ '%@getevidly.com'::text) AND "
+                 "(role = ANY (ARRAY['owner'::text, 'admin'::text])))", "with_check": None},
+    ]
+    catalog = Catalog(snapshot)
+    model = replay(("001", sql))
+    diff = model.diff(catalog.keys(), catalog.fingerprints())
+    assert not diff["views"]["drifted"] and not diff["policies"]["drifted"], diff
+
+    snapshot["policies"][1]["qual"] = snapshot["policies"][1]["qual"].replace("(up.id = auth.uid())", "(l.id = auth.uid())")
+    diff = model.diff(catalog.keys(), Catalog(snapshot).fingerprints())
+    assert diff["policies"]["drifted"] == {"ai_corrective_actions.users can read corrective actions for their org locations"}
+    return "PASS"
+
+
+def test_triage_store_input_keys():
+    """Input keys change only for versions whose dependencies changed."""
+    catalog = Catalog(make_snapshot())
+    files = {
+        "001": "CREATE TABLE orgs (id uuid);\n",
+        "002": "CREATE TABLE notes (id uuid);\n",
+        "003": "CREATE INDEX notes_idx ON notes (id);\n",
+    }
+
+    def keys(files):
+        ops = {v: extract_ddl_ops(sql) for v, sql in files.items()}
+        model = replay(*sorted(files.items()))
+        diff = model.diff(catalog.keys())
+        touches = triage_store.touch_map(ops)
+        return {v: triage_store.input_key(v, sql, ops[v], model, diff, catalog, touches)
+                for v, sql in files.items()}
+
+    before = keys(files)
+    after = keys(dict(files, **{"004": "INSERT INTO notes (id) VALUES (gen_random_uuid());\n"}))
+    assert after["001"] == before["001"] and after["003"] == before["003"]
+    assert after["002"] != before["002"]  # notes is now touched later
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = triage_store.connect(str(Path(tmp) / "triage.sqlite"))
+        entry = {"version": "002", "file": "002_notes.sql", "category": "NOT_APPLIED_REAL", "reason": "r"}
+        triage_store.save_results(conn, [(before["002"], entry), (before["003"], dict(entry, version="003"))],
+                                  keep={"002", "003"})
+        assert triage_store.save_results(conn, [], keep={"002"}) == 1
+        assert triage_store.stored_keys(conn) == {"002": before["002"]}
+        assert triage_store.load_categories(conn)["NOT_APPLIED_REAL"] == [entry]
+    return "PASS"
+
+
+def test_migration_lint_rules():
+    """Each rule fires once; same-file tables, concurrent builds and later indexes are exempt."""
+    files = [
+        ("001", "CREATE TABLE orgs (id uuid PRIMARY KEY);\n"
+                "CREATE TABLE notes (id uuid PRIMARY KEY, org_id uuid REFERENCES orgs(id),\n"
+                "  author_id uuid REFERENCES orgs(id), title varchar(80));\n"
+                "CREATE INDEX notes_title_idx ON notes (title);\n"
+                "CREATE FUNCTION is_member(o uuid) RETURNS boolean LANGUAGE sql AS $$ SELECT true $$;\n"),
+        ("002", "CREATE INDEX notes_org_idx ON notes (org_id, id);\n"
+                "CREATE INDEX CONCURRENTLY notes_author_idx ON notes (title);\n"
+                "ALTER TABLE notes ALTER COLUMN title TYPE text;\n"
+                "ALTER TABLE notes ALTER COLUMN id TYPE text USING id::text;\n"
+                "ALTER TABLE notes ADD COLUMN seen_at timestamptz DEFAULT now(),\n"
+                "  ADD COLUMN token uuid NOT NULL DEFAULT gen_random_uuid();\n"
+                "CREATE POLICY \"read\" ON notes FOR SELECT USING (is_member(org_id) AND auth.uid() IS NOT NULL);\n"),
+    ]
+    migrations = [(v, f"{v}_x.sql", sql, extract_ddl_ops(sql)) for v, sql in files]
+    findings = migration_lint.lint(migrations)
+    rules = [(f["version"], f["rule"], f["line"]) for f in findings]
+    assert rules == [
+        ("001", "fk-without-index", 2),             # author_id; org_id gets an index in 002
+        ("002", "index-not-concurrent", 1),
+        ("002", "column-type-rewrite", 4),          # varchar -> text on line 3 is free
+        ("002", "volatile-default", 5),             # gen_random_uuid, not now()
+        ("002", "policy-volatile-call", 7),         # is_member defaults to VOLATILE
+    ], rules
+    assert findings[1]["offset"] == 0 and "notes_org_idx" in findings[1]["message"]
+    assert [f["rule"] for f in migration_lint.lint(migrations, versions={"002"})][0] == "index-not-concurrent"
+    return "PASS"
+
+
+def test_rls_cost_expression_analysis():
+    """Unwrapped auth calls, correlation and unindexed filters in deparsed policy text."""
+    columns = {"notes": {"id", "org_id", "owner_id", "is_public"}, "members": {"org_id", "user_id"}}
+    a = rls_cost.analyze_expression(
+        "((owner_id = auth.uid()) OR (org_id IN ( SELECT members.org_id\n   FROM members\n"
+        "  WHERE (members.user_id = auth.uid()))) OR (is_public = true))", "notes", columns)
+    assert a["unwrapped_auth"] == ["auth.uid"]  # the one inside the subquery runs once
+    assert a["filters"] == ["owner_id", "org_id"] and not a["correlated"]
+    assert a["subquery_filters"] == [("members", "user_id")]
+
+    a = rls_cost.analyze_expression(
+        "EXISTS (SELECT 1 FROM members m WHERE m.org_id = notes.org_id AND m.user_id = (select auth.uid()))",
+        "notes", columns)
+    assert a["correlated"] == ["members"] and not a["unwrapped_auth"]
+
+    policies = [rls_cost._policy("notes", "read", "SELECT", "owner_id = (select auth.uid())", None, "test"),
+                rls_cost._policy("notes", "write", "INSERT", None, "is_admin(org_id)", "test")]
+    indexed = {("notes", "owner_id")}
+    tables = rls_cost.analyze(policies, columns, lambda t, cols: (t, cols[0]) in indexed)
+    assert not tables["notes"]["seq_scan"]
+    assert [x["rule"] for x in tables["notes"]["findings"]] == ["function-per-row"]
+    return "PASS"
+
+
+def test_shadow_replay_plan():
+    local = [("001", "a"), ("002", "b"), ("003", "c")]
+    assert plan_replay(local, [("001", "a"), ("002", "b")]) == ('incremental', [("003", "c")])
+    assert plan_replay(local, local) == ('incremental', [])
+    assert plan_replay(local, [("001", "a"), ("002", "x")])[0] == 'rebuild'
+    # a back-dated file lands before the checkpoint
+    assert plan_replay([("001", "a"), ("0015", "n"), ("002", "b")], [("001", "a"), ("002", "b")])[0] == 'rebuild'
+    # a CONCURRENTLY file that never finished leaves its dirty checkpoint behind
+    assert plan_replay(local, [("001", "a"), ("002", DIRTY_PREFIX + "b")])[0] == 'rebuild'
+    assert needs_no_transaction(extract_ddl_ops("CREATE INDEX CONCURRENTLY i ON t (c);"))
+    assert not needs_no_transaction(extract_ddl_ops("CREATE INDEX i ON t (c);"))
+    # A file's own COMMIT would end psql's --single-transaction wrapper early
+    own_txn = "BEGIN;\nCREATE TABLE t (id int);\nCOMMIT;\n"
+    assert needs_no_transaction(extract_ddl_ops(own_txn), own_txn)
+    assert needs_no_transaction([], "START TRANSACTION ISOLATION LEVEL SERIALIZABLE; SELECT 1; END;")
+    plpgsql = "DO $$ BEGIN PERFORM 1; END $$;\nCREATE FUNCTION f() RETURNS int LANGUAGE plpgsql AS $$ BEGIN RETURN 1; END $$;"
+    assert not needs_no_transaction(extract_ddl_ops(plpgsql), plpgsql)
+    return "PASS"
+
+
+def test_shadow_compare_snapshots():
+    shadow = make_snapshot()
+    prod = make_snapshot()
+    prod["columns"] = [dict(prod["columns"][0], type="text")]
+    prod["policies"] = []
+    prod["views"] = [{"name": "org_summary", "materialized": False}]
+    diff = compare_snapshots(shadow, prod)
+    assert diff["columns"]["changed"] == [{"id": "orgs.id", "fields": {"type": ["uuid", "text"]}}], diff
+    assert diff["policies"]["missing"] == ["orgs.members can read"]
+    assert diff["views"]["extra"] == ["org_summary"]
+    assert set(diff) == {"columns", "policies", "views"}
+    return "PASS"
+
+
+def run_tests():
+    tests = [
+        test_comment_markers_inside_literals,
+        test_statement_split_respects_quoting,
+        test_function_body_not_classified,
+        test_do_block_ddl_classified,
+        test_execute_of_literal_is_static_sql,
+        test_quoted_policy_names_with_spaces,
+        test_multi_action_alter_table,
+        test_grant_and_trigger_table,
+        test_tokenizer_offsets,
+        test_parse_cache_reparses_only_changed_files,
+        test_model_later_drop_supersedes_create,
+        test_model_same_file_drop_then_create,
+        test_model_rename_and_lingering_drop,
+        test_alter_column_does_not_supersede_add,
+        test_object_index_incremental,
+        test_catalog_scoped_lookups_and_enum_values,
+        test_catalog_legacy_text_files,
+        test_fingerprint_normalization,
+        test_body_drift_against_catalog,
+        test_triage_store_input_keys,
+        test_migration_lint_rules,
+        test_rls_cost_expression_analysis,
+        test_shadow_replay_plan,
+        test_shadow_compare_snapshots,
+    ]
+
+    passed = 0
+    failed = 0
+    for test_fn in tests:
+        name = test_fn.__name__
+        try:
+            test_fn()
+            print(f"  ✅ {name}")
+            passed += 1
+        except AssertionError as e:
+            print(f"  ❌ {name}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  💥 {name}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'='*50}")
+    print(f"  {passed} passed, {failed} failed, {len(tests)} total")
+    print(f"{'='*50}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Running migration triage tests...\n")
+    ok = run_tests()
+    sys.exit(0 if ok else 1)
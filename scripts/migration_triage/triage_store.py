@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Persistent triage results for tmp_triage_migrations.py.
+
+One sqlite file holds a row per local-only migration version (category,
+reason and the full entry as JSON) plus the run-wide summary the report
+header needs (counts, schema diff, remote-only versions). The markdown
+report is rendered from this store, and `--json` exports it for other
+tools.
+
+Each row carries an input key: a hash of the file's content and of
+everything its verdict depends on elsewhere in the tree — the status and
+last writer of every object its ops write, the later migrations touching
+those objects, and whether the tables it references exist in PROD. A
+re-run re-triages only versions whose key changed; adding one migration
+re-judges the files that touch the same objects, not all 587.
+
+Usage:
+    python scripts/migration_triage/triage_store.py --json triage.json
+    python scripts/migration_triage/triage_store.py --category NOT_APPLIED_REAL
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from parse_cache import DEFAULT_CACHE_DIR  # noqa: E402
+from object_index import op_refs  # noqa: E402
+from sql_lexer import LEXER_VERSION  # noqa: E402
+
+DEFAULT_STORE_PATH = os.path.join(DEFAULT_CACHE_DIR, 'triage.sqlite')
+
+# Bump when triage verdict logic or the stored entry shape changes; rows
+# written under another format are re-triaged
+TRIAGE_FORMAT = 1
+
+CATEGORIES = ('APPLIED_IDENTICAL', 'APPLIED_PARTIAL', 'NOT_APPLIED_DEAD', 'NOT_APPLIED_REAL', 'UNCLEAR')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    version    TEXT PRIMARY KEY,
+    file       TEXT NOT NULL,
+    input_key  TEXT NOT NULL,
+    category   TEXT NOT NULL,
+    reason     TEXT NOT NULL,
+    entry      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_category ON results (category, version);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def connect(path=DEFAULT_STORE_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != TRIAGE_FORMAT:
+        conn.executescript("DROP TABLE IF EXISTS results; DROP TABLE IF EXISTS meta;")
+        conn.execute(f"PRAGMA user_version = {TRIAGE_FORMAT}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ── Input keys ──
+
+def touch_map(ops_by_version):
+    """(kind, name) -> versions referencing it, ascending; names as object_index.op_refs gives them."""
+    touches = defaultdict(list)
+    for version in sorted(ops_by_version):
+        for op in ops_by_version[version]:
+            for ref in op_refs(op):
+                if not touches[ref] or touches[ref][-1] != version:
+                    touches[ref].append(version)
+    return touches
+
+
+def input_key(version, content_key, ops, model, diff, catalog, touches):
+    """Hash of everything triage_file() reads for this version (op details included, via LEXER_VERSION)."""
+    deps = []
+    for op in ops:
+        refs = op_refs(op)
+        status = model.op_status(op, version, diff)
+        later = [v for v in touches.get(refs[0], ()) if v > version] if refs else []
+        tables = [catalog.has_table(name) for kind, name in refs if kind == 'tables']
+        deps.append((status, later, tables))
+    blob = json.dumps([TRIAGE_FORMAT, LEXER_VERSION, content_key, deps], sort_keys=True)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()
+
+
+# ── Reading / writing ──
+
+def stored_keys(conn):
+    """version -> input_key for every stored result."""
+    return dict(conn.execute("SELECT version, input_key FROM results"))
+
+
+def save_results(conn, rows, keep):
+    """Upsert (input_key, entry) rows and drop versions not in `keep`."""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO results (version, file, input_key, category, reason, entry) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(e['version'], e['file'], key, e['category'], e['reason'], json.dumps(e))
+             for key, e in rows])
+        stale = [v for v in stored_keys(conn) if v not in keep]
+        conn.executemany("DELETE FROM results WHERE version = ?", [(v,) for v in stale])
+    return len(stale)
+
+
+def save_summary(conn, summary):
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('summary', ?)", (json.dumps(summary),))
+
+
+def load_summary(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'summary'").fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def load_categories(conn, only=None):
+    """category -> entries in version order, from one indexed scan."""
+    categories = {cat: [] for cat in CATEGORIES}
+    sql = "SELECT category, entry FROM results"
+    params = ()
+    if only:
+        sql += " WHERE category = ?"
+        params = (only,)
+    for category, entry in conn.execute(sql + " ORDER BY category, version", params):
+        categories.setdefault(category, []).append(json.loads(entry))
+    return categories
+
+
+def export_json(conn, path):
+    data = {
+        'format': TRIAGE_FORMAT,
+        'summary': load_summary(conn),
+        'results': [e for entries in load_categories(conn).values() for e in entries],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.write('\n')
+    return len(data['results'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query or export stored migration triage results')
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help=f'Store path (default: {DEFAULT_STORE_PATH})')
+    parser.add_argument('--category', choices=CATEGORIES, help='Only list this category')
+    parser.add_argument('--json', metavar='PATH', help='Export every result as JSON')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        sys.exit(f"No triage store at {args.store}; run tmp_triage_migrations.py first")
+    conn = connect(args.store)
+    if args.json:
+        print(f"Wrote {export_json(conn, args.json)} result(s) to {args.json}")
+        return
+    for category, entries in load_categories(conn, args.category).items():
+        if args.category and category != args.category:
+            continue
+        print(f"{category} ({len(entries)})")
+        for e in entries:
+            print(f"  {e['file']}  {e['reason']}")
+
+
+if __name__ == '__main__':
+    main()
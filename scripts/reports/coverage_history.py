@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+EvidLY Reports — Coverage History
+==================================
+
+An append-only store of CoverageMatrix snapshots, one per report run, and
+trend reports across them.
+
+  <store>/manifest.jsonl        one line per snapshot: id, date, label,
+                                jurisdiction count, fields, and filled
+                                count per field
+  <store>/snapshots/<id>.npz    the matrix, column-major and bit-packed
+                                (one packed NULL bit vector per field)
+                                plus the (county, city) row keys
+
+Snapshots are never rewritten. The npz is written first and the manifest
+line last, so an interrupted run leaves no half-registered snapshot.
+Fill-rate trends read only the manifest; gap changes between two
+snapshots (closed vs newly opened, per field) load just those two files
+and align rows by (county, city).
+
+Usage:
+    python3 coverage_history.py --store ../../docs/coverage_history --append prod_rows.json --date 2026-05-21
+    python3 coverage_history.py --store ../../docs/coverage_history --trend
+    python3 coverage_history.py --store ../../docs/coverage_history --trend --last 12 --out-dir reports/ --format md csv
+    python3 coverage_history.py --store ../../docs/coverage_history --changes 3 5
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    print("pip install numpy")
+    sys.exit(1)
+
+sys.path.insert(0, str(Path(__file__).parent))
+from coverage_matrix import PILLARS, CoverageMatrix
+from jurisdiction_reports import load_rows
+from report_engine import EMPTY, FORMATS, run
+
+
+SNAPSHOT_FORMAT = 1
+
+MANIFEST = "manifest.jsonl"
+
+
+class HistoryError(ValueError):
+    pass
+
+
+class SnapshotStore:
+    """Append-only coverage snapshots under one directory."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.manifest = self.root / MANIFEST
+
+    def entries(self) -> list:
+        """Manifest entries, oldest first."""
+        if not self.manifest.exists():
+            return []
+        with open(self.manifest, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entry(self, snapshot_id) -> dict:
+        for e in self.entries():
+            if e["id"] == int(snapshot_id):
+                return e
+        raise HistoryError(f"{self.root}: no snapshot {snapshot_id}")
+
+    def append(self, matrix: CoverageMatrix, taken=None, label=None) -> dict:
+        entries = self.entries()
+        snapshot_id = entries[-1]["id"] + 1 if entries else 1
+        taken = taken or date.today().isoformat()
+        rel = f"snapshots/{snapshot_id:05d}_{taken}.npz"
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        missing = matrix.missing
+        keys = [[c, ci] for c, ci in zip(matrix.counties.tolist(), matrix.cities.tolist())]
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f, format=np.array(SNAPSHOT_FORMAT), rows=np.array(missing.shape[0]),
+                packed=np.packbits(missing.T, axis=1),
+                fields=np.array(json.dumps(matrix.fields)), keys=np.array(json.dumps(keys)))
+        os.replace(tmp, path)
+
+        entry = {
+            "id": snapshot_id, "date": taken, "label": label, "file": rel, "format": SNAPSHOT_FORMAT,
+            "jurisdictions": int(missing.shape[0]), "fields": matrix.fields,
+            "filled": {f: int(n) for f, n in zip(matrix.fields, missing.shape[0] - missing.sum(axis=0))},
+        }
+        with open(self.manifest, "a", encoding="utf-8", newline="\n") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def load(self, entry) -> CoverageMatrix:
+        with np.load(self.root / entry["file"]) as z:
+            if int(z["format"]) != SNAPSHOT_FORMAT:
+                raise HistoryError(f"{entry['file']}: snapshot format {int(z['format'])} (expected {SNAPSHOT_FORMAT})")
+            rows = int(z["rows"])
+            missing = np.unpackbits(z["packed"], axis=1, count=rows).T.astype(bool)
+            fields = json.loads(str(z["fields"]))
+            keys = json.loads(str(z["keys"]))
+        counties = np.array([k[0] for k in keys], dtype=object)
+        cities = np.array([k[1] for k in keys], dtype=object)
+        return CoverageMatrix(np.ascontiguousarray(missing), counties, cities, fields)
+
+
+# ============================================================================
+# TRENDS
+# ============================================================================
+
+def _pct(filled, total):
+    return round(filled * 100.0 / total, 1) if total else 0.0
+
+
+def snapshot_summary(entries) -> list:
+    """Per snapshot: overall and per-pillar fill %, and the change in overall % from the previous one."""
+    out = []
+    previous = None
+    for e in entries:
+        n = e["jurisdictions"]
+        filled = e["filled"]
+        record = {"id": e["id"], "date": e["date"], "label": e.get("label") or EMPTY, "jurisdictions": n,
+                  "pct": _pct(sum(filled.values()), n * len(filled))}
+        for pillar, fields in PILLARS.items():
+            present = [f for f in fields if f in filled]
+            record[f"{pillar.lower()}_pct"] = _pct(sum(filled[f] for f in present), n * len(present))
+        record["change"] = EMPTY if previous is None else f"{record['pct'] - previous:+.1f}"
+        previous = record["pct"]
+        out.append(record)
+    return out
+
+
+def field_trend(entries) -> list:
+    """Per field: fill % in each snapshot (keyed s<id>), first-to-last change and the largest drop."""
+    out = []
+    fields = list(dict.fromkeys(f for e in entries for f in e["fields"]))
+    for f in fields:
+        record = {"field": f}
+        series = []
+        for e in entries:
+            pct = _pct(e["filled"][f], e["jurisdictions"]) if f in e["filled"] else None
+            record[f"s{e['id']}"] = EMPTY if pct is None else pct
+            if pct is not None:
+                series.append(pct)
+        record["change"] = f"{series[-1] - series[0]:+.1f}" if len(series) > 1 else EMPTY
+        drops = [b - a for a, b in zip(series, series[1:]) if b < a]
+        record["worst_drop"] = f"{min(drops):.1f}" if drops else EMPTY
+        out.append(record)
+    return out
+
+
+def gap_changes(old: CoverageMatrix, new: CoverageMatrix) -> tuple:
+    """
+    ([per-field record], counts): over jurisdictions in both snapshots, gaps
+    closed (NULL -> filled) and opened (filled -> NULL) per field; counts
+    has jurisdictions in common, added and dropped.
+    """
+    old_rows = {k: i for i, k in enumerate(zip(old.counties.tolist(), old.cities.tolist()))}
+    pairs = [(old_rows[k], j) for j, k in enumerate(zip(new.counties.tolist(), new.cities.tolist())) if k in old_rows]
+    old_idx = np.array([p[0] for p in pairs], dtype=np.int64)
+    new_idx = np.array([p[1] for p in pairs], dtype=np.int64)
+    fields = [f for f in new.fields if f in old.fields]
+    before = old.missing[np.ix_(old_idx, old.columns(fields))]
+    after = new.missing[np.ix_(new_idx, new.columns(fields))]
+    closed = (before & ~after).sum(axis=0)
+    opened = (~before & after).sum(axis=0)
+    still = (before & after).sum(axis=0)
+    out = [{"field": f, "closed": int(c), "opened": int(o), "net": f"{int(c) - int(o):+d}", "still_missing": int(m)}
+           for f, c, o, m in zip(fields, closed, opened, still)]
+    return out, {"common": len(pairs), "added": len(new) - len(pairs), "dropped": len(old) - len(pairs)}
+
+
+def trend_reports(entries) -> list:
+    """Report definitions for the given snapshots (field trend columns depend on them)."""
+    return [
+        {
+            "name": "coverage_trend",
+            "title": "Contact Coverage Trend",
+            "grain": "snapshots",
+            "columns": [["Snapshot", "id"], ["Date", "date"], ["Label", "label"], ["Jurisdictions", "jurisdictions"],
+                        ["% Filled", "pct"], ["Change", "change"], ["EHD % Filled", "ehd_pct"],
+                        ["Fire % Filled", "fire_pct"]],
+        },
+        {
+            "name": "coverage_field_trend",
+            "title": "Contact Field Fill Rate by Snapshot",
+            "grain": "fields",
+            "columns": [["Field", "field"]] + [[f"#{e['id']} {e['date']}", f"s{e['id']}"] for e in entries] +
+                       [["Change", "change"], ["Worst Drop", "worst_drop"]],
+        },
+    ]
+
+
+CHANGES_REPORT = {
+    "name": "coverage_gap_changes",
+    "title": "Contact Gaps Closed and Opened",
+    "grain": "changes",
+    "columns": [["Field", "field"], ["Closed", "closed"], ["Opened", "opened"], ["Net", "net"],
+                ["Still Missing", "still_missing"]],
+}
+
+
+def _tables(reports, tables):
+    grains = {name: (lambda table: lambda _: table)(table) for name, table in tables.items()}
+    return run([None], reports, grains)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def write_results(results, out_dir, formats, label):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, result in results.items():
+        for fmt in formats:
+            with open(out_dir / f"{name}.{fmt}", "w", encoding="utf-8", newline="\n") as f:
+                f.write(FORMATS[fmt](result, label))
+        print(f"  {name}: {result.count} rows -> {out_dir}/")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append coverage snapshots and report trends")
+    parser.add_argument("--store", required=True, help="Snapshot store directory")
+    parser.add_argument("--append", metavar="ROWS", help="Snapshot PROD jurisdiction rows (JSON or saved query result)")
+    parser.add_argument("--date", help="Snapshot date with --append (default: today)")
+    parser.add_argument("--label", help="Snapshot label with --append, e.g. 'after Phase 2D crawl'")
+    parser.add_argument("--trend", action="store_true", help="Fill-rate trend across snapshots")
+    parser.add_argument("--last", type=int, help="Only the last N snapshots in --trend")
+    parser.add_argument("--changes", nargs=2, type=int, metavar=("OLD", "NEW"),
+                        help="Gaps closed/opened per field between two snapshot ids")
+    parser.add_argument("--out-dir", help="Write reports here instead of printing")
+    parser.add_argument("--format", nargs="+", choices=sorted(FORMATS), default=["md"],
+                        help="Output format(s) with --out-dir (default: md)")
+    args = parser.parse_args()
+
+    if not (args.append or args.trend or args.changes):
+        parser.error("give --append, --trend or --changes")
+    store = SnapshotStore(args.store)
+
+    if args.append:
+        entry = store.append(CoverageMatrix.from_rows(load_rows(args.append)), args.date, args.label)
+        total = entry["jurisdictions"] * len(entry["fields"])
+        print(f"Snapshot {entry['id']} ({entry['date']}): {entry['jurisdictions']} jurisdiction(s), "
+              f"{_pct(sum(entry['filled'].values()), total)}% filled -> {store.root / entry['file']}")
+
+    if args.trend:
+        entries = store.entries()
+        if args.last:
+            entries = entries[-args.last:]
+        if not entries:
+            sys.exit(f"No snapshots in {store.root}")
+        results = _tables(trend_reports(entries), {"snapshots": snapshot_summary(entries),
+                                                   "fields": field_trend(entries)})
+        if args.out_dir:
+            write_results(results, args.out_dir, args.format, f"{entries[0]['date']} to {entries[-1]['date']}")
+        else:
+            for record in snapshot_summary(entries):
+                print(f"  #{record['id']:<4} {record['date']}  {record['pct']:5.1f}% filled  ({record['change']})  "
+                      f"EHD {record['ehd_pct']:5.1f}%  Fire {record['fire_pct']:5.1f}%  {record['label']}")
+            print()
+            latest = f"s{entries[-1]['id']}"
+            for record in field_trend(entries):
+                print(f"  {record['field']:<20} {record[latest]!s:>6}%  change {record['change']:>6}")
+
+    if args.changes:
+        try:
+            old_entry, new_entry = store.entry(args.changes[0]), store.entry(args.changes[1])
+            changes, counts = gap_changes(store.load(old_entry), store.load(new_entry))
+        except HistoryError as e:
+            sys.exit(f"❌ {e}")
+        label = f"#{old_entry['id']} {old_entry['date']} to #{new_entry['id']} {new_entry['date']}"
+        results = _tables([CHANGES_REPORT], {"changes": changes})
+        if args.out_dir:
+            write_results(results, args.out_dir, args.format, label)
+        else:
+            print(f"{label}: {counts['common']} jurisdiction(s) in both, "
+                  f"{counts['added']} added, {counts['dropped']} dropped")
+            for c in changes:
+                print(f"  {c['field']:<20} closed {c['closed']:>5}  opened {c['opened']:>5}  net {c['net']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
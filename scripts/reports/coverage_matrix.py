@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+EvidLY Reports — Contact Coverage Matrix
+=========================================
+
+One boolean matrix of jurisdictions × contact fields (True = NULL, the
+same "missing" the gaps and priority reports use), built once from PROD
+rows. Everything else is a vectorized reduction of it:
+
+  field coverage     filled / missing / % per field (column sums)
+  pillar coverage    EHD and Fire AHJ completeness per jurisdiction
+  gaps               (jurisdiction, field) pairs that are missing
+  worst              top-N jurisdictions by missing count, by
+                     argpartition rather than a full sort; ties keep input
+                     order, so it matches the priority list's stable sort
+  county rollup      per-county jurisdictions, missing and % (bincount)
+
+The tables print through report_engine, so --format md/csv/json works as
+in jurisdiction_reports.py. Requires numpy.
+
+Usage:
+    python3 coverage_matrix.py --rows prod_rows.json
+    python3 coverage_matrix.py --rows prod_rows.json --top 25 --format csv --out-dir reports/
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    print("pip install numpy")
+    sys.exit(1)
+
+sys.path.insert(0, str(Path(__file__).parent))
+from jurisdiction_reports import EHD_FIELDS, FIRE_FIELDS, load_rows
+from report_engine import EMPTY, FORMATS, run
+
+
+FIELDS = EHD_FIELDS + FIRE_FIELDS
+PILLARS = {"EHD": EHD_FIELDS, "Fire": FIRE_FIELDS}
+
+
+class CoverageMatrix:
+    """missing: bool[jurisdictions, fields]; counties/cities label the rows."""
+
+    def __init__(self, missing, counties, cities, fields=FIELDS):
+        self.missing = missing
+        self.counties = counties
+        self.cities = cities
+        self.fields = list(fields)
+        self._column = {f: i for i, f in enumerate(self.fields)}
+
+    @classmethod
+    def from_rows(cls, rows, fields=FIELDS):
+        rows = rows if isinstance(rows, list) else list(rows)
+        missing = np.fromiter((row.get(f) is None for row in rows for f in fields), dtype=bool,
+                              count=len(rows) * len(fields)).reshape(len(rows), len(fields))
+        counties = np.array([row["county"] for row in rows], dtype=object)
+        cities = np.array([row["city"] for row in rows], dtype=object)
+        return cls(missing, counties, cities, fields)
+
+    def __len__(self):
+        return self.missing.shape[0]
+
+    def columns(self, fields) -> list:
+        return [self._column[f] for f in fields]
+
+    # ── Reductions ──
+
+    def missing_counts(self, fields=None):
+        """int[jurisdictions] missing fields per row, over `fields` (default: all)."""
+        block = self.missing if fields is None else self.missing[:, self.columns(fields)]
+        return block.sum(axis=1)
+
+    def field_coverage(self) -> list:
+        n = len(self)
+        missing = self.missing.sum(axis=0)
+        pct = (n - missing) * 100.0 / n if n else np.zeros(len(self.fields))
+        pillar_of = {f: p for p, names in PILLARS.items() for f in names}
+        return [{"pillar": pillar_of.get(f, EMPTY), "field": f, "filled": int(n - m), "missing": int(m),
+                 "pct": round(float(p), 1)} for f, m, p in zip(self.fields, missing, pct)]
+
+    def gaps(self, fields=None):
+        """(row indices, field names) of missing cells, row-major like the gaps report."""
+        cols = list(range(len(self.fields))) if fields is None else self.columns(fields)
+        rows, picked = np.nonzero(self.missing[:, cols])
+        return rows, [self.fields[cols[c]] for c in picked]
+
+    def worst(self, n: int):
+        """
+        Row indices of the n jurisdictions missing the most fields, worst
+        first, ties in input order. Partial selection: argpartition finds the
+        cut-off count, and only rows at or above it are ordered.
+        """
+        totals = self.missing_counts()
+        size = len(totals)
+        if n <= 0 or size == 0:
+            return np.empty(0, dtype=np.int64)
+        if n < size:
+            cutoff = totals[np.argpartition(-totals, n - 1)[n - 1]]
+            above = np.flatnonzero(totals > cutoff)
+            ties = np.flatnonzero(totals == cutoff)[:n - len(above)]
+            picked = np.concatenate([above, ties])
+        else:
+            picked = np.arange(size)
+        return picked[np.lexsort((picked, -totals[picked]))]
+
+    def county_rollup(self) -> list:
+        """Per county, sorted by name: jurisdictions, missing cells and % filled overall and per pillar."""
+        names, inverse = np.unique(self.counties.astype(str), return_inverse=True)
+        jurisdictions = np.bincount(inverse, minlength=len(names))
+        out = {"county": names, "jurisdictions": jurisdictions}
+        for label, fields in [("all", self.fields)] + list(PILLARS.items()):
+            missing = np.bincount(inverse, weights=self.missing_counts(fields), minlength=len(names))
+            cells = jurisdictions * len(fields)
+            out[label] = (missing, np.where(cells, (cells - missing) * 100.0 / np.maximum(cells, 1), 0.0))
+        return [{"county": str(names[i]), "jurisdictions": int(jurisdictions[i]),
+                 "missing": int(out["all"][0][i]), "pct": round(float(out["all"][1][i]), 1),
+                 "ehd_pct": round(float(out["EHD"][1][i]), 1), "fire_pct": round(float(out["Fire"][1][i]), 1)}
+                for i in range(len(names))]
+
+    def worst_records(self, n: int) -> list:
+        ehd, fire = self.missing_counts(EHD_FIELDS), self.missing_counts(FIRE_FIELDS)
+        return [{"county": self.counties[i], "city": self.cities[i] or EMPTY,
+                 "ehd_missing": int(ehd[i]), "fire_missing": int(fire[i]), "total_missing": int(ehd[i] + fire[i]),
+                 "gaps": ", ".join(f for f, m in zip(self.fields, self.missing[i]) if m)}
+                for i in self.worst(n)]
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+MATRIX_REPORTS = [
+    {
+        "name": "contact_field_coverage",
+        "title": "Contact Field Coverage",
+        "grain": "field_coverage",
+        "columns": [["Pillar", "pillar"], ["Field", "field"], ["Filled", "filled"], ["Missing", "missing"],
+                    ["% Filled", "pct"]],
+    },
+    {
+        "name": "contact_county_rollup",
+        "title": "Contact Coverage by County",
+        "grain": "county_rollup",
+        "columns": [["County", "county"], ["Jurisdictions", "jurisdictions"], ["Missing Fields", "missing"],
+                    ["% Filled", "pct"], ["EHD % Filled", "ehd_pct"], ["Fire % Filled", "fire_pct"]],
+    },
+    {
+        "name": "contact_worst_jurisdictions",
+        "title": "Least Complete Jurisdictions",
+        "grain": "worst",
+        "rank": True,
+        "columns": [["County", "county"], ["City", "city"], ["Missing EHD Fields", "ehd_missing"],
+                    ["Missing Fire Fields", "fire_missing"], ["Total Missing", "total_missing"],
+                    ["Specific Gaps", "gaps"]],
+    },
+]
+
+
+def build_reports(matrix: CoverageMatrix, top=10) -> dict:
+    """Each matrix table is one pre-reduced record list; the engine only formats them."""
+    tables = {"field_coverage": matrix.field_coverage(), "county_rollup": matrix.county_rollup(),
+              "worst": matrix.worst_records(top)}
+    grains = {name: (lambda table: lambda _: table)(table) for name, table in tables.items()}
+    return run([None], MATRIX_REPORTS, grains)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contact-field coverage matrix and rollups")
+    parser.add_argument("--rows", required=True, help="PROD jurisdiction rows (JSON or saved query result)")
+    parser.add_argument("--top", type=int, default=10, help="Least complete jurisdictions to list (default: 10)")
+    parser.add_argument("--out-dir", help="Write reports here instead of printing a summary")
+    parser.add_argument("--format", nargs="+", choices=sorted(FORMATS), default=["md"],
+                        help="Output format(s) with --out-dir (default: md)")
+    parser.add_argument("--date", default=date.today().isoformat(), help="Date label in titles (default: today)")
+    args = parser.parse_args(argv)
+
+    rows = load_rows(args.rows)
+    started = time.perf_counter()
+    matrix = CoverageMatrix.from_rows(rows)
+    built = time.perf_counter() - started
+    results = build_reports(matrix, args.top)
+    elapsed = time.perf_counter() - started
+
+    if args.out_dir:
+        out_dir = Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name, result in results.items():
+            for fmt in args.format:
+                with open(out_dir / f"{name}.{fmt}", "w", encoding="utf-8", newline="\n") as f:
+                    f.write(FORMATS[fmt](result, args.date))
+            print(f"  {name}: {result.count} rows")
+    else:
+        n = len(matrix)
+        filled = n * len(matrix.fields) - int(matrix.missing.sum())
+        print(f"{n} jurisdiction(s) × {len(matrix.fields)} field(s): "
+              f"{filled * 100.0 / max(n * len(matrix.fields), 1):.1f}% filled")
+        for pillar, fields in PILLARS.items():
+            block = matrix.missing[:, matrix.columns(fields)]
+            complete = int((~block).all(axis=1).sum())
+            print(f"  {pillar:<5} {100.0 - block.mean() * 100.0 if n else 0.0:5.1f}% filled, "
+                  f"{complete} jurisdiction(s) complete")
+        print(f"\nLeast complete ({args.top}):")
+        for rank, r in enumerate(results["contact_worst_jurisdictions"].rows[0], 1):
+            print(f"  {rank:>3}. {r[1]} / {r[2]}: {r[5]} missing")
+    print(f"\nMatrix built in {built * 1000:.1f} ms, reports in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+EvidLY Reports — Backfill Dry-Run Artifact
+===========================================
+
+tmp_dryrun_builder.mjs writes the backfill dry run twice: the markdown
+table for review and a JSONL artifact for tools. The artifact has a
+header line followed by one record per table row:
+
+  {"_artifact": "jurisdiction_backfill_dryrun", "format": 1, "date": "2026-05-21"}
+  {"n": 1, "county": "Alameda", "city": null, "field": "agency_phone", "current": null,
+   "value": "(510) 567-6700", "path": "grading_config.agency_contact.phone", "bucket": "HIGH"}
+  {"n": 9, "county": "Alameda", "city": null, "field": null, "note": "phone SKIP: after_hours",
+   "bucket": "SKIP"}
+
+Empty cells are null, never "—". Cells are keyed by (county, city, field);
+skip notes have field null. load_dryrun() indexes either form (artifact or
+legacy markdown) into dicts for constant-time lookups by the reports.
+
+Usage:
+    python3 dryrun_artifact.py ../../docs/jurisdiction_backfill_dryrun_20260521.md     # -> .jsonl beside it
+    python3 dryrun_artifact.py dryrun.md -o dryrun.jsonl --date 2026-05-21
+    python3 dryrun_artifact.py dryrun.jsonl --lookup "Los Angeles" Pasadena agency_phone
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+
+ARTIFACT = "jurisdiction_backfill_dryrun"
+
+ARTIFACT_FORMAT = 1
+
+EMPTY = "—"
+
+SKIP_NOTE = "_SKIP NOTE_"
+
+# Cells the dry run decided not to write; they never count as a source
+SKIP_BUCKET = "_SKIP"
+
+_DATE_RE = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+
+
+class ArtifactError(ValueError):
+    pass
+
+
+def _cell(text: str):
+    text = text.strip()
+    return None if text in ("", EMPTY) else text
+
+
+def _has_value(text) -> bool:
+    return bool(text) and len(text) > 1 and any(c.isalnum() for c in text)
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def markdown_records(lines):
+    """Artifact records from a dry-run markdown table; other tables and prose are skipped."""
+    for line in lines:
+        if not line.startswith("|"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 10 or not parts[1].strip().isdigit():
+            continue
+        city = parts[3].strip()
+        record = {"n": int(parts[1]), "county": parts[2].strip(),
+                  "city": city if any(c.isalnum() for c in city) else None}
+        if parts[4].strip() == SKIP_NOTE:
+            record.update(field=None, note=parts[7].strip(), bucket=_cell(parts[8]))
+        else:
+            current = _cell(parts[5])
+            record.update(field=parts[4].strip(), current=None if current == "NULL" else current,
+                          value=_cell(parts[6]), path=_cell(parts[7]), bucket=_cell(parts[8]))
+        yield record
+
+
+def read_artifact(path):
+    """Records from a JSONL artifact, after checking its header."""
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("_artifact") != ARTIFACT:
+            raise ArtifactError(f"{path}: not a {ARTIFACT} artifact")
+        if header.get("format") != ARTIFACT_FORMAT:
+            raise ArtifactError(f"{path}: artifact format {header.get('format')} (expected {ARTIFACT_FORMAT})")
+        for number, line in enumerate(f, 2):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ArtifactError(f"{path}:{number}: {e}") from None
+
+
+def index_records(records) -> dict:
+    """
+    Lookup tables over dry-run records:
+
+      cells    (county, city, field) -> record (last one wins)
+      sources  (county, city, field) -> (path, bucket) for cells with a value
+      phones   (county, city) -> {'bucket', 'src', 'val'} from the agency_phone
+               cell; bucket 'NULL' when it had no value
+      notes    (county, city) -> [skip note, ...]
+
+    Cells in the _SKIP bucket are kept in cells only.
+    """
+    cells, sources, phones, notes = {}, {}, {}, {}
+    for r in records:
+        jurisdiction = (r["county"], r["city"])
+        if r.get("field") is None:
+            notes.setdefault(jurisdiction, []).append(r.get("note"))
+            continue
+        key = jurisdiction + (r["field"],)
+        cells[key] = r
+        if r.get("bucket") == SKIP_BUCKET:
+            continue
+        has_val = _has_value(r.get("value"))
+        if has_val:
+            sources[key] = (r.get("path") or EMPTY, r.get("bucket") or EMPTY)
+        if r["field"] == "agency_phone":
+            phones[jurisdiction] = {"bucket": (r.get("bucket") or EMPTY) if has_val else "NULL",
+                                    "src": (r.get("path") or EMPTY) if has_val else None,
+                                    "val": r.get("value") if has_val else None}
+    return {"cells": cells, "sources": sources, "phones": phones, "notes": notes}
+
+
+def index_markdown(lines) -> dict:
+    return index_records(markdown_records(lines))
+
+
+def load_dryrun(path) -> dict:
+    """index_records() of a .jsonl artifact, or of a legacy markdown dry run."""
+    if Path(path).suffix == ".jsonl":
+        return index_records(read_artifact(path))
+    with open(path, encoding="utf-8") as f:
+        return index_markdown(f.read().split("\n"))
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def write_artifact(records, path, date=None) -> int:
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(json.dumps({"_artifact": ARTIFACT, "format": ARTIFACT_FORMAT, "date": date}) + "\n")
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert or query a backfill dry-run artifact")
+    parser.add_argument("source", help="Dry-run markdown (converted) or JSONL artifact (with --lookup)")
+    parser.add_argument("-o", "--output", help="Artifact path (default: source with a .jsonl suffix)")
+    parser.add_argument("--date", help="Run date for the header (default: from the file name)")
+    parser.add_argument("--lookup", nargs="+", metavar="ARG", help="COUNTY [CITY] FIELD: print one cell")
+    args = parser.parse_args()
+
+    if args.lookup:
+        if len(args.lookup) not in (2, 3):
+            parser.error("--lookup takes COUNTY [CITY] FIELD")
+        county, field = args.lookup[0], args.lookup[-1]
+        city = args.lookup[1] if len(args.lookup) == 3 else None
+        index = load_dryrun(args.source)
+        cell = index["cells"].get((county, city, field))
+        if cell is None:
+            sys.exit(f"No {field} cell for {county} / {city or EMPTY}")
+        print(json.dumps(cell, indent=2, ensure_ascii=False))
+        for note in index["notes"].get((county, city), []):
+            print(f"  note: {note}")
+        return
+
+    source = Path(args.source)
+    if source.suffix == ".jsonl":
+        parser.error("source is already an artifact; use --lookup to query it")
+    output = Path(args.output) if args.output else source.with_suffix(".jsonl")
+    date = args.date
+    if date is None:
+        m = _DATE_RE.search(source.stem)
+        date = f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m else None
+    with open(source, encoding="utf-8") as f:
+        count = write_artifact(markdown_records(f.read().split("\n")), output, date)
+    print(f"{count} record(s) -> {output}")
+
+
+if __name__ == "__main__":
+    main()
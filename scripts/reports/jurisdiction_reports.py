@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+EvidLY Reports — Jurisdiction Contact Reports
+==============================================
+
+The Step 3C contact reports (coverage, gaps, phone source quality, priority
+list) as report_engine definitions over PROD jurisdiction rows.
+
+The backfill dry run (JSONL artifact, or legacy markdown) is indexed once
+into per-(county, city, column) source paths and buckets; each row is then expanded once into its field
+records (one per EHD/Fire contact field) and one jurisdiction summary
+record, and every report is fed from that single pass.
+
+Usage:
+    python3 jurisdiction_reports.py --rows prod_rows.jsonl --dryrun docs/jurisdiction_backfill_dryrun_20260521.jsonl
+    python3 jurisdiction_reports.py --rows prod_rows.json --dryrun dryrun.jsonl --format md csv json --out-dir reports/
+    python3 jurisdiction_reports.py --rows prod_rows.json --dryrun dryrun.md --only jurisdiction_priority_list --stamp 20260521
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from dryrun_artifact import load_dryrun
+from report_engine import EMPTY, FORMATS, run
+
+
+EHD_FIELDS = ["agency_phone", "agency_fax", "agency_email", "agency_address",
+              "agency_website", "poc_name", "poc_title"]
+FIRE_FIELDS = ["fire_ahj_phone", "fire_ahj_fax", "fire_ahj_email",
+               "fire_ahj_address", "fire_ahj_website", "fire_ahj_poc_name", "fire_ahj_poc_title"]
+
+# Counties whose agency_website was filled from the SD0 fallback list
+SD0_COUNTIES = frozenset([
+    "Colusa", "Inyo", "Marin", "Modoc", "Mono", "Nevada", "Placer", "Plumas",
+    "San Diego", "San Francisco", "San Mateo", "Santa Cruz", "Sierra", "Siskiyou",
+    "Sonoma", "Sutter", "Tehama", "Trinity", "Tuolumne", "Yolo", "Yuba",
+])
+
+EHD_GAP_REASONS = {
+    "poc_name": "No POC in JSONB",
+    "poc_title": "No POC in JSONB",
+    "agency_website": "No website in JSONB or source_documents",
+    "agency_fax": "No fax in agency_contact",
+    "agency_email": "No email in agency_contact",
+    "agency_phone": "No phone in agency_contact",
+    "agency_address": "No address in JSONB",
+}
+FIRE_GAP_REASONS = {
+    "fire_ahj_phone": "No ahj_phone in fire config",
+    "fire_ahj_fax": "No ahj_fax in fire config",
+    "fire_ahj_email": "No ahj_email in fire config",
+    "fire_ahj_address": "No ahj_address in fire config",
+    "fire_ahj_website": "No ahj_website in fire config",
+    "fire_ahj_poc_name": "No POC in fire config",
+    "fire_ahj_poc_title": "No POC in fire config",
+}
+
+# Phone dry-run bucket -> (confidence, note)
+PHONE_BUCKETS = {
+    "HIGH": ("HIGH", "Direct agency_contact.phone"),
+    "LOW": ("LOW", "Non-canonical key (board of supervisors, general line)"),
+    "DIRECT": ("HIGH", "Direct match"),
+}
+
+MANUAL_TARGET = "MANUAL RESEARCH REQUIRED"
+
+
+# ============================================================================
+# REPORT DEFINITIONS
+# ============================================================================
+
+_GAP_COLUMNS = [["County", "county"], ["City", "city"], ["Pillar", "pillar"], ["Field", "field"],
+                ["Reason for Gap", "gap_reason"], ["Firecrawl Target URL", "target_url"]]
+
+REPORTS = [
+    {
+        "name": "jurisdiction_contact_coverage",
+        "title": "Jurisdiction Contact Coverage Report",
+        "grain": "field",
+        "columns": [["County", "county"], ["City", "city"], ["Pillar", "pillar"], ["Field", "field"],
+                    ["Status", "status"], ["Source Bucket", "source_bucket"],
+                    ["Source JSONB Path", "source_path"], ["Value", "display"]],
+    },
+    {
+        "name": "jurisdiction_contact_gaps",
+        "title": "Jurisdiction Contact Gaps Report",
+        "grain": "field",
+        "where": {"value": {"is_null": True}},
+        "sections": [{"heading": "EHD Gaps", "where": {"pillar": "EHD"}},
+                     {"heading": "Fire AHJ Gaps", "where": {"pillar": "Fire"}}],
+        "columns": _GAP_COLUMNS,
+    },
+    {
+        "name": "phone_source_quality_flags",
+        "title": "Phone Source Quality Flags",
+        "grain": "jurisdiction",
+        "columns": [["County", "county"], ["City", "city"], ["Phone Source JSONB Key", "phone_source"],
+                    ["Confidence", "phone_confidence"], ["Value", "phone_display"], ["Notes", "phone_notes"]],
+    },
+    {
+        "name": "jurisdiction_priority_list",
+        "title": "Jurisdiction Priority List",
+        "grain": "jurisdiction",
+        "sort": ["-total_missing"],
+        "limit": 10,
+        "rank": True,
+        "columns": [["County", "county"], ["City", "city"], ["Missing EHD Fields", "ehd_missing_count"],
+                    ["Missing Fire Fields", "fire_missing_count"], ["Total Missing", "total_missing"],
+                    ["Specific Gaps", "specific_gaps"], ["Firecrawl URLs (EHD + Fire)", "urls"],
+                    ["Manual Flag", "manual"]],
+    },
+]
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def load_rows(path) -> list:
+    """
+    PROD jurisdiction rows from JSONL (one row per line), a JSON list, a
+    {"rows": [...]} object, or a saved query tool result (text before the
+    first '{' is skipped).
+    """
+    raw = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix == ".jsonl":
+        return [json.loads(line) for line in raw.splitlines() if line.strip()]
+    stripped = raw.lstrip()
+    if not stripped.startswith("["):
+        stripped = raw[raw.index("{"):]
+    data = json.loads(stripped)
+    return data["rows"] if isinstance(data, dict) else data
+
+
+# ============================================================================
+# GRAINS
+# ============================================================================
+
+def make_grains(dryrun: dict) -> dict:
+    sources = dryrun["sources"]
+    phones = dryrun["phones"]
+
+    def fields(row):
+        county = row["county"]
+        city_key = row["city"]
+        city = city_key or EMPTY
+        website = row.get("agency_website")
+        fire_web = row.get("fire_ahj_website")
+        has_fire_config = fire_web or row.get("fire_ahj_phone")
+        for pillar, names, fallback in (("EHD", EHD_FIELDS, row["contact_data_source"] or "unverified"),
+                                        ("Fire", FIRE_FIELDS, row["fire_ahj_data_source"] or "unverified")):
+            for f in names:
+                val = row.get(f)
+                if val:
+                    source = sources.get((county, city_key, f))
+                    path, bucket = source or (fallback, fallback)
+                    if f == "agency_website" and county in SD0_COUNTIES and source and bucket == "SD0_FILL":
+                        bucket = "sd0_fallback"
+                else:
+                    path = bucket = EMPTY
+                if pillar == "EHD":
+                    reason = EHD_GAP_REASONS.get(f, "Not in JSONB")
+                    target = website or MANUAL_TARGET
+                else:
+                    reason = FIRE_GAP_REASONS.get(f, "Not in fire config") if has_fire_config else "No fire config"
+                    target = fire_web or MANUAL_TARGET
+                yield {
+                    "county": county, "city": city, "pillar": pillar, "field": f, "value": val,
+                    "status": "Filled" if val else "Missing", "source_bucket": bucket, "source_path": path,
+                    "display": val if val else EMPTY, "gap_reason": reason, "target_url": target,
+                }
+
+    def jurisdiction(row):
+        county = row["county"]
+        phone = row.get("agency_phone")
+        if phone:
+            pc = phones.get((county, row["city"]), {})
+            bucket = pc.get("bucket", "unknown")
+            conf, notes = PHONE_BUCKETS.get(bucket, ("HIGH", ""))
+            src = pc.get("src", "unknown")
+        else:
+            src, conf, notes = EMPTY, "NULL", "No phone found in any JSONB path"
+        ehd_missing = [f for f in EHD_FIELDS if row.get(f) is None]
+        fire_missing = [f for f in FIRE_FIELDS if row.get(f) is None]
+        website = row.get("agency_website")
+        fire_web = row.get("fire_ahj_website")
+        yield {
+            "county": county, "city": row["city"] or EMPTY,
+            "phone_source": src, "phone_confidence": conf, "phone_display": phone or EMPTY, "phone_notes": notes,
+            "ehd_missing_count": len(ehd_missing), "fire_missing_count": len(fire_missing),
+            "total_missing": len(ehd_missing) + len(fire_missing),
+            "specific_gaps": ", ".join(ehd_missing + fire_missing),
+            "urls": f"EHD: {website or 'NONE'} / Fire: {fire_web or 'NONE'}",
+            "manual": "yes" if not website or not fire_web else "no",
+        }
+
+    return {"field": fields, "jurisdiction": jurisdiction}
+
+
+def build_reports(rows, dryrun: dict, only=None) -> dict:
+    """Run REPORTS (or the `only` subset) over rows, with a dryrun_artifact index."""
+    reports = [r for r in REPORTS if not only or r["name"] in only]
+    return run(rows, reports, make_grains(dryrun))
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate jurisdiction contact reports in one pass")
+    parser.add_argument("--rows", required=True, help="PROD jurisdiction rows (JSON or saved query result)")
+    parser.add_argument("--dryrun", required=True, help="Backfill dry-run artifact (.jsonl) or legacy markdown")
+    parser.add_argument("--out-dir", default="docs", help="Output directory (default: docs)")
+    parser.add_argument("--format", nargs="+", choices=sorted(FORMATS), default=["md"],
+                        help="Output format(s) (default: md)")
+    parser.add_argument("--only", nargs="+", choices=[r["name"] for r in REPORTS], help="Reports to generate")
+    parser.add_argument("--date", default=date.today().isoformat(), help="Date label in titles (default: today)")
+    parser.add_argument("--stamp", help="Suffix output file names, e.g. 20260521 -> <name>_20260521.md")
+    parser.add_argument("--history", metavar="STORE",
+                        help="Also append this run's coverage matrix to a coverage_history store (needs numpy)")
+    parser.add_argument("--label", help="Snapshot label with --history")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows = load_rows(args.rows)
+    results = build_reports(rows, load_dryrun(args.dryrun), args.only)
+    elapsed = time.perf_counter() - started
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, result in results.items():
+        stem = f"{name}_{args.stamp}" if args.stamp else name
+        for fmt in args.format:
+            path = out_dir / f"{stem}.{fmt}"
+            with open(path, "w", encoding="utf-8", newline="\n") as f:
+                f.write(FORMATS[fmt](result, args.date))
+        counts = "" if len(result.rows) == 1 else " (" + ", ".join(
+            f"{heading}: {len(rows)}" for (heading, _), rows in zip(result.sections, result.rows)) + ")"
+        print(f"  {name}: {result.count} rows{counts}")
+    print(f"{len(rows)} jurisdiction(s), {len(results)} report(s) in {elapsed * 1000:.1f} ms -> {out_dir}/")
+
+    if args.history:
+        from coverage_history import SnapshotStore
+        from coverage_matrix import CoverageMatrix
+        entry = SnapshotStore(args.history).append(CoverageMatrix.from_rows(rows), args.date, args.label)
+        print(f"Coverage snapshot {entry['id']} -> {Path(args.history) / entry['file']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+EvidLY Reports — Declarative Report Engine
+===========================================
+
+Reports are plain dicts; the engine makes one pass over the input rows and
+feeds every report from it.
+
+A report definition:
+
+  name      output file stem
+  title     markdown heading (the run's date label is appended)
+  grain     which record stream it reads (see below)
+  columns   [[header, key], ...]; values are taken from the record as-is
+  where     optional filter, {key: condition}; all must hold
+  sections  optional [{heading, where}]; one table per section, in order
+            (markdown), or a leading "Section" column (CSV/JSON)
+  sort      optional keys, "-key" for descending; ties keep scan order
+  limit     optional row cap; with sort, a partial (heap) selection
+  rank      optional; prepend a 1-based "Rank" column
+
+A condition is a value (equality), {"in": [...]}, {"ne": value},
+{"is_null": bool} or {"truthy": bool}.
+
+Grains are functions row -> iterable of records (dicts), passed to run().
+Each grain a report needs is expanded once per row and the records are
+shared by every report on that grain, so adding a report never adds a
+pass over the data.
+"""
+
+import csv
+import heapq
+import io
+import json
+from collections import defaultdict
+
+
+EMPTY = "\u2014"
+
+_OPERATORS = ("in", "ne", "is_null", "truthy")
+
+
+class ReportError(ValueError):
+    pass
+
+
+def validate(report: dict, grains: dict):
+    for field in ("name", "title", "grain", "columns"):
+        if not report.get(field):
+            raise ReportError(f"report {report.get('name', '?')!r}: missing '{field}'")
+    if report["grain"] not in grains:
+        raise ReportError(f"report {report['name']!r}: unknown grain {report['grain']!r}")
+    for where in [report.get("where") or {}] + [s.get("where") or {} for s in report.get("sections") or []]:
+        for key, cond in where.items():
+            if isinstance(cond, dict) and (len(cond) != 1 or next(iter(cond)) not in _OPERATORS):
+                raise ReportError(f"report {report['name']!r}: bad condition on {key!r}: {cond!r}")
+
+
+def matches(record: dict, where) -> bool:
+    for key, cond in (where or {}).items():
+        value = record.get(key)
+        if isinstance(cond, dict):
+            op, arg = next(iter(cond.items()))
+            if op == "in" and value not in arg:
+                return False
+            if op == "ne" and value == arg:
+                return False
+            if op == "is_null" and (value is None) != arg:
+                return False
+            if op == "truthy" and bool(value) != arg:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+class _Desc:
+    """Inverts ordering for descending sort keys of any comparable type."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _sort_key(record: dict, sort: list) -> tuple:
+    key = []
+    for spec in sort:
+        if spec.startswith("-"):
+            key.append(_Desc(record.get(spec[1:])))
+        else:
+            key.append(record.get(spec))
+    return tuple(key)
+
+
+class ReportResult:
+    """Collected rows of one report, per section."""
+
+    def __init__(self, report: dict):
+        self.report = report
+        self.headers = (["Rank"] if report.get("rank") else []) + [h for h, _ in report["columns"]]
+        self.sections = [(s.get("heading"), s.get("where")) for s in report.get("sections") or []] or [(None, None)]
+        self._collected = [[] for _ in self.sections]
+        self.rows = None
+
+    def offer(self, record: dict, seq: int):
+        if not matches(record, self.report.get("where")):
+            return
+        for i, (_, where) in enumerate(self.sections):
+            if matches(record, where):
+                values = [record.get(key) for _, key in self.report["columns"]]
+                sort_key = _sort_key(record, self.report["sort"]) if self.report.get("sort") else ()
+                self._collected[i].append((sort_key, seq, values))
+
+    def finish(self):
+        limit = self.report.get("limit")
+        self.rows = []
+        for collected in self._collected:
+            if self.report.get("sort"):
+                order = lambda item: (item[0], item[1])
+                collected = heapq.nsmallest(limit, collected, key=order) if limit else sorted(collected, key=order)
+            elif limit:
+                collected = collected[:limit]
+            rows = [values for _, _, values in collected]
+            if self.report.get("rank"):
+                rows = [[i + 1] + values for i, values in enumerate(rows)]
+            self.rows.append(rows)
+        self._collected = None
+        return self
+
+    @property
+    def count(self) -> int:
+        return sum(len(rows) for rows in self.rows)
+
+
+def run(rows, reports: list, grains: dict) -> dict:
+    """name -> ReportResult for every report, from a single pass over `rows`."""
+    for report in reports:
+        validate(report, grains)
+    results = {r["name"]: ReportResult(r) for r in reports}
+    by_grain = defaultdict(list)
+    for report in reports:
+        by_grain[report["grain"]].append(results[report["name"]])
+
+    seq = 0
+    for row in rows:
+        for grain, consumers in by_grain.items():
+            for record in grains[grain](row):
+                for result in consumers:
+                    result.offer(record, seq)
+                seq += 1
+    return {name: result.finish() for name, result in results.items()}
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def _cell(value) -> str:
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def to_markdown(result: ReportResult, label=None) -> str:
+    title = result.report["title"] + (f" {EMPTY} {label}" if label else "")
+    lines = [f"# {title}", ""]
+    header = "| " + " | ".join(result.headers) + " |"
+    rule = "|" + "---|" * len(result.headers)
+    for i, ((heading, _), rows) in enumerate(zip(result.sections, result.rows)):
+        if heading:
+            if i:
+                lines.append("")
+            lines.extend([f"## {heading}", ""])
+        lines.extend([header, rule])
+        lines.extend("| " + " | ".join(_cell(v) for v in values) + " |" for values in rows)
+    return "\n".join(lines) + "\n"
+
+
+def _sectioned(result: ReportResult):
+    multi = len(result.sections) > 1 or result.sections[0][0] is not None
+    for (heading, _), rows in zip(result.sections, result.rows):
+        for values in rows:
+            yield ([heading] if multi else []) + list(values)
+
+
+def to_csv(result: ReportResult) -> str:
+    multi = len(result.sections) > 1 or result.sections[0][0] is not None
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow((["Section"] if multi else []) + result.headers)
+    writer.writerows(_sectioned(result))
+    return buf.getvalue()
+
+
+def to_json(result: ReportResult, label=None) -> str:
+    data = {
+        "name": result.report["name"],
+        "title": result.report["title"],
+        "label": label,
+        "sections": [{"heading": heading, "rows": [dict(zip(result.headers, values)) for values in rows]}
+                     for (heading, _), rows in zip(result.sections, result.rows)],
+    }
+    return json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+
+
+FORMATS = {
+    "md": lambda result, label: to_markdown(result, label),
+    "csv": lambda result, label: to_csv(result),
+    "json": lambda result, label: to_json(result, label),
+}
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Test the declarative report engine and the jurisdiction contact reports.
+No network or database access.
+"""
+import csv
+import io
+import json
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from coverage_history import SnapshotStore, field_trend, gap_changes, snapshot_summary
+from coverage_matrix import CoverageMatrix
+from dryrun_artifact import ArtifactError, index_markdown, load_dryrun, markdown_records, write_artifact
+from jurisdiction_reports import REPORTS, build_reports
+from report_engine import ReportError, run, to_csv, to_json, to_markdown
+
+
+DRYRUN = """\
+# Jurisdiction Backfill Dry Run — 2026-05-21
+
+| # | County | City | Column | Current | New Value | Source JSONB Path | Bucket |
+|---|---|---|---|---|---|---|---|
+| 1 | Alameda | — | agency_phone | NULL | (510) 567-6700 | grading_config.agency_contact.phone | HIGH |
+| 2 | Alameda | — | agency_website | NULL | https://deh.acgov.org | source_documents.url | DIRECT |
+| 3 | Marin | — | agency_phone | NULL | (415) 473-6907 | grading_config.board.phone | LOW |
+| 4 | Marin | — | agency_website | NULL | https://marin.gov | sd0 | SD0_FILL |
+| 5 | Marin | — | agency_email | NULL | eh@marin.gov | grading_config.agency_contact.email | _SKIP |
+| 6 | Marin | — | _SKIP NOTE_ | — | — | POC SKIP (wrong role): director | SKIP |
+| 7 | Alameda | Berkeley | agency_phone | NULL | — | — | NULL |
+"""
+
+FIELDS = ["agency_phone", "agency_fax", "agency_email", "agency_address", "agency_website", "poc_name",
+          "poc_title", "fire_ahj_phone", "fire_ahj_fax", "fire_ahj_email", "fire_ahj_address",
+          "fire_ahj_website", "fire_ahj_poc_name", "fire_ahj_poc_title"]
+
+
+def row(county, city=None, **values):
+    r = {"county": county, "city": city, "contact_data_source": "jsonb_existing", "fire_ahj_data_source": None}
+    r.update({f: None for f in FIELDS})
+    r.update(values)
+    return r
+
+
+ROWS = [
+    row("Alameda", agency_phone="(510) 567-6700", agency_website="https://deh.acgov.org",
+        fire_ahj_phone="(510) 632-3473", fire_ahj_website="https://acgov.org/fire"),
+    row("Marin", agency_phone="(415) 473-6907", agency_website="https://marin.gov", agency_email="eh@marin.gov"),
+    row("Alameda", "Berkeley"),
+]
+
+
+def test_engine_filters_sort_limit_rank():
+    """where/sections filter, '-key' sorts descending with stable ties, limit applies after sort."""
+    grains = {"item": lambda r: [r]}
+    data = [{"name": n, "score": s, "kind": k} for n, s, k in
+            [("a", 1, "x"), ("b", 3, "y"), ("c", 3, "x"), ("d", 2, "y"), ("e", 0, None)]]
+    reports = [
+        {"name": "top", "title": "Top", "grain": "item", "sort": ["-score", "name"], "limit": 3, "rank": True,
+         "where": {"kind": {"ne": None}}, "columns": [["Name", "name"], ["Score", "score"]]},
+        {"name": "split", "title": "Split", "grain": "item", "columns": [["Name", "name"]],
+         "sections": [{"heading": "X", "where": {"kind": "x"}}, {"heading": "Y", "where": {"kind": {"in": ["y"]}}}]},
+        {"name": "stable", "title": "Stable", "grain": "item", "sort": ["-score"], "columns": [["Name", "name"]]},
+    ]
+    results = run(iter(data), reports, grains)
+    assert results["top"].rows == [[[1, "b", 3], [2, "c", 3], [3, "d", 2]]], results["top"].rows
+    assert results["split"].rows == [[["a"], ["c"]], [["b"], ["d"]]], results["split"].rows
+    assert [r[0] for r in results["stable"].rows[0]] == ["b", "c", "d", "a", "e"]
+
+    for bad in ({"name": "x", "title": "X", "grain": "nope", "columns": [["A", "a"]]},
+                {"name": "x", "title": "X", "grain": "item", "columns": [["A", "a"]], "where": {"a": {"gt": 1}}},
+                {"name": "x", "title": "X", "grain": "item"}):
+        try:
+            run([], [bad], grains)
+            raise AssertionError(f"accepted {bad}")
+        except ReportError:
+            pass
+    return "PASS"
+
+
+def test_single_pass_per_grain():
+    """Each grain is expanded once per row however many reports read it."""
+    calls = {"item": 0}
+
+    def item(r):
+        calls["item"] += 1
+        return [r]
+    reports = [{"name": f"r{i}", "title": "R", "grain": "item", "columns": [["V", "v"]]} for i in range(5)]
+    run(({"v": i} for i in range(100)), reports, {"item": item, "unused": lambda r: 1 / 0})
+    assert calls["item"] == 100, calls
+    return "PASS"
+
+
+def test_output_formats():
+    """Markdown keeps the report layout; CSV/JSON carry sections as data."""
+    grains = {"item": lambda r: [r]}
+    report = {"name": "s", "title": "Sample", "grain": "item", "columns": [["Name", "name"]],
+              "sections": [{"heading": "One", "where": {"g": 1}}, {"heading": "Two", "where": {"g": 2}}]}
+    result = run([{"name": "a|b", "g": 1}, {"name": "c", "g": 2}], [report], grains)["s"]
+    assert to_markdown(result, "2026-05-21") == (
+        "# Sample — 2026-05-21\n\n## One\n\n| Name |\n|---|\n| a\\|b |\n\n## Two\n\n| Name |\n|---|\n| c |\n")
+    assert list(csv.reader(io.StringIO(to_csv(result)))) == [["Section", "Name"], ["One", "a|b"], ["Two", "c"]]
+    data = json.loads(to_json(result, "2026-05-21"))
+    assert [s["rows"] for s in data["sections"]] == [[{"Name": "a|b"}], [{"Name": "c"}]]
+    return "PASS"
+
+
+def test_dryrun_parse():
+    """Sources skip _SKIP cells, notes and valueless rows; the phone map keeps NULL rows."""
+    dryrun = index_markdown(DRYRUN.split("\n"))
+    assert dryrun["sources"][("Marin", None, "agency_website")] == ("sd0", "SD0_FILL")
+    assert ("Marin", None, "agency_email") not in dryrun["sources"]
+    assert ("Alameda", "Berkeley", "agency_phone") not in dryrun["sources"]
+    assert dryrun["phones"][("Alameda", "Berkeley")] == {"bucket": "NULL", "src": None, "val": None}
+    assert dryrun["phones"][("Marin", None)]["bucket"] == "LOW"
+    return "PASS"
+
+
+def test_dryrun_artifact_round_trip():
+    """Markdown -> JSONL artifact indexes identically; nulls replace dashes; bad headers are rejected."""
+    records = list(markdown_records(DRYRUN.split("\n")))
+    assert records[6] == {"n": 7, "county": "Alameda", "city": "Berkeley", "field": "agency_phone", "current": None,
+                          "value": None, "path": None, "bucket": "NULL"}, records[6]
+    assert records[5] == {"n": 6, "county": "Marin", "city": None, "field": None,
+                          "note": "POC SKIP (wrong role): director", "bucket": "SKIP"}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "dryrun.jsonl"
+        assert write_artifact(records, path, "2026-05-21") == 7
+        index = load_dryrun(path)
+        expected = index_markdown(DRYRUN.split("\n"))
+        assert index["sources"] == expected["sources"] and index["phones"] == expected["phones"]
+        assert index["cells"][("Alameda", None, "agency_website")]["bucket"] == "DIRECT"
+        assert index["cells"][("Marin", None, "agency_email")]["bucket"] == "_SKIP"
+        assert ("Marin", None, "agency_email") not in index["sources"]
+        assert index["notes"] == {("Marin", None): ["POC SKIP (wrong role): director"]}
+
+        bad = Path(tmp) / "bad.jsonl"
+        bad.write_text('{"_artifact": "jurisdiction_backfill_dryrun", "format": 99}\n', encoding="utf-8")
+        try:
+            load_dryrun(bad)
+            raise AssertionError("accepted format 99")
+        except ArtifactError:
+            pass
+    return "PASS"
+
+
+def test_jurisdiction_reports():
+    """Coverage, gaps, phone flags and priority list from one run."""
+    results = build_reports(ROWS, index_markdown(DRYRUN.split("\n")))
+    assert list(results) == [r["name"] for r in REPORTS]
+
+    coverage = results["jurisdiction_contact_coverage"].rows[0]
+    assert len(coverage) == 3 * len(FIELDS)
+    by_key = {(r[0], r[1], r[3]): r for r in coverage}
+    assert by_key[("Alameda", "—", "agency_phone")][4:7] == ["Filled", "HIGH", "grading_config.agency_contact.phone"]
+    assert by_key[("Marin", "—", "agency_website")][5] == "sd0_fallback"
+    assert by_key[("Marin", "—", "agency_email")][5:7] == ["jsonb_existing", "jsonb_existing"]
+    assert by_key[("Alameda", "—", "fire_ahj_phone")][5] == "unverified"
+    assert by_key[("Alameda", "Berkeley", "agency_fax")][4:] == ["Missing", "—", "—", "—"]
+
+    ehd_gaps, fire_gaps = results["jurisdiction_contact_gaps"].rows
+    assert len(ehd_gaps) == 5 + 4 + 7 and len(fire_gaps) == 5 + 7 + 7
+    marin_fire = [g for g in fire_gaps if g[0] == "Marin"]
+    assert {g[4] for g in marin_fire} == {"No fire config"}
+    assert {g[5] for g in marin_fire} == {"MANUAL RESEARCH REQUIRED"}
+    alameda_fax = [g for g in fire_gaps if g[0] == "Alameda" and g[1] == "—" and g[3] == "fire_ahj_fax"]
+    assert alameda_fax == [["Alameda", "—", "Fire", "fire_ahj_fax", "No ahj_fax in fire config", "https://acgov.org/fire"]]
+
+    phones = results["phone_source_quality_flags"].rows[0]
+    assert [p[3] for p in phones] == ["HIGH", "LOW", "NULL"], phones
+
+    priority = results["jurisdiction_priority_list"].rows[0]
+    assert [(p[0], p[1], p[2], p[5]) for p in priority] == [(1, "Alameda", "Berkeley", 14), (2, "Marin", "—", 11),
+                                                            (3, "Alameda", "—", 10)], priority
+    assert priority[2][-1] == "no" and priority[0][-1] == "yes"
+    return "PASS"
+
+
+def test_coverage_matrix():
+    """Matrix reductions agree with the row-by-row reports; worst() matches a stable full sort."""
+    matrix = CoverageMatrix.from_rows(ROWS)
+    assert matrix.missing.shape == (3, len(FIELDS))
+    results = build_reports(ROWS, index_markdown(DRYRUN.split("\n")))
+    priority = results["jurisdiction_priority_list"].rows[0]
+    assert [r["total_missing"] for r in matrix.worst_records(10)] == [p[5] for p in priority]
+    assert [(r["county"], r["city"]) for r in matrix.worst_records(2)] == [(p[1], p[2]) for p in priority[:2]]
+
+    gap_rows, gap_fields = matrix.gaps(FIELDS[:7])
+    ehd_gaps = results["jurisdiction_contact_gaps"].rows[0]
+    assert [(matrix.counties[i], f) for i, f in zip(gap_rows, gap_fields)] == [(g[0], g[3]) for g in ehd_gaps]
+
+    coverage = {c["field"]: c for c in matrix.field_coverage()}
+    assert coverage["agency_phone"]["filled"] == 2 and coverage["agency_phone"]["pct"] == 66.7
+    assert coverage["fire_ahj_fax"]["missing"] == 3
+    rollup = {r["county"]: r for r in matrix.county_rollup()}
+    assert rollup["Alameda"]["jurisdictions"] == 2 and rollup["Alameda"]["missing"] == 24
+    assert rollup["Marin"]["ehd_pct"] == 42.9 and rollup["Marin"]["fire_pct"] == 0.0
+
+    rng = random.Random(3)
+    rows = [row(f"C{i}", **{f: "x" for f in FIELDS if rng.random() < 0.5}) for i in range(500)]
+    totals = CoverageMatrix.from_rows(rows).missing_counts().tolist()
+    stable = sorted(range(len(rows)), key=lambda i: -totals[i])
+    for n in (1, 10, 77, 500, 600):
+        assert CoverageMatrix.from_rows(rows).worst(n).tolist() == stable[:n], n
+    return "PASS"
+
+
+def test_coverage_history():
+    """Snapshots round-trip bit-packed; the manifest only grows; trends and gap changes line up."""
+    rng = random.Random(5)
+    first = [row(f"C{i}", **{f: "x" for f in FIELDS if rng.random() < 0.4}) for i in range(13)]
+    second = [dict(r) for r in first[1:]] + [row("New")]
+    second[0]["agency_fax"] = "x" if second[0]["agency_fax"] is None else None
+    for r in second[1:6]:
+        r["poc_name"] = "x"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(tmp)
+        a = store.append(CoverageMatrix.from_rows(first), "2026-05-21", "baseline")
+        manifest_head = store.manifest.read_text(encoding="utf-8")
+        b = store.append(CoverageMatrix.from_rows(second), "2026-06-04")
+        assert store.manifest.read_text(encoding="utf-8").startswith(manifest_head)
+        assert [e["id"] for e in store.entries()] == [1, 2]
+
+        loaded = store.load(a)
+        original = CoverageMatrix.from_rows(first)
+        assert (loaded.missing == original.missing).all() and loaded.missing.shape == (13, len(FIELDS))
+        assert loaded.counties.tolist() == original.counties.tolist() and loaded.cities.tolist() == [None] * 13
+        assert a["filled"]["agency_phone"] == sum(r["agency_phone"] is not None for r in first)
+
+        summary = snapshot_summary(store.entries())
+        assert summary[0]["change"] == "—" and summary[0]["label"] == "baseline"
+        assert summary[1]["pct"] == round(sum(b["filled"].values()) * 100.0 / (13 * len(FIELDS)), 1)
+        trend = {t["field"]: t for t in field_trend(store.entries())}
+        assert trend["poc_name"]["s1"] == round(a["filled"]["poc_name"] * 100.0 / 13, 1)
+
+        changes, counts = gap_changes(store.load(a), store.load(b))
+        assert counts == {"common": 12, "added": 1, "dropped": 1}
+        by_field = {c["field"]: c for c in changes}
+        fax_was_missing = first[1]["agency_fax"] is None
+        assert (by_field["agency_fax"]["closed"], by_field["agency_fax"]["opened"]) == \
+            ((1, 0) if fax_was_missing else (0, 1))
+        assert by_field["poc_name"]["closed"] == sum(first[i]["poc_name"] is None for i in range(2, 7))
+        assert by_field["poc_name"]["opened"] == 0
+
+        proc = subprocess.run([sys.executable, str(Path(__file__).parent / "coverage_history.py"),
+                               "--store", tmp, "--changes", "1", "9"], capture_output=True, text=True)
+        assert proc.returncode == 1 and proc.stderr.strip() == f"❌ {tmp}: no snapshot 9", proc.stderr
+    return "PASS"
+
+
+def run_tests():
+    tests = [
+        test_engine_filters_sort_limit_rank,
+        test_single_pass_per_grain,
+        test_output_formats,
+        test_dryrun_parse,
+        test_dryrun_artifact_round_trip,
+        test_jurisdiction_reports,
+        test_coverage_matrix,
+        test_coverage_history,
+    ]
+
+    passed = 0
+    failed = 0
+    for test_fn in tests:
+        name = test_fn.__name__
+        try:
+            test_fn()
+            print(f"  ✅ {name}")
+            passed += 1
+        except AssertionError as e:
+            print(f"  ❌ {name}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  💥 {name}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'='*50}")
+    print(f"  {passed} passed, {failed} failed, {len(tests)} total")
+    print(f"{'='*50}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Running report engine tests...\n")
+    ok = run_tests()
+    sys.exit(0 if ok else 1)
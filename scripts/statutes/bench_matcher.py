@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Matcher Benchmark Harness
+===================================================
+
+Measures citation_matcher throughput on a batch of violation strings:
+
+  loop        one string at a time, cosine against every section in plain
+              Python (precomputed section dicts) — the per-request baseline
+  batch-N     CitationMatcher.top_k() over batches of N strings (sparse
+              product + argpartition)
+
+Sections come from a citations JSON (--sections) or are synthetic (Zipf
+word distribution, --synthetic N). Queries are drawn from section text with
+extra noise words, so each has a known source section. The report gives
+strings/sec, per-batch latency percentiles, top-1 recall of the source
+section, and how many top-1 results disagree with the loop baseline.
+
+Usage:
+    python3 bench_matcher.py --queries 5000
+    python3 bench_matcher.py --sections out/calcode.citations.json --queries 20000 --batch-sizes 1 256 4096
+    python3 bench_matcher.py --synthetic 5000 --queries 10000 --json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from citation_matcher import CitationMatcher, tokenize
+from push_to_supabase import iter_json_array
+
+
+def synthetic_sections(count: int, vocab_size=6000, seed=7) -> list:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / (i + 1) for i in range(vocab_size)]
+    records = []
+    for i in range(count):
+        body = rng.choices(vocab, weights, k=rng.randint(40, 400))
+        records.append({"code_family": "BENCH", "section_number": str(100000 + i),
+                        "short_title": " ".join(rng.sample(vocab[50:], 3)), "full_text": " ".join(body)})
+    return records
+
+
+def make_queries(records: list, count: int, seed=11) -> list:
+    """(text, source row) pairs: a window of a section's words plus two noise words."""
+    rng = random.Random(seed)
+    noise = ["observed", "during", "inspection", "kitchen", "area", "employee", "staff", "corrected"]
+    queries = []
+    usable = [(i, tokenize(f"{r['short_title']} {r['full_text']}")) for i, r in enumerate(records)]
+    usable = [(i, toks) for i, toks in usable if len(toks) >= 4]
+    for _ in range(count):
+        row, toks = rng.choice(usable)
+        size = rng.randint(4, min(12, len(toks)))
+        start = rng.randint(0, len(toks) - size)
+        words = toks[start:start + size] + rng.sample(noise, 2)
+        rng.shuffle(words)
+        queries.append((" ".join(words), row))
+    return queries
+
+
+def loop_baseline(matcher: CitationMatcher):
+    """Per-string scorer over {column: weight} dicts, one Python dot product per section."""
+    rows = []
+    m = matcher.matrix
+    for r in range(m.shape[0]):
+        start, end = m.indptr[r], m.indptr[r + 1]
+        rows.append(dict(zip(m.indices[start:end].tolist(), m.data[start:end].tolist())))
+
+    def top1(text):
+        q = matcher.vectorize([text])
+        qv = dict(zip(q.indices.tolist(), q.data.tolist()))
+        best, best_score = -1, 0.0
+        for i, row in enumerate(rows):
+            score = sum(w * row.get(col, 0.0) for col, w in qv.items())
+            if score > best_score:
+                best, best_score = i, score
+        return best
+    return top1
+
+
+def summarize(name: str, count: int, wall: float, latencies: list, recall_hits: int, disagreements) -> dict:
+    ms = sorted(l * 1000 for l in latencies)
+    if len(ms) >= 2:
+        q = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95, p99 = q[49], q[94], q[98]
+    else:
+        p50 = p95 = p99 = ms[0] if ms else 0.0
+    return {
+        "strategy": name,
+        "strings": count,
+        "seconds": round(wall, 4),
+        "strings_per_sec": round(count / wall, 1) if wall else None,
+        "samples": len(ms),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "top1_recall": round(recall_hits / count, 4) if count else None,
+        "disagreements": disagreements,
+    }
+
+
+def run_loop(matcher, queries):
+    top1 = loop_baseline(matcher)
+    latencies = []
+    picks = []
+    started = time.perf_counter()
+    for text, _ in queries:
+        t0 = time.perf_counter()
+        picks.append(top1(text))
+        latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+    return wall, latencies, picks
+
+
+def run_batch(matcher, queries, batch_size, k):
+    texts = [t for t, _ in queries]
+    latencies = []
+    picks = []
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        t0 = time.perf_counter()
+        indices, _ = matcher.top_k(texts[start:start + batch_size], k)
+        latencies.append(time.perf_counter() - t0)
+        picks.extend(indices[:, 0].tolist())
+    wall = time.perf_counter() - started
+    return wall, latencies, picks
+
+
+def print_table(results: list):
+    print(f"{'strategy':<12} {'strings':>8} {'strings/s':>11} {'batches':>8} {'p50 ms':>9} "
+          f"{'p95 ms':>9} {'p99 ms':>9} {'recall@1':>9} {'vs loop':>8}")
+    print("-" * 92)
+    for r in results:
+        vs = "-" if r["disagreements"] is None else r["disagreements"]
+        print(f"{r['strategy']:<12} {r['strings']:>8} {r['strings_per_sec']:>11} {r['samples']:>8} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['top1_recall']:>9} {vs:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark violation-to-citation matching")
+    parser.add_argument("--sections", nargs="*", metavar="JSON", help="Citations JSON to match against")
+    parser.add_argument("--synthetic", type=int, default=1000, help="Synthetic sections without --sections (default 1000)")
+    parser.add_argument("--queries", type=int, default=5000, help="Violation strings to match (default 5000)")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 256, 4096],
+                        help="Batch sizes to time (default: 1 256 4096)")
+    parser.add_argument("--top-k", type=int, default=5, help="Citations per string (default 5)")
+    parser.add_argument("--loop-limit", type=int, default=2000,
+                        help="Strings timed for the loop baseline, which is slow (default 2000; 0 skips it)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.sections:
+        records = []
+        for path in args.sections:
+            with open(path, encoding="utf-8") as f:
+                records.extend(iter_json_array(f))
+    else:
+        records = synthetic_sections(args.synthetic)
+
+    started = time.perf_counter()
+    matcher = CitationMatcher.build(records)
+    build_seconds = time.perf_counter() - started
+    queries = make_queries(records, args.queries)
+    sources = [row for _, row in queries]
+
+    results = []
+    loop_picks = None
+    if args.loop_limit:
+        subset = queries[:args.loop_limit]
+        wall, latencies, loop_picks = run_loop(matcher, subset)
+        hits = sum(p == s for p, s in zip(loop_picks, sources))
+        results.append(summarize("loop", len(subset), wall, latencies, hits, None))
+
+    for size in args.batch_sizes:
+        wall, latencies, picks = run_batch(matcher, queries, size, args.top_k)
+        hits = sum(p == s for p, s in zip(picks, sources))
+        disagreements = None
+        if loop_picks is not None:
+            disagreements = sum(a != b for a, b in zip(picks, loop_picks))
+        results.append(summarize(f"batch-{size}", len(queries), wall, latencies, hits, disagreements))
+
+    if args.json:
+        print(json.dumps({
+            "sections": matcher.matrix.shape[0], "terms": matcher.matrix.shape[1],
+            "build_seconds": round(build_seconds, 4), "results": results,
+        }, indent=2))
+    else:
+        print(f"{matcher.matrix.shape[0]} section(s) x {matcher.matrix.shape[1]} term(s), "
+              f"model built in {build_seconds:.2f}s\n")
+        print_table(results)
+
+    # Ties can order differently; anything beyond a handful means the batch path is wrong
+    return 0 if all(not r["disagreements"] or r["disagreements"] <= len(queries) // 100 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Citation Index
+========================================
+
+A persistent sqlite index over parsed code sections, so violation-to-
+citation lookups don't load a whole citations JSON per request:
+
+  sections       one row per (code_family, section_number, edition); exact
+                 section lookup is a single probe of idx_sections_number
+  sections_fts   FTS5 over section number, title and body (porter
+                 stemming), ranked with BM25, titles weighted above bodies
+  section_deps   precomputed transitive closure of cross-references
+                 (cross_refs.py), so a section plus everything it depends on
+                 is one indexed join
+  sources        the JSON files indexed and the sha256 they had, so a
+                 rebuild only re-reads files that changed
+
+Inputs are statute_parser.py output (<grammar>.citations.json) or the older
+tmp_parse_calcode.py calcode_sections.json layout; both are read as a
+stream.
+
+Usage:
+    python3 citation_index.py --build out/*.citations.json
+    python3 citation_index.py --section 114002.1
+    python3 citation_index.py --section 114002.1 --with-deps
+    python3 citation_index.py --search "hot holding temperature" --code-family CalCode
+    python3 citation_index.py --search "handwashing sink soap" --limit 5 --json
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "jie" / "jurisdictions"))
+from cross_refs import number_key, resolve_references, transitive_closure
+from push_to_supabase import iter_json_array
+
+
+DEFAULT_INDEX_PATH = "citations/citation_index.sqlite"
+
+# Bump when the schema or tokenizer changes; older files are rebuilt
+INDEX_FORMAT = 2
+
+# bm25() column weights: section_number, short_title, full_text
+BM25_WEIGHTS = (10.0, 4.0, 1.0)
+
+# Legacy tmp_parse_calcode.py records carry no code family
+LEGACY_CODE_FAMILY = "CalCode"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    id             INTEGER PRIMARY KEY,
+    code_family    TEXT NOT NULL,
+    section_number TEXT NOT NULL,
+    edition_year   INTEGER NOT NULL,   -- 0 when the grammar pins no edition
+    short_title    TEXT NOT NULL,
+    full_text      TEXT NOT NULL,
+    record         TEXT NOT NULL,      -- the citations record as JSON
+    source         TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sections_key ON sections (code_family, section_number, edition_year);
+CREATE INDEX IF NOT EXISTS idx_sections_number ON sections (section_number);
+CREATE INDEX IF NOT EXISTS idx_sections_source ON sections (source);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(
+    section_number, short_title, full_text,
+    content='sections', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS sections_ai AFTER INSERT ON sections BEGIN
+    INSERT INTO sections_fts (rowid, section_number, short_title, full_text)
+    VALUES (new.id, new.section_number, new.short_title, new.full_text);
+END;
+CREATE TRIGGER IF NOT EXISTS sections_ad AFTER DELETE ON sections BEGIN
+    INSERT INTO sections_fts (sections_fts, rowid, section_number, short_title, full_text)
+    VALUES ('delete', old.id, old.section_number, old.short_title, old.full_text);
+    DELETE FROM section_deps WHERE section_id = old.id OR target_id = old.id;
+END;
+CREATE TRIGGER IF NOT EXISTS sections_au AFTER UPDATE ON sections BEGIN
+    INSERT INTO sections_fts (sections_fts, rowid, section_number, short_title, full_text)
+    VALUES ('delete', old.id, old.section_number, old.short_title, old.full_text);
+    INSERT INTO sections_fts (rowid, section_number, short_title, full_text)
+    VALUES (new.id, new.section_number, new.short_title, new.full_text);
+END;
+
+CREATE TABLE IF NOT EXISTS section_deps (
+    section_id INTEGER NOT NULL,
+    target_id  INTEGER NOT NULL,
+    depth      INTEGER NOT NULL,       -- 1 = cited directly
+    PRIMARY KEY (section_id, target_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_section_deps_target ON section_deps (target_id);
+
+CREATE TABLE IF NOT EXISTS sources (
+    path     TEXT PRIMARY KEY,
+    sha256   TEXT NOT NULL,
+    sections INTEGER NOT NULL
+);
+"""
+
+# "§ 114002.1", "3-501.16", "228.75", "113996(a)"
+_SECTION_QUERY_RE = re.compile(r"^\s*(?:§+\s*)?(\d[\d.-]*\d|\d)(?:\s*\([a-z0-9]+\))*\s*$", re.IGNORECASE)
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def connect(path=DEFAULT_INDEX_PATH):
+    if str(path) != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_FORMAT:
+        conn.executescript(
+            "DROP TABLE IF EXISTS sections_fts; DROP TABLE IF EXISTS sections; DROP TABLE IF EXISTS sources; "
+            "DROP TABLE IF EXISTS section_deps;")
+        conn.execute(f"PRAGMA user_version = {INDEX_FORMAT}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ============================================================================
+# BUILDING
+# ============================================================================
+
+def normalize_record(record: dict) -> dict:
+    """A citations record from either statute_parser or legacy calcode_sections.json output."""
+    if "short_title" in record:
+        return record
+    metadata = {}
+    for level in ("chapter", "article"):
+        if record.get(level) is not None:
+            metadata[level] = record[level]
+            metadata[f"{level}_title"] = record.get(f"{level}_title", "")
+    return {
+        "code_family": LEGACY_CODE_FAMILY,
+        "section_number": record["section_number"],
+        "short_title": record.get("section_title", ""),
+        "full_text": record.get("body", ""),
+        "applies_to_pillar": "food_safety",
+        "current_edition_year": None,
+        "effective_date": None,
+        "source_url": None,
+        "metadata": metadata,
+    }
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_file(conn, path) -> int:
+    """(Re)index one citations JSON file. Returns sections written."""
+    source = str(Path(path).resolve())
+    count = 0
+    with conn:
+        conn.execute("DELETE FROM sections WHERE source = ?", (source,))
+        with open(path, encoding="utf-8") as f:
+            for raw in iter_json_array(f):
+                r = normalize_record(raw)
+                # A repeated section number (table of contents, running
+                # header) keeps whichever copy has the longer body
+                conn.execute(
+                    "INSERT INTO sections (code_family, section_number, edition_year, short_title, "
+                    "full_text, record, source) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (code_family, section_number, edition_year) DO UPDATE SET "
+                    "short_title = excluded.short_title, full_text = excluded.full_text, "
+                    "record = excluded.record, source = excluded.source "
+                    "WHERE length(excluded.full_text) > length(sections.full_text)",
+                    (r["code_family"], r["section_number"], r.get("current_edition_year") or 0,
+                     r.get("short_title") or "", r.get("full_text") or "",
+                     json.dumps(r, ensure_ascii=False), source))
+                count += 1
+        conn.execute("INSERT OR REPLACE INTO sources (path, sha256, sections) VALUES (?, ?, ?)",
+                     (source, file_sha256(path), count))
+    return count
+
+
+def rebuild_dependencies(conn) -> int:
+    """
+    Recompute section_deps from the references in each record's metadata,
+    per code family and edition (a citation never crosses codes). Returns
+    the number of closure rows written.
+    """
+    written = 0
+    with conn:
+        conn.execute("DELETE FROM section_deps")
+        groups = conn.execute("SELECT DISTINCT code_family, edition_year FROM sections").fetchall()
+        for code_family, edition_year in groups:
+            ids = {}
+            refs = {}
+            for sid, number, record in conn.execute(
+                    "SELECT id, section_number, record FROM sections WHERE code_family = ? AND edition_year = ?",
+                    (code_family, edition_year)):
+                ids[number] = sid
+                metadata = json.loads(record).get("metadata") or {}
+                if metadata.get("references") or metadata.get("reference_ranges"):
+                    refs[number] = {"sections": metadata.get("references", []),
+                                    "ranges": metadata.get("reference_ranges", [])}
+            adjacency, _ = resolve_references(refs, ids)
+            rows = [(ids[section], ids[target], depth)
+                    for section, targets in transitive_closure(adjacency).items()
+                    for target, depth in targets.items()]
+            conn.executemany("INSERT INTO section_deps (section_id, target_id, depth) VALUES (?, ?, ?)", rows)
+            written += len(rows)
+    return written
+
+
+def build(conn, paths, force=False) -> dict:
+    """Index every path whose content changed since the last build. Returns {path: sections or None if unchanged}."""
+    known = dict(conn.execute("SELECT path, sha256 FROM sources"))
+    results = {}
+    for path in paths:
+        source = str(Path(path).resolve())
+        if not force and known.get(source) == file_sha256(path):
+            results[str(path)] = None
+            continue
+        results[str(path)] = index_file(conn, path)
+    if any(count is not None for count in results.values()):
+        rebuild_dependencies(conn)
+        with conn:
+            conn.execute("INSERT INTO sections_fts (sections_fts) VALUES ('optimize')")
+    return results
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def _row_record(record_json: str) -> dict:
+    return json.loads(record_json)
+
+
+def lookup(conn, section_number: str, code_family=None) -> list:
+    """Records for an exact section number, newest edition first."""
+    m = _SECTION_QUERY_RE.match(section_number or "")
+    number = m.group(1) if m else (section_number or "").strip()
+    sql = "SELECT record FROM sections WHERE section_number = ?"
+    params = [number]
+    if code_family:
+        sql += " AND code_family = ?"
+        params.append(code_family)
+    sql += " ORDER BY edition_year DESC, code_family"
+    return [_row_record(r) for (r,) in conn.execute(sql, params)]
+
+
+def lookup_with_dependencies(conn, section_number: str, code_family=None, max_depth=None) -> list:
+    """
+    [{'section': record, 'depends_on': [record + 'depth', ...]}] per matching
+    section (one per code family / edition), from a single query over
+    the precomputed closure. Dependencies are ordered nearest first.
+    """
+    m = _SECTION_QUERY_RE.match(section_number or "")
+    number = m.group(1) if m else (section_number or "").strip()
+    where = "s.section_number = ?"
+    params = [number]
+    if code_family:
+        where += " AND s.code_family = ?"
+        params.append(code_family)
+    depth_filter = " AND d.depth <= ?" if max_depth else ""
+    sql = (f"SELECT s.id, s.edition_year, 0, s.section_number, s.record FROM sections s WHERE {where} "
+           f"UNION ALL "
+           f"SELECT s.id, s.edition_year, d.depth, t.section_number, t.record FROM sections s "
+           f"JOIN section_deps d ON d.section_id = s.id JOIN sections t ON t.id = d.target_id "
+           f"WHERE {where}{depth_filter}")
+    rows = conn.execute(sql, params + params + ([max_depth] if max_depth else [])).fetchall()
+
+    results = {}
+    # Newest edition first; the section itself (depth 0) before its dependencies
+    for sid, _, depth, _, record in sorted(rows, key=lambda r: (-r[1], r[0], r[2], number_key(r[3]))):
+        if depth == 0:
+            results[sid] = {"section": _row_record(record), "depends_on": []}
+        else:
+            results[sid]["depends_on"].append(dict(_row_record(record), depth=depth))
+    return list(results.values())
+
+
+def match_query(text: str, any_term=False) -> str:
+    """FTS5 MATCH expression for free text: every word quoted, so punctuation can't break the syntax."""
+    words = _WORD_RE.findall(text or "")
+    return (" OR " if any_term else " ").join(f'"{w}"' for w in words)
+
+
+def search(conn, text: str, code_family=None, limit=10) -> list:
+    """
+    Ranked sections for free text. A bare section number ("§ 114002.1")
+    returns the exact match first. Otherwise every term must match; if
+    nothing does, any term may (BM25 still ranks sections matching more
+    terms first).
+    """
+    hits = []
+    if _SECTION_QUERY_RE.match(text or ""):
+        hits = [dict(r, score=0.0, snippet=r["short_title"]) for r in lookup(conn, text, code_family)]
+        if len(hits) >= limit:
+            return hits[:limit]
+
+    seen = {(h["code_family"], h["section_number"]) for h in hits}
+    for any_term in (False, True):
+        expr = match_query(text, any_term)
+        if not expr:
+            break
+        sql = ("SELECT s.record, bm25(sections_fts, ?, ?, ?) AS score, "
+               "snippet(sections_fts, 2, '[', ']', '…', 12) "
+               "FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid "
+               "WHERE sections_fts MATCH ?")
+        params = [*BM25_WEIGHTS, expr]
+        if code_family:
+            sql += " AND s.code_family = ?"
+            params.append(code_family)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        rows = conn.execute(sql, params).fetchall()
+        for record_json, score, snippet in rows:
+            r = _row_record(record_json)
+            if (r["code_family"], r["section_number"]) not in seen:
+                hits.append(dict(r, score=round(score, 4), snippet=snippet))
+        if rows:
+            break
+    return hits[:limit]
+
+
+def stats(conn) -> dict:
+    return {
+        "sections": conn.execute("SELECT count(*) FROM sections").fetchone()[0],
+        "by_code_family": dict(conn.execute(
+            "SELECT code_family, count(*) FROM sections GROUP BY code_family ORDER BY code_family")),
+        "dependencies": conn.execute("SELECT count(*) FROM section_deps").fetchone()[0],
+        "sources": conn.execute("SELECT count(*) FROM sources").fetchone()[0],
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def _print_hit(r):
+    score = f"  ({r['score']})" if "score" in r else ""
+    print(f"  {r['code_family']} §{r['section_number']}. {r['short_title']}{score}")
+    text = r.get("snippet") if r.get("snippet") is not None else (r.get("full_text") or "")[:160]
+    if text:
+        print(f"    {' '.join(text.split())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the citation index")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help=f"Index path (default: {DEFAULT_INDEX_PATH})")
+    parser.add_argument("--build", nargs="+", metavar="JSON", help="Index citations JSON file(s)")
+    parser.add_argument("--force", action="store_true", help="Re-index files even if unchanged")
+    parser.add_argument("--section", help="Exact section lookup")
+    parser.add_argument("--with-deps", action="store_true",
+                        help="With --section: include every section it depends on through cross-references")
+    parser.add_argument("--max-depth", type=int, help="With --with-deps: only follow this many citation hops")
+    parser.add_argument("--search", help="Ranked keyword search")
+    parser.add_argument("--code-family", help="Restrict lookups to one code family")
+    parser.add_argument("--limit", type=int, default=10, help="Search results (default: 10)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if not (args.build or args.section or args.search):
+        if not Path(args.index).exists():
+            parser.error("no index yet; --build some citations JSON first")
+        print(json.dumps(stats(connect(args.index)), indent=2))
+        return
+
+    conn = connect(args.index)
+
+    if args.build:
+        for path, count in build(conn, args.build, args.force).items():
+            print(f"  {'unchanged' if count is None else f'{count} section(s)'}: {path}")
+        s = stats(conn)
+        print(f"Index: {s['sections']} section(s) — " +
+              ", ".join(f"{k} {v}" for k, v in s["by_code_family"].items()))
+
+    for label, query in (("section", args.section), ("search", args.search)):
+        if not query:
+            continue
+        started = time.perf_counter()
+        if label == "section" and args.with_deps:
+            matches = lookup_with_dependencies(conn, query, args.code_family, args.max_depth)
+            ms = (time.perf_counter() - started) * 1000
+            if args.json:
+                print(json.dumps(matches, indent=2, ensure_ascii=False))
+                continue
+            print(f"{len(matches)} result(s) for {query!r} in {ms:.1f} ms")
+            for match in matches:
+                _print_hit(match["section"])
+                for dep in match["depends_on"]:
+                    print(f"    {'  ' * dep['depth']}→ §{dep['section_number']}. {dep['short_title']}")
+            continue
+        if label == "section":
+            hits = lookup(conn, query, args.code_family)
+        else:
+            hits = search(conn, query, args.code_family, args.limit)
+        ms = (time.perf_counter() - started) * 1000
+        if args.json:
+            print(json.dumps(hits, indent=2, ensure_ascii=False))
+            continue
+        print(f"{len(hits)} result(s) for {query!r} in {ms:.1f} ms")
+        for r in hits:
+            _print_hit(r)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Violation-to-Citation Matcher
+=======================================================
+
+Maps free text (inspection violation text, crawled
+grading_system.description) to code sections by TF-IDF cosine similarity.
+
+Every section's title + body is turned into a sparse, L2-normalized TF-IDF
+row once (sublinear tf, smoothed idf, title terms counted TITLE_WEIGHT
+times) and saved as a model file. Matching vectorizes a whole batch of
+strings into one sparse matrix, scores it against every section with one
+sparse product, and takes the top k per row with argpartition — thousands
+of strings per call, no per-string Python loop over sections.
+
+Inputs are statute_parser.py citations JSON or tmp_parse_calcode.py's
+calcode_sections.json. Requires numpy and scipy.
+
+Usage:
+    python3 citation_matcher.py --build out/calcode.citations.json
+    python3 citation_matcher.py --match "no soap at handwashing sink" --top-k 3
+    python3 citation_matcher.py --batch violations.txt --json matches.json
+    python3 citation_matcher.py --crawl ../jie/jurisdictions/results/ca/
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    print("pip install numpy scipy")
+    sys.exit(1)
+
+sys.path.insert(0, str(Path(__file__).parent))
+from citation_index import normalize_record
+from push_to_supabase import iter_json_array, iter_records
+
+
+DEFAULT_MODEL_PATH = "citations/citation_matcher.npz"
+
+MODEL_FORMAT = 1
+
+# Title terms count this many times toward a section's term frequencies
+TITLE_WEIGHT = 3
+
+# Rows scored per dense top-k block; bounds memory at BLOCK_ROWS x sections floats
+BLOCK_ROWS = 2048
+
+STOPWORDS = frozenset("""
+a an and any are as at be been by for from has have if in into is it its may no not of on or other
+shall such than that the their there these this those to under was were which with within without
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stopwords, with a light plural strip ("sinks" -> "sink")."""
+    tokens = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in STOPWORDS or len(tok) < 2:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class CitationMatcher:
+    """Precomputed section TF-IDF matrix plus what's needed to vectorize queries against it."""
+
+    def __init__(self, vocab: dict, idf, matrix, sections: list):
+        self.vocab = vocab               # term -> column
+        self.idf = idf                   # float64[terms]
+        self.matrix = matrix             # csr float64[sections, terms], rows L2-normalized
+        self.sections = sections         # [{'code_family', 'section_number', 'short_title'}]
+        self._matrix_t = matrix.T.tocsr()
+
+    # ── Building ──
+
+    @classmethod
+    def build(cls, records):
+        """Fit on citations records (any iterable; consumed once)."""
+        sections = []
+        doc_counts = []
+        df = Counter()
+        for record in records:
+            r = normalize_record(record)
+            counts = Counter(tokenize(r.get("full_text")))
+            for tok in tokenize(r.get("short_title")):
+                counts[tok] += TITLE_WEIGHT
+            sections.append({"code_family": r["code_family"], "section_number": r["section_number"],
+                             "short_title": r.get("short_title") or ""})
+            doc_counts.append(counts)
+            df.update(counts.keys())
+
+        vocab = {term: i for i, term in enumerate(sorted(df))}
+        n = len(sections)
+        idf = np.array([math.log((1 + n) / (1 + df[t])) + 1.0 for t in sorted(df)], dtype=np.float64)
+        matrix = cls._vectorize_counts(doc_counts, vocab, idf)
+        return cls(vocab, idf, matrix, sections)
+
+    @staticmethod
+    def _vectorize_counts(doc_counts, vocab, idf):
+        indptr = [0]
+        indices = []
+        data = []
+        for counts in doc_counts:
+            for term, tf in counts.items():
+                col = vocab.get(term)
+                if col is not None:
+                    indices.append(col)
+                    data.append(1.0 + math.log(tf))
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(doc_counts), len(vocab)))
+        matrix = matrix.multiply(idf).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix)
+
+    @classmethod
+    def from_files(cls, paths):
+        def records():
+            for path in paths:
+                with open(path, encoding="utf-8") as f:
+                    yield from iter_json_array(f)
+        return cls.build(records())
+
+    # ── Persistence ──
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, format=np.array(MODEL_FORMAT), idf=self.idf,
+                data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                shape=np.array(self.matrix.shape),
+                terms=np.array(json.dumps(terms)), sections=np.array(json.dumps(self.sections)))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            if int(z["format"]) != MODEL_FORMAT:
+                raise ValueError(f"{path}: matcher model format {int(z['format'])} (expected {MODEL_FORMAT}); rebuild")
+            terms = json.loads(str(z["terms"]))
+            matrix = sparse.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=tuple(z["shape"]))
+            return cls({t: i for i, t in enumerate(terms)}, z["idf"], matrix, json.loads(str(z["sections"])))
+
+    # ── Matching ──
+
+    def vectorize(self, texts):
+        """Sparse L2-normalized TF-IDF rows for query strings, in the section vocabulary."""
+        return self._vectorize_counts([Counter(tokenize(t)) for t in texts], self.vocab, self.idf)
+
+    def top_k(self, texts, k=5, min_score=0.0):
+        """
+        (indices, scores): int[len(texts), k] section rows and float[len(texts), k]
+        cosine scores, best first. Slots below min_score (or beyond the
+        number of sections) have index -1 and score 0.
+        """
+        texts = list(texts)
+        n_sections = self.matrix.shape[0]
+        k_eff = min(k, n_sections)
+        out_idx = np.full((len(texts), k), -1, dtype=np.int64)
+        out_score = np.zeros((len(texts), k), dtype=np.float64)
+        if not texts or k_eff == 0:
+            return out_idx, out_score
+
+        queries = self.vectorize(texts)
+        for start in range(0, len(texts), BLOCK_ROWS):
+            block = (queries[start:start + BLOCK_ROWS] @ self._matrix_t).toarray()
+            if k_eff < n_sections:
+                part = np.argpartition(-block, k_eff - 1, axis=1)[:, :k_eff]
+            else:
+                part = np.tile(np.arange(n_sections), (block.shape[0], 1))
+            part_scores = np.take_along_axis(block, part, axis=1)
+            order = np.argsort(-part_scores, axis=1, kind="stable")
+            idx = np.take_along_axis(part, order, axis=1)
+            scores = np.take_along_axis(part_scores, order, axis=1)
+            keep = scores > max(min_score, 0.0)
+            out_idx[start:start + len(block), :k_eff] = np.where(keep, idx, -1)
+            out_score[start:start + len(block), :k_eff] = np.where(keep, scores, 0.0)
+        return out_idx, out_score
+
+    def match(self, texts, k=5, min_score=0.0) -> list:
+        """Per text, [{'code_family', 'section_number', 'short_title', 'score'}] best first."""
+        indices, scores = self.top_k(texts, k, min_score)
+        results = []
+        for row_idx, row_scores in zip(indices, scores):
+            results.append([dict(self.sections[i], score=round(float(s), 4))
+                            for i, s in zip(row_idx, row_scores) if i >= 0])
+        return results
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def crawl_descriptions(source):
+    """(jurisdiction, grading_system.description) from crawled records."""
+    for record in iter_records(str(source)):
+        description = (record.get("grading_system") or {}).get("description")
+        if description:
+            yield record.get("jurisdiction_name", "?"), description
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match violation text to code sections")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help=f"Model path (default: {DEFAULT_MODEL_PATH})")
+    parser.add_argument("--build", nargs="+", metavar="JSON", help="Build the model from citations JSON file(s)")
+    parser.add_argument("--match", help="Match one string")
+    parser.add_argument("--batch", metavar="PATH", help="Match every non-blank line of a text file")
+    parser.add_argument("--crawl", metavar="RESULTS", help="Match crawled grading_system.description text")
+    parser.add_argument("--top-k", type=int, default=5, help="Citations per string (default: 5)")
+    parser.add_argument("--min-score", type=float, default=0.05, help="Drop matches below this cosine (default: 0.05)")
+    parser.add_argument("--json", metavar="PATH", help="Write matches as JSON")
+    args = parser.parse_args()
+
+    if args.build:
+        started = time.perf_counter()
+        matcher = CitationMatcher.from_files(args.build)
+        matcher.save(args.model)
+        print(f"Model: {matcher.matrix.shape[0]} section(s) x {matcher.matrix.shape[1]} term(s), "
+              f"{matcher.matrix.nnz} nonzeros, built in {time.perf_counter() - started:.2f}s -> {args.model}")
+
+    if not (args.match or args.batch or args.crawl):
+        if not args.build:
+            parser.error("give --build, --match, --batch or --crawl")
+        return
+
+    if not Path(args.model).exists():
+        sys.exit(f"No model at {args.model}; run --build first")
+    matcher = CitationMatcher.load(args.model)
+
+    if args.match:
+        labels, texts = [args.match], [args.match]
+    elif args.batch:
+        with open(args.batch, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        labels = texts
+    else:
+        pairs = list(crawl_descriptions(args.crawl))
+        labels, texts = [p[0] for p in pairs], [p[1] for p in pairs]
+
+    started = time.perf_counter()
+    matches = matcher.match(texts, args.top_k, args.min_score)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([{"text": t, "label": l, "matches": m} for t, l, m in zip(texts, labels, matches)],
+                      f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"{len(texts)} string(s) matched in {elapsed * 1000:.1f} ms -> {args.json}")
+        return
+
+    for label, hits in zip(labels, matches):
+        print(f"{label[:100]}")
+        for h in hits:
+            print(f"  {h['score']:.3f}  {h['code_family']} §{h['section_number']}. {h['short_title']}")
+        if not hits:
+            print("  (no match)")
+    print(f"\n{len(texts)} string(s) matched in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Cross-References
+==========================================
+
+Extracts the references a section body makes to other sections of the same
+code ("Section 114002", "Sections 113980 and 113982", "Sections 114000 to
+114020, inclusive", "this chapter"), using the grammar's `references`
+block, and turns them into a dependency graph:
+
+  adjacency   section -> sections it cites directly (ranges expanded
+              against the sections that exist)
+  closure     section -> {section it depends on: hops}, every section
+              reachable through citations, by breadth-first search
+  unresolved  section -> cited numbers that are not in the parsed code
+              (out-of-scope chapters, other codes cited without a name)
+
+Scope references ("this chapter") name a level of the section's own
+context rather than a section and are kept separately; expanding them
+would make every section depend on its whole chapter.
+"""
+
+import re
+from collections import deque
+
+
+def number_key(number: str) -> tuple:
+    """Sort key for section numbers: '114002.1' -> (114002, 1), '3-501.16' -> (3, 501, 16)."""
+    return tuple(int(part) for part in re.findall(r"\d+", number))
+
+
+def extract_references(text: str, grammar) -> dict:
+    """
+    {'sections': [...], 'ranges': [[first, last], ...], 'scopes': [...]}
+    for one body, in order of first appearance. Empty lists if the grammar
+    has no references block.
+    """
+    refs = {"sections": [], "ranges": [], "scopes": []}
+    if not grammar.ref_list_re or not text:
+        return refs
+
+    for m in grammar.ref_list_re.finditer(text):
+        if grammar.ref_external_re and grammar.ref_external_re.match(text, m.end()):
+            continue
+        # Numbers, with None standing for a range word ("to", "through")
+        items = [item.group("number") for item in grammar.ref_item_re.finditer(m.group("list"))]
+        i = 0
+        while i < len(items):
+            number = items[i]
+            if number is None:
+                i += 1
+            elif i + 2 < len(items) and items[i + 1] is None and items[i + 2] is not None:
+                pair = [number, items[i + 2]]
+                if pair not in refs["ranges"]:
+                    refs["ranges"].append(pair)
+                i += 3
+            else:
+                if number not in refs["sections"]:
+                    refs["sections"].append(number)
+                i += 1
+
+    for pattern, level in grammar.ref_scopes:
+        if level not in refs["scopes"] and pattern.search(text):
+            refs["scopes"].append(level)
+    return refs
+
+
+def resolve_references(refs_by_section: dict, known) -> tuple:
+    """
+    (adjacency, unresolved) from {section: extract_references() result}.
+    Ranges expand to every known section between their endpoints; a
+    section never depends on itself.
+    """
+    known = set(known)
+    ordered = sorted(known, key=number_key)
+    keys = [number_key(n) for n in ordered]
+
+    adjacency = {}
+    unresolved = {}
+    for section, refs in refs_by_section.items():
+        targets = set()
+        missing = []
+        for number in refs.get("sections", ()):
+            if number in known:
+                targets.add(number)
+            else:
+                missing.append(number)
+        for first, last in refs.get("ranges", ()):
+            lo, hi = number_key(first), number_key(last)
+            span = [n for n, k in zip(ordered, keys) if lo <= k <= hi]
+            if span:
+                targets.update(span)
+            else:
+                missing.append(f"{first}-{last}")
+        targets.discard(section)
+        if targets:
+            adjacency[section] = sorted(targets, key=number_key)
+        if missing:
+            unresolved[section] = missing
+    return adjacency, unresolved
+
+
+def transitive_closure(adjacency: dict) -> dict:
+    """section -> {dependency: hops} over every section reachable from it."""
+    closure = {}
+    for start in adjacency:
+        hops = {}
+        queue = deque((target, 1) for target in adjacency[start])
+        while queue:
+            node, depth = queue.popleft()
+            if node in hops or node == start:
+                continue
+            hops[node] = depth
+            for nxt in adjacency.get(node, ()):
+                if nxt not in hops:
+                    queue.append((nxt, depth + 1))
+        closure[start] = hops
+    return closure
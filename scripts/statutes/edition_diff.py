@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Edition Diff
+======================================
+
+Compares two parsed editions of a code (citations JSON from
+statute_parser.py, or the older calcode_sections.json layout) and reports
+what changed, so only changed citations are re-seeded:
+
+  unchanged    same number, same content hash — skipped without a text compare
+  modified     same number, different title or body (unified diff attached)
+  renumbered   number gone in the old edition and new in the new one with
+               the same content (hash match) or similar content (fuzzy
+               match at or above --threshold); modified if not identical
+  added        only in the new edition
+  removed      only in the old edition
+  moved        same number under a different chapter/article (also counted
+               as unchanged or modified by its text)
+
+Content hashes collapse whitespace, so PDF re-wrapping alone never counts as
+a change. `--changed-out` writes just the new edition's added, modified,
+renumbered and moved records, in the same citations JSON shape, for seeding.
+
+Usage:
+    python3 edition_diff.py out_2025/calcode.citations.json out_2026/calcode.citations.json
+    python3 edition_diff.py old.json new.json --markdown diff.md --changed-out changed.citations.json
+    python3 edition_diff.py old.json new.json --threshold 0.75 --json diff.json
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from citation_index import normalize_record
+from cross_refs import number_key
+from push_to_supabase import iter_json_array
+from statute_parser import JsonArrayWriter
+
+
+DEFAULT_THRESHOLD = 0.8
+
+# Metadata that follows from the text rather than describing where it sits
+DERIVED_METADATA = ("references", "reference_ranges", "scope_references")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def content_hash(record: dict) -> str:
+    blob = normalize_text(record.get("short_title")) + "\x00" + normalize_text(record.get("full_text"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def placement(record: dict) -> dict:
+    """The record's level context (chapter, article, ...) without derived keys."""
+    return {k: v for k, v in (record.get("metadata") or {}).items() if k not in DERIVED_METADATA}
+
+
+def load_edition(path) -> dict:
+    """section_number -> (content hash, record), streamed from a citations JSON file."""
+    edition = {}
+    with open(path, encoding="utf-8") as f:
+        for raw in iter_json_array(f):
+            record = normalize_record(raw)
+            edition[record["section_number"]] = (content_hash(record), record)
+    return edition
+
+
+# ============================================================================
+# MATCHING
+# ============================================================================
+
+def _words(record: dict) -> list:
+    return _WORD_RE.findall(f"{record.get('short_title') or ''} {record.get('full_text') or ''}".lower())
+
+
+def similarity(a: dict, b: dict) -> float:
+    """0..1 similarity of two records' title + body, on whitespace-normalized words."""
+    return difflib.SequenceMatcher(None, _words(a), _words(b), autojunk=False).ratio()
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def match_renumbered(removed: dict, added: dict, threshold=DEFAULT_THRESHOLD) -> list:
+    """
+    [(old_number, new_number, score)] pairing removed with added sections.
+
+    Identical content pairs by hash first (score 1.0). The rest are scored
+    with SequenceMatcher, skipping pairs whose title + body word sets barely
+    overlap or whose length or word counts already bound the ratio below
+    the threshold, and paired greedily best-first.
+    """
+    pairs = []
+    added_by_hash = {}
+    for number, (h, _) in added.items():
+        added_by_hash.setdefault(h, []).append(number)
+    taken_old, taken_new = set(), set()
+    for old_number in sorted(removed, key=number_key):
+        candidates = [n for n in added_by_hash.get(removed[old_number][0], ()) if n not in taken_new]
+        if candidates:
+            new_number = min(candidates, key=number_key)
+            pairs.append((old_number, new_number, 1.0))
+            taken_old.add(old_number)
+            taken_new.add(new_number)
+
+    old_words = {n: _words(v[1]) for n, v in removed.items() if n not in taken_old}
+    old_sets = {n: set(w) for n, w in old_words.items()}
+    scored = []
+    for new_number in (n for n in added if n not in taken_new):
+        new_words = _words(added[new_number][1])
+        new_set = set(new_words)
+        # seq2 is the side SequenceMatcher indexes; set it once per new section
+        matcher = difflib.SequenceMatcher(None, autojunk=False)
+        matcher.set_seq2(new_words)
+        for old_number, words in old_words.items():
+            # Cheap prefilter: sections sharing few words are never renumberings
+            if _jaccard(old_sets[old_number], new_set) < threshold / 2:
+                continue
+            matcher.set_seq1(words)
+            # Length, then word-count upper bounds on ratio() before the full match
+            if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+                continue
+            score = matcher.ratio()
+            if score >= threshold:
+                scored.append((score, old_number, new_number))
+
+    for score, old_number, new_number in sorted(scored, key=lambda s: (-s[0], number_key(s[1]), number_key(s[2]))):
+        if old_number in taken_old or new_number in taken_new:
+            continue
+        pairs.append((old_number, new_number, round(score, 4)))
+        taken_old.add(old_number)
+        taken_new.add(new_number)
+    return sorted(pairs, key=lambda p: number_key(p[0]))
+
+
+def text_diff(old: dict, new: dict, context=3) -> str:
+    """Unified diff of title and body lines."""
+    def lines(record):
+        return [f"§ {record['section_number']}. {record.get('short_title', '')}"] + \
+            [line.rstrip() for line in (record.get("full_text") or "").splitlines()]
+    return "\n".join(difflib.unified_diff(lines(old), lines(new), "old", "new", n=context, lineterm=""))
+
+
+# ============================================================================
+# DIFF
+# ============================================================================
+
+def diff_editions(old: dict, new: dict, threshold=DEFAULT_THRESHOLD, context=3) -> dict:
+    """Diff two load_edition() results."""
+    unchanged = 0
+    modified = []
+    moved = []
+    for number in sorted(old.keys() & new.keys(), key=number_key):
+        (old_hash, old_rec), (new_hash, new_rec) = old[number], new[number]
+        if placement(old_rec) != placement(new_rec):
+            moved.append({"section_number": number, "old": placement(old_rec), "new": placement(new_rec)})
+        if old_hash == new_hash:
+            unchanged += 1
+            continue
+        modified.append({
+            "section_number": number,
+            "title_changed": normalize_text(old_rec.get("short_title")) != normalize_text(new_rec.get("short_title")),
+            "similarity": round(similarity(old_rec, new_rec), 4),
+            "diff": text_diff(old_rec, new_rec, context),
+        })
+
+    removed = {n: old[n] for n in old.keys() - new.keys()}
+    added = {n: new[n] for n in new.keys() - old.keys()}
+    renumbered = []
+    for old_number, new_number, score in match_renumbered(removed, added, threshold):
+        old_rec, new_rec = removed.pop(old_number)[1], added.pop(new_number)[1]
+        renumbered.append({
+            "old_number": old_number,
+            "new_number": new_number,
+            "similarity": score,
+            "diff": "" if score == 1.0 else text_diff(old_rec, new_rec, context),
+        })
+
+    return {
+        "counts": {
+            "old": len(old), "new": len(new), "unchanged": unchanged, "modified": len(modified),
+            "renumbered": len(renumbered), "added": len(added), "removed": len(removed), "moved": len(moved),
+        },
+        "modified": modified,
+        "renumbered": renumbered,
+        "added": [{"section_number": n, "short_title": added[n][1].get("short_title", "")}
+                  for n in sorted(added, key=number_key)],
+        "removed": [{"section_number": n, "short_title": removed[n][1].get("short_title", "")}
+                    for n in sorted(removed, key=number_key)],
+        "moved": moved,
+    }
+
+
+def changed_numbers(diff: dict) -> list:
+    """New-edition section numbers that need (re)seeding."""
+    numbers = {m["section_number"] for m in diff["modified"]}
+    numbers.update(r["new_number"] for r in diff["renumbered"])
+    numbers.update(a["section_number"] for a in diff["added"])
+    numbers.update(m["section_number"] for m in diff["moved"])
+    return sorted(numbers, key=number_key)
+
+
+def write_changed(new: dict, diff: dict, path) -> int:
+    with open(path, "w", encoding="utf-8") as f:
+        writer = JsonArrayWriter(f)
+        for number in changed_numbers(diff):
+            writer.write(new[number][1])
+        writer.close()
+    return writer.count
+
+
+def write_markdown(diff: dict, path, old_label, new_label):
+    c = diff["counts"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# Edition diff: {old_label} → {new_label}\n\n")
+        f.write("| | Sections |\n|---|---:|\n")
+        for key in ("old", "new", "unchanged", "modified", "renumbered", "added", "removed", "moved"):
+            f.write(f"| {key} | {c[key]} |\n")
+
+        if diff["renumbered"]:
+            f.write("\n## Renumbered\n\n| Old | New | Similarity |\n|---|---|---:|\n")
+            for r in diff["renumbered"]:
+                f.write(f"| §{r['old_number']} | §{r['new_number']} | {r['similarity']:.2f} |\n")
+        for key, title in (("added", "Added"), ("removed", "Removed")):
+            if diff[key]:
+                f.write(f"\n## {title}\n\n")
+                for s in diff[key]:
+                    f.write(f"- §{s['section_number']}. {s['short_title']}\n")
+        if diff["moved"]:
+            f.write("\n## Moved to a different chapter/article\n\n")
+            for m in diff["moved"]:
+                f.write(f"- §{m['section_number']}: {m['old']} → {m['new']}\n")
+        if diff["modified"] or any(r["diff"] for r in diff["renumbered"]):
+            f.write("\n## Text changes\n")
+            for m in diff["modified"]:
+                f.write(f"\n### §{m['section_number']} (similarity {m['similarity']:.2f})\n\n```diff\n{m['diff']}\n```\n")
+            for r in diff["renumbered"]:
+                if r["diff"]:
+                    f.write(f"\n### §{r['old_number']} → §{r['new_number']} (similarity {r['similarity']:.2f})\n\n"
+                            f"```diff\n{r['diff']}\n```\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two parsed editions of a code")
+    parser.add_argument("old", help="Older edition citations JSON")
+    parser.add_argument("new", help="Newer edition citations JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Minimum similarity to pair a renumbered section (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--context", type=int, default=3, help="Diff context lines (default: 3)")
+    parser.add_argument("--markdown", metavar="PATH", help="Write a markdown report")
+    parser.add_argument("--json", metavar="PATH", help="Write the diff as JSON")
+    parser.add_argument("--changed-out", metavar="PATH",
+                        help="Write the new edition's added/modified/renumbered/moved records as citations JSON")
+    args = parser.parse_args()
+
+    old = load_edition(args.old)
+    new = load_edition(args.new)
+    diff = diff_editions(old, new, args.threshold, args.context)
+
+    c = diff["counts"]
+    print(f"{args.old} ({c['old']}) → {args.new} ({c['new']})")
+    print(f"  unchanged {c['unchanged']}, modified {c['modified']}, renumbered {c['renumbered']}, "
+          f"added {c['added']}, removed {c['removed']}, moved {c['moved']}")
+    for r in diff["renumbered"]:
+        print(f"  §{r['old_number']} → §{r['new_number']} ({r['similarity']:.2f})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(diff, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"JSON written to {args.json}")
+    if args.markdown:
+        write_markdown(diff, args.markdown, args.old, args.new)
+        print(f"Report written to {args.markdown}")
+    if args.changed_out:
+        print(f"{write_changed(new, diff, args.changed_out)} changed record(s) written to {args.changed_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Grammar Definitions
+=============================================
+
+A grammar is one JSON file in grammars/ describing how a food code's plain
+text (pdftotext output) is laid out:
+
+  name               file stem, used on the command line
+  code_family        citations.code_family for every section
+  title              human-readable code name
+  edition_year       citations.current_edition_year (null if not pinned)
+  effective_date     citations.effective_date, ISO date or null
+  source_url         citations.source_url
+  applies_to_pillar  'food_safety' or 'fire_safety'
+  basis_patterns     regexes (case-insensitive) matched against a crawled
+                     jurisdiction's regulatory_framework.food_code_basis
+  levels             outermost first: {name, pattern, flags?}; group 1 is
+                     the number, group 2 the title. A match resets every
+                     level below it.
+  section            {pattern, flags?}; group 1 section number, group 2 title
+  stop_pattern       optional; text from the first matching line on is
+                     ignored (annexes, appendices)
+  include            optional {level: [numbers]}; only sections whose level
+                     number is listed are kept. Numbers compare numerically
+                     when both sides are numeric, so "10.1" never matches "10".
+  references         optional; how bodies cite other sections (cross_refs.py):
+                       number    regex for one section number in running text
+                       prefix    regex introducing a list of numbers
+                                 ("Sections? ", "§§? ")
+                       external  optional, case-sensitive regex matched right
+                                 after a list; a match means another code is
+                                 cited ("of the Vehicle Code") and the list is
+                                 skipped
+                       scopes    {phrase regex: level name or "code"}
+                     prefix and scopes are case-insensitive.
+
+Onboarding a new state's code is a new grammar file; the parser itself
+does not change.
+"""
+
+import json
+import re
+from pathlib import Path
+
+
+GRAMMARS_DIR = Path(__file__).parent / "grammars"
+
+PILLARS = ("food_safety", "fire_safety")
+
+REQUIRED_FIELDS = {
+    "name": str,
+    "code_family": str,
+    "title": str,
+    "source_url": str,
+    "applies_to_pillar": str,
+    "basis_patterns": list,
+    "levels": list,
+    "section": dict,
+}
+
+_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE}
+
+
+class GrammarError(ValueError):
+    pass
+
+
+def _compile(spec: dict, where: str, groups: int = 2) -> re.Pattern:
+    flags = 0
+    for ch in spec.get("flags", ""):
+        if ch not in _FLAGS:
+            raise GrammarError(f"{where}: unknown regex flag {ch!r}")
+        flags |= _FLAGS[ch]
+    try:
+        pattern = re.compile(spec["pattern"], flags)
+    except (KeyError, re.error) as e:
+        raise GrammarError(f"{where}: bad pattern: {e}")
+    if pattern.groups < groups:
+        raise GrammarError(f"{where}: pattern needs {groups} groups (number, title), has {pattern.groups}")
+    return pattern
+
+
+def _same_number(a: str, b: str) -> bool:
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return a == b
+
+
+class Grammar:
+    """A validated grammar with its regexes compiled."""
+
+    def __init__(self, data: dict, path=None):
+        where = str(path or data.get("name", "<grammar>"))
+        for field, kind in REQUIRED_FIELDS.items():
+            if not isinstance(data.get(field), kind):
+                raise GrammarError(f"{where}: '{field}' must be a {kind.__name__}")
+        if data["applies_to_pillar"] not in PILLARS:
+            raise GrammarError(f"{where}: applies_to_pillar must be one of {PILLARS}")
+
+        self.data = data
+        self.path = path
+        self.name = data["name"]
+        self.code_family = data["code_family"]
+        self.title = data["title"]
+        self.edition_year = data.get("edition_year")
+        self.effective_date = data.get("effective_date")
+        self.source_url = data["source_url"]
+        self.pillar = data["applies_to_pillar"]
+
+        self.levels = []
+        for i, level in enumerate(data["levels"]):
+            if not level.get("name"):
+                raise GrammarError(f"{where}: levels[{i}] has no name")
+            self.levels.append((level["name"], _compile(level, f"{where}: levels[{i}]")))
+        self.level_names = [name for name, _ in self.levels]
+        self.section_re = _compile(data["section"], f"{where}: section")
+        self.stop_re = _compile({"pattern": data["stop_pattern"]}, f"{where}: stop_pattern", groups=0) \
+            if data.get("stop_pattern") else None
+
+        self.include = {}
+        for level, numbers in (data.get("include") or {}).items():
+            if level not in self.level_names:
+                raise GrammarError(f"{where}: include names unknown level {level!r}")
+            self.include[level] = [str(n) for n in numbers]
+
+        self._compile_references(data.get("references"), where)
+
+        try:
+            self.basis_res = [re.compile(p, re.IGNORECASE) for p in data["basis_patterns"]]
+        except re.error as e:
+            raise GrammarError(f"{where}: bad basis pattern: {e}")
+
+    def _compile_references(self, refs, where):
+        self.ref_list_re = self.ref_item_re = self.ref_external_re = None
+        self.ref_scopes = []
+        if not refs:
+            return
+        try:
+            number = f"(?:{refs['number']})"
+            re.compile(number)
+            # One number, then more joined by commas, and/or, or a range word
+            joiner = r"(?:\s*,\s*(?:and\s+|or\s+)?|\s+(?:and|or|to|through)\s+)"
+            self.ref_list_re = re.compile(
+                f"(?:{refs['prefix']})(?P<list>{number}(?:{joiner}{number})*)", re.IGNORECASE)
+            self.ref_item_re = re.compile(f"(?P<number>{number})|\\b(?:to|through)\\b", re.IGNORECASE)
+            if refs.get("external"):
+                self.ref_external_re = re.compile(refs["external"])
+            for phrase, level in (refs.get("scopes") or {}).items():
+                if level != "code" and level not in self.level_names:
+                    raise GrammarError(f"{where}: references.scopes names unknown level {level!r}")
+                self.ref_scopes.append((re.compile(phrase, re.IGNORECASE), level))
+        except KeyError as e:
+            raise GrammarError(f"{where}: references needs {e}")
+        except re.error as e:
+            raise GrammarError(f"{where}: bad references pattern: {e}")
+
+    def includes(self, context: dict) -> bool:
+        """True if a section with this level context passes the include filter."""
+        for level, numbers in self.include.items():
+            value = context.get(level)
+            if value is None or not any(_same_number(value, n) for n in numbers):
+                return False
+        return True
+
+    def basis_match(self, basis: str):
+        """Offset of the earliest basis pattern match in `basis`, or None."""
+        offsets = [m.start() for m in (r.search(basis or "") for r in self.basis_res) if m]
+        return min(offsets) if offsets else None
+
+
+def load_grammar(path) -> Grammar:
+    path = Path(path)
+    with open(path, encoding="utf-8") as f:
+        return Grammar(json.load(f), path)
+
+
+def load_grammars(directory=GRAMMARS_DIR) -> dict:
+    """name -> Grammar for every *.json in `directory`."""
+    grammars = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        grammar = load_grammar(path)
+        if grammar.name != path.stem:
+            raise GrammarError(f"{path}: name {grammar.name!r} does not match the file name")
+        grammars[grammar.name] = grammar
+    return grammars
+
+
+def resolve_grammar(name_or_path, grammars=None) -> Grammar:
+    """A grammar by name (grammars/<name>.json) or by path to a JSON file."""
+    if str(name_or_path).endswith(".json"):
+        return load_grammar(name_or_path)
+    grammars = grammars if grammars is not None else load_grammars()
+    if name_or_path not in grammars:
+        raise GrammarError(f"unknown grammar {name_or_path!r} (have: {', '.join(sorted(grammars))})")
+    return grammars[name_or_path]
+
+
+def grammar_for_basis(basis: str, grammars: dict):
+    """
+    The grammar a food_code_basis string refers to, or None.
+
+    Bases often name the adopted code first and what it derives from later
+    ("California Retail Food Code ... based on FDA Food Code"), so the
+    grammar whose pattern matches earliest in the string wins.
+    """
+    best = None
+    for name in sorted(grammars):
+        offset = grammars[name].basis_match(basis)
+        if offset is not None and (best is None or offset < best[0]):
+            best = (offset, grammars[name])
+    return best[1] if best else None
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+EvidLY Statute Parsing — Multi-Code Parser
+===========================================
+
+Parses food code plain text into citations records, one grammar per code
+(see grammar.py and grammars/*.json). Each input is read as a stream: a
+single pass drives a level/section state machine and each section is
+written out as soon as the next header closes it, so memory stays at one
+section body regardless of code size.
+
+Several codes parse in parallel, one worker process per input file. Every
+code produces the same citations JSON (an array of CITATION_FIELDS
+records, matching the `citations` table), so loaders and seed generators
+never care which code a file came from.
+
+Cross-references in each body are extracted in the same pass (see
+cross_refs.py) into the record's metadata, and a <grammar>.graph.json next
+to the citations holds the resolved adjacency list, its transitive closure
+and any citations of sections that are not in the parsed code.
+
+Usage:
+    # Parse codes in parallel into out/<grammar>.citations.json
+    python3 statute_parser.py calcode=calcode_full.txt fda_food_code=fda_2022.txt --out-dir out/
+
+    # A grammar file outside grammars/ works too
+    python3 statute_parser.py grammars/calcode.json=calcode_full.txt --out-dir out/
+
+    # Which grammars the crawled jurisdictions need, and which bases have none
+    python3 statute_parser.py --bases ../jie/jurisdictions/results/
+
+    # Installed grammars
+    python3 statute_parser.py --list
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from cross_refs import extract_references, resolve_references, transitive_closure
+from grammar import GrammarError, grammar_for_basis, load_grammars, resolve_grammar
+
+
+JIE_DIR = Path(__file__).parent.parent / "jie" / "jurisdictions"
+
+# One record per section, column for column with the citations table
+CITATION_FIELDS = (
+    "code_family", "section_number", "short_title", "full_text", "applies_to_pillar",
+    "current_edition_year", "effective_date", "source_url", "metadata",
+)
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+def iter_sections(lines, grammar):
+    """
+    Yield one section per header in a single pass over `lines`.
+
+    Each section is {'number', 'title', 'body', 'context', 'titles'} where
+    context/titles map level name -> number/title of the enclosing levels.
+    Level headers are never part of a body; text before the first section
+    is dropped.
+    """
+    context = {}
+    titles = {}
+    current = None
+    body_lines = []
+
+    for line in lines:
+        if grammar.stop_re and grammar.stop_re.match(line):
+            break
+
+        for depth, (name, pattern) in enumerate(grammar.levels):
+            m = pattern.match(line)
+            if m:
+                for inner in grammar.level_names[depth:]:
+                    context.pop(inner, None)
+                    titles.pop(inner, None)
+                context[name] = m.group(1)
+                titles[name] = m.group(2).strip()
+                break
+        else:
+            m = grammar.section_re.match(line)
+            if m:
+                if current is not None:
+                    current["body"] = "\n".join(body_lines).strip()
+                    yield current
+                current = {
+                    "number": m.group(1),
+                    "title": m.group(2).strip(),
+                    "body": "",
+                    "context": dict(context),
+                    "titles": dict(titles),
+                }
+                body_lines = []
+            elif current is not None:
+                body_lines.append(line.rstrip())
+
+    if current is not None:
+        current["body"] = "\n".join(body_lines).strip()
+        yield current
+
+
+def citation_record(section: dict, grammar, references=None) -> dict:
+    """The citations-table record for a parsed section, with its extract_references() result if given."""
+    metadata = {}
+    for name in grammar.level_names:
+        if name in section["context"]:
+            metadata[name] = section["context"][name]
+            metadata[f"{name}_title"] = section["titles"][name]
+    if references:
+        for key, field in (("sections", "references"), ("ranges", "reference_ranges"),
+                           ("scopes", "scope_references")):
+            if references[key]:
+                metadata[field] = references[key]
+    return {
+        "code_family": grammar.code_family,
+        "section_number": section["number"],
+        "short_title": section["title"],
+        "full_text": section["body"],
+        "applies_to_pillar": grammar.pillar,
+        "current_edition_year": grammar.edition_year,
+        "effective_date": grammar.effective_date,
+        "source_url": grammar.source_url,
+        "metadata": metadata,
+    }
+
+
+class JsonArrayWriter:
+    """Write a JSON array one element at a time, formatted like json.dump(indent=2)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write(self, obj):
+        text = json.dumps(obj, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        self.f.write(("[\n  " if self.count == 0 else ",\n  ") + text)
+        self.count += 1
+
+    def close(self):
+        self.f.write("\n]\n" if self.count else "[]\n")
+
+
+def graph_path(output_path) -> Path:
+    """out/calcode.citations.json -> out/calcode.graph.json"""
+    output_path = Path(output_path)
+    stem = output_path.name[:-len(".citations.json")] if output_path.name.endswith(".citations.json") \
+        else output_path.stem
+    return output_path.with_name(f"{stem}.graph.json")
+
+
+def parse_file(grammar_ref, input_path, output_path, apply_include=True) -> dict:
+    """
+    Parse one code text into a citations JSON file and its cross-reference
+    graph. Runs in a worker process, so it takes a grammar name/path rather
+    than a Grammar.
+    """
+    started = time.perf_counter()
+    grammar = resolve_grammar(grammar_ref)
+    top = grammar.level_names[0] if grammar.level_names else None
+    total = 0
+    kept_by_top = Counter()
+    seen = set()
+    duplicates = []
+    refs_by_section = {}
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(input_path, encoding="utf-8", errors="replace") as src, \
+            open(output_path, "w", encoding="utf-8") as out:
+        writer = JsonArrayWriter(out)
+        for section in iter_sections(src, grammar):
+            total += 1
+            if apply_include and not grammar.includes(section["context"]):
+                continue
+            if section["number"] in seen:
+                # Usually a table of contents or running header; reported,
+                # since citations is unique on (code_family, section_number, edition)
+                duplicates.append(section["number"])
+            seen.add(section["number"])
+            kept_by_top[section["context"].get(top, "unknown")] += 1
+            refs = extract_references(section["body"], grammar)
+            if any(refs.values()):
+                refs_by_section.setdefault(section["number"], refs)
+            writer.write(citation_record(section, grammar, refs))
+        writer.close()
+
+    adjacency, unresolved = resolve_references(refs_by_section, seen)
+    graph = {
+        "code_family": grammar.code_family,
+        "edition_year": grammar.edition_year,
+        "adjacency": adjacency,
+        "closure": transitive_closure(adjacency),
+        "scopes": {n: r["scopes"] for n, r in refs_by_section.items() if r["scopes"]},
+        "unresolved": unresolved,
+    }
+    with open(graph_path(output_path), "w", encoding="utf-8") as f:
+        json.dump(graph, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+    return {
+        "grammar": grammar.name,
+        "code_family": grammar.code_family,
+        "input": str(input_path),
+        "output": str(output_path),
+        "sections": total,
+        "kept": writer.count,
+        "duplicates": duplicates,
+        "references": sum(len(t) for t in adjacency.values()),
+        "unresolved": sum(len(t) for t in unresolved.values()),
+        "by_level": {top: dict(kept_by_top)} if top else {},
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def parse_many(jobs, out_dir, workers=None, apply_include=True) -> list:
+    """
+    Parse [(grammar_ref, input_path)] into out_dir/<grammar>.citations.json,
+    one process per input. Returns a stats dict per job, in job order; a job
+    that failed has an 'error' key instead of counts.
+    """
+    grammars = [resolve_grammar(ref) for ref, _ in jobs]
+    names = [g.name for g in grammars]
+    dupes = sorted(n for n, c in Counter(names).items() if c > 1)
+    if dupes:
+        raise GrammarError(f"grammar(s) given twice: {', '.join(dupes)}")
+
+    out_dir = Path(out_dir)
+    tasks = [(ref, path, out_dir / f"{g.name}.citations.json", apply_include)
+             for (ref, path), g in zip(jobs, grammars)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+
+    results = [None] * len(tasks)
+    if workers == 1:
+        for i, task in enumerate(tasks):
+            results[i] = _run(task)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run, task): i for i, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+
+def _run(task) -> dict:
+    ref, input_path, output_path, apply_include = task
+    try:
+        return parse_file(ref, input_path, output_path, apply_include)
+    except (OSError, GrammarError) as e:
+        return {"grammar": str(ref), "input": str(input_path), "error": f"{type(e).__name__}: {e}"}
+
+
+# ============================================================================
+# CRAWL COVERAGE
+# ============================================================================
+
+def basis_coverage(source, grammars) -> dict:
+    """
+    Map every crawled record's regulatory_framework.food_code_basis to a
+    grammar: {'by_grammar': {name: count}, 'unmatched': {basis: count}}.
+    """
+    sys.path.insert(0, str(JIE_DIR))
+    from push_to_supabase import iter_records
+
+    by_grammar = Counter()
+    unmatched = Counter()
+    for record in iter_records(str(source)):
+        basis = (record.get("regulatory_framework") or {}).get("food_code_basis") or ""
+        grammar = grammar_for_basis(basis, grammars)
+        if grammar:
+            by_grammar[grammar.name] += 1
+        else:
+            unmatched[basis or "(missing)"] += 1
+    return {"by_grammar": dict(by_grammar), "unmatched": dict(unmatched)}
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def parse_job(spec: str):
+    """'grammar=path' -> (grammar, path). '=' because Windows paths contain ':'."""
+    grammar, sep, path = spec.partition("=")
+    if not sep or not grammar or not path:
+        raise argparse.ArgumentTypeError(f"expected GRAMMAR=PATH, got {spec!r}")
+    return grammar, path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse food code texts into citations JSON")
+    parser.add_argument("jobs", nargs="*", type=parse_job, metavar="GRAMMAR=PATH",
+                        help="Grammar name (or .json path) and the code's plain text")
+    parser.add_argument("--out-dir", default="citations", help="Output directory (default: citations/)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--all-sections", action="store_true", help="Ignore the grammar's include filter")
+    parser.add_argument("--bases", metavar="RESULTS",
+                        help="Report which grammars the crawled food_code_basis values need")
+    parser.add_argument("--list", action="store_true", help="List installed grammars")
+    parser.add_argument("--json", action="store_true", help="Print stats as JSON")
+    args = parser.parse_args()
+
+    try:
+        grammars = load_grammars()
+    except GrammarError as e:
+        sys.exit(f"❌ {e}")
+
+    if args.list:
+        for name, g in grammars.items():
+            year = g.edition_year or "unpinned"
+            print(f"  {name:<16} {g.code_family} ({year}) — {g.title}")
+        return
+
+    if args.bases:
+        coverage = basis_coverage(args.bases, grammars)
+        if args.json:
+            print(json.dumps(coverage, indent=2))
+            return
+        print("Records per grammar:")
+        for name in sorted(grammars):
+            print(f"  {name:<16} {coverage['by_grammar'].get(name, 0)}")
+        if coverage["unmatched"]:
+            print(f"\nNo grammar for {sum(coverage['unmatched'].values())} record(s):")
+            for basis, count in sorted(coverage["unmatched"].items(), key=lambda kv: -kv[1]):
+                print(f"  {count:>4}  {basis}")
+        return
+
+    if not args.jobs:
+        parser.error("give at least one GRAMMAR=PATH (or --list / --bases)")
+
+    try:
+        results = parse_many(args.jobs, args.out_dir, args.workers, not args.all_sections)
+    except GrammarError as e:
+        sys.exit(f"❌ {e}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            if "error" in r:
+                print(f"  ❌ {r['grammar']}: {r['error']}")
+                continue
+            print(f"  ✅ {r['grammar']}: {r['kept']}/{r['sections']} section(s) -> {r['output']} ({r['seconds']}s)")
+            print(f"     {r['references']} cross-reference(s), {r['unresolved']} to sections outside the parsed code")
+            if r["duplicates"]:
+                print(f"     ⚠️  {len(r['duplicates'])} repeated section number(s): {', '.join(r['duplicates'][:5])}")
+    sys.exit(1 if any("error" in r for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
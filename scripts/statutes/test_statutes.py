@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Test the statute grammars and parser against synthetic code texts.
+No network or database access.
+"""
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+import citation_index
+import edition_diff
+from cross_refs import extract_references, resolve_references, transitive_closure
+from grammar import Grammar, GrammarError, grammar_for_basis, load_grammars, resolve_grammar
+from statute_parser import CITATION_FIELDS, citation_record, iter_sections, parse_file, parse_many
+
+
+CALCODE_TEXT = """\
+CALIFORNIA RETAIL FOOD CODE
+113699. Orphan before any chapter
+Chapter 1. General Provisions
+113700. California retail food code
+These provisions shall be known as the
+California Retail Food Code.
+Chapter 2. Definitions
+113728. Approved source
+Means a food source that is acceptable.
+Chapter 4. General Food Safety Provisions
+Article 2. Time and Temperature Relationships
+113996. Potentially hazardous food
+(a) Hot holding at 135F or above.
+Article 3. Food From Approved Sources
+114021. Food sources
+Food shall be obtained from approved sources.
+Chapter 10.1. Cottage Food Operations
+114365. Cottage food
+Registration requirements.
+Chapter 13. Compliance and Enforcement
+114380. Permits
+A permit is required.
+"""
+
+FDA_TEXT = """\
+Chapter 3 Food
+3-5 LIMITATION OF GROWTH OF ORGANISMS OF PUBLIC HEALTH CONCERN
+3-501 Temperature and Time Control
+3-501.16 Time/Temperature Control for Safety Food, Hot and Cold Holding.
+(A) Except during preparation, TCS food shall be maintained at 57C or above.
+3-501.17 Ready-to-Eat, Time/Temperature Control for Safety Food, Date Marking.
+(A) Except when packaging food using a reduced oxygen packaging method.
+ANNEX 1 COMPLIANCE AND ENFORCEMENT
+8-101.10 Public Health Protection.
+Not part of the code body.
+"""
+
+TX_TEXT = """\
+Subchapter A. General Provisions
+§228.1. Purpose and Applicability.
+These rules apply to food establishments.
+Subchapter C. Food
+Division 5. Limitation of Growth of Organisms of Public Health Concern
+§228.75 Temperature and Time Control.
+Hot holding at 135F.
+"""
+
+
+def sections(grammar_name, text):
+    return list(iter_sections(text.splitlines(keepends=True), resolve_grammar(grammar_name)))
+
+
+# ============================================================================
+# TEST CASES
+# ============================================================================
+
+def test_installed_grammars_load():
+    grammars = load_grammars()
+    assert {"calcode", "fda_food_code", "tx_tac_228"} <= set(grammars)
+    for g in grammars.values():
+        assert g.pillar in ("food_safety", "fire_safety")
+    return "PASS"
+
+
+def test_calcode_levels_and_include_filter():
+    """Headers set context and are never in a body; sub-chapters like 10.1 are excluded."""
+    grammar = resolve_grammar("calcode")
+    parsed = sections("calcode", CALCODE_TEXT)
+    by_number = {s["number"]: s for s in parsed}
+    assert len(parsed) == 7
+
+    assert by_number["113699"]["context"] == {}
+    assert by_number["113700"]["body"] == "These provisions shall be known as the\nCalifornia Retail Food Code."
+    assert by_number["113996"]["context"] == {"chapter": "4", "article": "2"}
+    assert by_number["114021"]["titles"]["article"] == "Food From Approved Sources"
+    # A new chapter resets the article
+    assert by_number["114365"]["context"] == {"chapter": "10.1"}
+    assert "Chapter" not in by_number["114021"]["body"]
+
+    kept = [s["number"] for s in parsed if grammar.includes(s["context"])]
+    assert kept == ["113700", "113996", "114021", "114380"], kept
+    return "PASS"
+
+
+def test_fda_nested_levels_and_stop_pattern():
+    parsed = sections("fda_food_code", FDA_TEXT)
+    assert [s["number"] for s in parsed] == ["3-501.16", "3-501.17"]
+    first = parsed[0]
+    assert first["title"] == "Time/Temperature Control for Safety Food, Hot and Cold Holding"
+    assert first["context"] == {"chapter": "3", "part": "3-5", "subpart": "3-501"}
+    assert "ANNEX" not in parsed[-1]["body"]
+    return "PASS"
+
+
+def test_tx_tac_sections():
+    parsed = sections("tx_tac_228", TX_TEXT)
+    assert [(s["number"], s["title"]) for s in parsed] == [
+        ("228.1", "Purpose and Applicability"),
+        ("228.75", "Temperature and Time Control"),
+    ]
+    assert parsed[0]["context"] == {"subchapter": "A"}
+    assert parsed[1]["context"] == {"subchapter": "C", "division": "5"}
+    return "PASS"
+
+
+def test_citation_record_schema():
+    """Every code yields the same citations fields; metadata matches the CalCode seed shape."""
+    for name, text in (("calcode", CALCODE_TEXT), ("fda_food_code", FDA_TEXT), ("tx_tac_228", TX_TEXT)):
+        grammar = resolve_grammar(name)
+        for section in sections(name, text):
+            record = citation_record(section, grammar)
+            assert tuple(record) == CITATION_FIELDS, name
+            assert record["code_family"] == grammar.code_family
+
+    grammar = resolve_grammar("calcode")
+    by_number = {s["number"]: s for s in sections("calcode", CALCODE_TEXT)}
+    assert citation_record(by_number["113700"], grammar)["metadata"] == \
+        {"chapter": "1", "chapter_title": "General Provisions"}
+    assert citation_record(by_number["113996"], grammar)["metadata"] == {
+        "chapter": "4", "chapter_title": "General Food Safety Provisions",
+        "article": "2", "article_title": "Time and Temperature Relationships",
+    }
+    return "PASS"
+
+
+def test_basis_resolution():
+    """The code named earliest in a food_code_basis wins."""
+    grammars = load_grammars()
+    cases = {
+        "California Retail Food Code (CalCode) - based on FDA Food Code": "calcode",
+        "CRFC - part of California Health and Safety Code": "calcode",
+        "FDA Food Code 2022": "fda_food_code",
+        "2017 Food Code": "fda_food_code",
+        "TX TAC 228": "tx_tac_228",
+        "Texas Food Establishment Rules (TFER), adopting the FDA Food Code": "tx_tac_228",
+    }
+    for basis, expected in cases.items():
+        grammar = grammar_for_basis(basis, grammars)
+        assert grammar and grammar.name == expected, f"{basis!r} -> {grammar and grammar.name}"
+    assert grammar_for_basis("", grammars) is None
+    assert grammar_for_basis("Oregon Administrative Rules 333-150", grammars) is None
+    return "PASS"
+
+
+def test_parallel_matches_serial():
+    """Worker processes write the same files as an in-process run; a bad input fails alone."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for name, text in (("calcode", CALCODE_TEXT), ("fda_food_code", FDA_TEXT), ("tx_tac_228", TX_TEXT)):
+            (tmp / f"{name}.txt").write_text(text, encoding="utf-8")
+        jobs = [(n, str(tmp / f"{n}.txt")) for n in ("calcode", "fda_food_code", "tx_tac_228")]
+
+        serial = parse_many(jobs, tmp / "serial", workers=1)
+        parallel = parse_many(jobs, tmp / "parallel", workers=3)
+        assert [r["kept"] for r in serial] == [4, 2, 2], serial
+        assert [r["kept"] for r in parallel] == [r["kept"] for r in serial]
+        for r in serial:
+            name = Path(r["output"]).name
+            assert (tmp / "serial" / name).read_text() == (tmp / "parallel" / name).read_text()
+            json.loads((tmp / "serial" / name).read_text())
+
+        results = parse_many([("calcode", str(tmp / "missing.txt")), jobs[1]], tmp / "mixed", workers=2)
+        assert "error" in results[0] and results[1]["kept"] == 2
+
+        try:
+            parse_many([jobs[0], jobs[0]], tmp / "dup")
+            assert False, "same grammar twice should be rejected"
+        except GrammarError:
+            pass
+    return "PASS"
+
+
+def test_empty_input_writes_empty_array():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "empty.txt"
+        src.write_text("no sections here\n")
+        stats = parse_file("calcode", src, Path(tmp) / "out.json")
+        assert stats["kept"] == 0
+        assert json.loads((Path(tmp) / "out.json").read_text()) == []
+    return "PASS"
+
+
+def test_grammar_validation():
+    base = json.loads((Path(__file__).parent / "grammars" / "calcode.json").read_text())
+
+    bad_groups = dict(base, section={"pattern": r"^(\d{6})\.\s"})
+    bad_include = dict(base, include={"division": ["1"]})
+    bad_pillar = dict(base, applies_to_pillar="water")
+    for data in (bad_groups, bad_include, bad_pillar):
+        try:
+            Grammar(data)
+            assert False, f"accepted invalid grammar: {data}"
+        except GrammarError:
+            pass
+    return "PASS"
+
+
+def test_citation_index_lookup_and_search():
+    """Exact lookups hit one row; search ranks title matches first; unchanged files aren't re-read."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "calcode.txt").write_text(CALCODE_TEXT + "113996. Potentially hazardous food\n", encoding="utf-8")
+        (tmp / "fda.txt").write_text(FDA_TEXT, encoding="utf-8")
+        parse_many([("calcode", str(tmp / "calcode.txt")), ("fda_food_code", str(tmp / "fda.txt"))],
+                   tmp / "out", workers=1)
+        legacy = tmp / "calcode_sections.json"
+        legacy.write_text(json.dumps([{
+            "section_number": "114099.6", "section_title": "Cooling", "body": "Cooked food shall be cooled rapidly.",
+            "chapter": "4", "chapter_title": "General Food Safety Provisions", "article": None, "article_title": "",
+        }]))
+        paths = [tmp / "out" / "calcode.citations.json", tmp / "out" / "fda_food_code.citations.json", legacy]
+
+        conn = citation_index.connect(tmp / "index.sqlite")
+        built = citation_index.build(conn, paths)
+        assert list(built.values()) == [5, 2, 1], built
+        assert citation_index.stats(conn)["sections"] == 7
+
+        # The repeated 113996 header with an empty body did not replace the real one
+        [hit] = citation_index.lookup(conn, "§ 113996(a)")
+        assert hit["full_text"] == "(a) Hot holding at 135F or above."
+        assert citation_index.lookup(conn, "113996", code_family="FDA Food Code") == []
+        [legacy_hit] = citation_index.lookup(conn, "114099.6")
+        assert legacy_hit["code_family"] == "CalCode" and legacy_hit["metadata"]["chapter"] == "4"
+
+        hits = citation_index.search(conn, "hot holding")
+        assert hits[0]["section_number"] == "3-501.16", [h["section_number"] for h in hits]
+        assert {h["section_number"] for h in hits} == {"3-501.16", "113996"}
+        assert citation_index.search(conn, "hot holding", code_family="CalCode")[0]["section_number"] == "113996"
+        # No section has every term, so any-term matching applies; punctuation is harmless
+        assert citation_index.search(conn, 'permit "cottage" (sources)')
+        assert citation_index.search(conn, "3-501.16")[0]["section_number"] == "3-501.16"
+
+        assert list(citation_index.build(conn, paths).values()) == [None, None, None]
+        legacy.write_text("[]")
+        assert citation_index.build(conn, paths)[str(legacy)] == 0
+        assert citation_index.lookup(conn, "114099.6") == []
+        conn.close()
+    return "PASS"
+
+
+XREF_TEXT = """\
+Chapter 4. General Food Safety Provisions
+Article 1. Employee Knowledge
+113947. Food safety certificate
+An owner shall comply with Section 113947.1 and this article.
+113947.1. Certification exam
+As described in Sections 113947.2 to 113947.4, inclusive, or in Section
+113953 of this part.
+113947.2. Exam content
+See Section 22455 of the Vehicle Code and Section 113789.
+113947.3. Exam renewal
+Renewal follows Section 113947.1.
+113947.4. Records
+No references.
+113953. Handwashing
+Handwashing facilities per this chapter.
+"""
+
+
+def test_cross_reference_graph():
+    """Lists, ranges, line-wrapped numbers and other-code citations; closure follows cycles once."""
+    grammar = resolve_grammar("calcode")
+    parsed = sections("calcode", XREF_TEXT)
+    refs = {s["number"]: extract_references(s["body"], grammar) for s in parsed}
+
+    assert refs["113947"] == {"sections": ["113947.1"], "ranges": [], "scopes": ["article"]}
+    assert refs["113947.1"] == {"sections": ["113953"], "ranges": [["113947.2", "113947.4"]], "scopes": ["code"]}
+    # The Vehicle Code citation is skipped; 113789 is internal but not parsed
+    assert refs["113947.2"]["sections"] == ["113789"]
+    assert refs["113953"]["scopes"] == ["chapter"]
+
+    adjacency, unresolved = resolve_references(refs, [s["number"] for s in parsed])
+    assert adjacency["113947.1"] == ["113947.2", "113947.3", "113947.4", "113953"]
+    assert unresolved == {"113947.2": ["113789"]}
+
+    closure = transitive_closure(adjacency)
+    assert closure["113947"] == {"113947.1": 1, "113947.2": 2, "113947.3": 2, "113947.4": 2, "113953": 2}
+    # 113947.3 -> 113947.1 -> 113947.3 is a cycle; a section never depends on itself
+    assert "113947.3" not in closure["113947.3"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "calcode.txt").write_text(XREF_TEXT, encoding="utf-8")
+        [stats] = parse_many([("calcode", str(tmp / "calcode.txt"))], tmp / "out", workers=1)
+        assert (stats["references"], stats["unresolved"]) == (6, 1), stats
+        graph = json.loads((tmp / "out" / "calcode.graph.json").read_text())
+        assert graph["closure"]["113947"] == closure["113947"]
+
+        conn = citation_index.connect(tmp / "index.sqlite")
+        citation_index.build(conn, [tmp / "out" / "calcode.citations.json"])
+        [match] = citation_index.lookup_with_dependencies(conn, "113947")
+        assert match["section"]["section_number"] == "113947"
+        assert [(d["section_number"], d["depth"]) for d in match["depends_on"]] == [
+            ("113947.1", 1), ("113947.2", 2), ("113947.3", 2), ("113947.4", 2), ("113953", 2)]
+        [direct] = citation_index.lookup_with_dependencies(conn, "113947", max_depth=1)
+        assert len(direct["depends_on"]) == 1
+        assert citation_index.lookup_with_dependencies(conn, "113947.4")[0]["depends_on"] == []
+        conn.close()
+    return "PASS"
+
+
+def test_edition_diff():
+    """Hash-equal sections are skipped; renumbers pair by hash or similarity; changed-out has only changes."""
+    def record(number, title, body, chapter="4"):
+        return {"code_family": "CalCode", "section_number": number, "short_title": title, "full_text": body,
+                "applies_to_pillar": "food_safety", "current_edition_year": 2026, "effective_date": None,
+                "source_url": None, "metadata": {"chapter": chapter, "chapter_title": "General"}}
+
+    cooling = "Cooked potentially hazardous food shall be cooled within two hours from 135F to 70F " \
+              "and within a total of six hours from 135F to 41F or below."
+    old = [
+        record("113980", "Food condition", "Food shall be\nsafe and unadulterated."),
+        record("113996", "Hot holding", "Maintain at 135F or above."),
+        record("114002", "Cooling", cooling),
+        record("114010", "Thawing", "Thaw under refrigeration."),
+        record("114020", "Reheating", "Reheat to 165F."),
+    ]
+    new = [
+        # Re-wrapped only: unchanged
+        record("113980", "Food condition", "Food shall be safe\nand unadulterated."),
+        record("113996", "Hot holding", "Maintain at 140F or above."),
+        # Renumbered with a small edit; renumbered unchanged
+        record("114002.5", "Cooling", cooling.replace("six hours", "4 hours")),
+        record("114011", "Thawing", "Thaw under refrigeration."),
+        record("114030", "Date marking", "Mark ready-to-eat food with a use-by date."),
+        # Moved chapter, same text
+        record("114020", "Reheating", "Reheat to 165F.", chapter="5"),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / "old.json").write_text(json.dumps(old))
+        (tmp / "new.json").write_text(json.dumps(new))
+        old_ed, new_ed = edition_diff.load_edition(tmp / "old.json"), edition_diff.load_edition(tmp / "new.json")
+        diff = edition_diff.diff_editions(old_ed, new_ed)
+
+        assert diff["counts"] == {"old": 5, "new": 6, "unchanged": 2, "modified": 1, "renumbered": 2,
+                                  "added": 1, "removed": 0, "moved": 1}, diff["counts"]
+        [modified] = diff["modified"]
+        assert modified["section_number"] == "113996" and "+Maintain at 140F or above." in modified["diff"]
+        pairs = {(r["old_number"], r["new_number"]): r["similarity"] for r in diff["renumbered"]}
+        assert pairs[("114010", "114011")] == 1.0
+        assert 0.8 <= pairs[("114002", "114002.5")] < 1.0
+        assert diff["added"] == [{"section_number": "114030", "short_title": "Date marking"}]
+
+        # A strict threshold leaves the edited renumber as remove + add
+        strict = edition_diff.diff_editions(old_ed, new_ed, threshold=0.99)
+        assert strict["counts"]["renumbered"] == 1 and strict["counts"]["removed"] == 1
+
+        count = edition_diff.write_changed(new_ed, diff, tmp / "changed.json")
+        changed = [r["section_number"] for r in json.loads((tmp / "changed.json").read_text())]
+        assert changed == ["113996", "114002.5", "114011", "114020", "114030"], changed
+        assert count == 5
+        edition_diff.write_markdown(diff, tmp / "diff.md", "2025", "2026")
+        assert "§114002 | §114002.5" in (tmp / "diff.md").read_text()
+    return "PASS"
+
+
+def test_citation_matcher_batch_top_k():
+    """Batch top-k agrees with one-at-a-time matching and survives a save/load round trip."""
+    from citation_matcher import CitationMatcher
+
+    records = [
+        {"section_number": "113953.2", "section_title": "Handwashing supplies",
+         "body": "Handwashing facilities shall be provided with soap and single-use sanitary towels."},
+        {"section_number": "113996", "section_title": "Hot and cold holding",
+         "body": "Potentially hazardous food shall be held at or above 135F or at or below 41F."},
+        {"section_number": "114259.1", "section_title": "Vermin",
+         "body": "A food facility shall be kept free of vermin, including rodents and insects such as cockroaches."},
+        {"section_number": "113948", "section_title": "Food handler card",
+         "body": "A food handler shall obtain a food handler card within 30 days of hire."},
+    ]
+    matcher = CitationMatcher.build(records)
+    texts = ["no soap at the handwashing sink", "cockroaches observed in dry storage",
+             "hot holding at 120F", "expired food handler card", "zzz unknown words"]
+    batch = matcher.match(texts, k=2)
+    assert [m[0]["section_number"] if m else None for m in batch] == \
+        ["113953.2", "114259.1", "113996", "113948", None], batch
+    assert all(len(m) <= 2 for m in batch)
+    assert batch[:4] == [matcher.match([t], k=2)[0] for t in texts[:4]]
+    assert matcher.match(["hot holding"], k=10)[0][0]["section_number"] == "113996"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        matcher.save(Path(tmp) / "model.npz")
+        loaded = CitationMatcher.load(Path(tmp) / "model.npz")
+        assert loaded.match(texts, k=2) == batch
+    return "PASS"
+
+
+def run_tests():
+    tests = [
+        test_installed_grammars_load,
+        test_calcode_levels_and_include_filter,
+        test_fda_nested_levels_and_stop_pattern,
+        test_tx_tac_sections,
+        test_citation_record_schema,
+        test_basis_resolution,
+        test_parallel_matches_serial,
+        test_empty_input_writes_empty_array,
+        test_grammar_validation,
+        test_citation_index_lookup_and_search,
+        test_cross_reference_graph,
+        test_edition_diff,
+        test_citation_matcher_batch_top_k,
+    ]
+
+    passed = 0
+    failed = 0
+    for test_fn in tests:
+        name = test_fn.__name__
+        try:
+            test_fn()
+            print(f"  ✅ {name}")
+            passed += 1
+        except AssertionError as e:
+            print(f"  ❌ {name}: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"  💥 {name}: {type(e).__name__}: {e}")
+            failed += 1
+
+    print(f"\n{'='*50}")
+    print(f"  {passed} passed, {failed} failed, {len(tests)} total")
+    print(f"{'='*50}")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    print("🧪 Running statute parser tests...\n")
+    ok = run_tests()
+    sys.exit(0 if ok else 1)
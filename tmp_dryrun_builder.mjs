@@ -447,8 +447,9 @@ for (const [s, c] of Object.entries(fireDataSourceCounts)) console.log(`${s}: ${
 
 console.log(`\nTotal rows: ${results.length}`);
 
-// Write full dry-run to file
+// Write full dry-run to file (markdown for review, JSONL artifact for scripts/reports)
 let md = '# Jurisdiction Backfill Dry Run — 2026-05-21\n\n';
+const jsonl = [JSON.stringify({ _artifact: 'jurisdiction_backfill_dryrun', format: 1, date: '2026-05-21' })];
 md += '| # | County | City | Column | Current | New Value | Source JSONB Path | Bucket |\n';
 md += '|---|---|---|---|---|---|---|---|\n';
 
@@ -471,6 +472,10 @@ for (const r of results) {
   for (const [col, val, path, bucket] of cols) {
     lineNum++;
     md += `| ${lineNum} | ${r.county} | ${r.city} | ${col} | NULL | ${val || '—'} | ${path || '—'} | ${bucket} |\n`;
+    jsonl.push(JSON.stringify({
+      n: lineNum, county: r.county, city: r.city === '—' ? null : r.city, field: col,
+      current: null, value: val || null, path: path || null, bucket: bucket === '—' ? null : bucket,
+    }));
   }
 
   // Add skip reasons as notes
@@ -478,14 +483,20 @@ for (const r of results) {
     for (const reason of r.skip_reasons) {
       lineNum++;
       md += `| ${lineNum} | ${r.county} | ${r.city} | _SKIP NOTE_ | — | — | ${reason} | SKIP |\n`;
+      jsonl.push(JSON.stringify({
+        n: lineNum, county: r.county, city: r.city === '—' ? null : r.city, field: null,
+        note: reason, bucket: 'SKIP',
+      }));
     }
   }
 }
 
 writeFileSync('./docs/jurisdiction_backfill_dryrun_20260521.md', md, 'utf8');
+writeFileSync('./docs/jurisdiction_backfill_dryrun_20260521.jsonl', jsonl.join('\n') + '\n', 'utf8');
 
 // Also write the results as JSON for Step 3B
 writeFileSync('./tmp_backfill_plan.json', JSON.stringify(results, null, 2), 'utf8');
 
 console.log('\nDry-run file written: docs/jurisdiction_backfill_dryrun_20260521.md');
+console.log('Dry-run artifact written: docs/jurisdiction_backfill_dryrun_20260521.jsonl');
 console.log('Plan JSON written: tmp_backfill_plan.json');
@@ -2,170 +2,93 @@
 Migration Sync Triage Script — Phase 1
 Compares local migration files vs PROD schema_migrations and PROD catalog.
 Produces a categorization report.
+
+PROD state comes from a catalog snapshot written by
+scripts/migration_triage/catalog_snapshot.py; without one, the older
+prod_*.txt files in /tmp are used. Data ops and function bodies can't be
+verified statically; scripts/migration_triage/shadow_replay.py replays the
+migrations into a local Postgres and diffs the result against the snapshot.
+
+Results are kept per version in a sqlite store (scripts/migration_triage/
+triage_store.py); a re-run only re-triages versions whose file or
+dependencies changed, and the markdown report is rendered from the store.
+
+Usage:
+    python tmp_triage_migrations.py [--catalog SNAPSHOT.json] [--workers N] [--no-cache]
+    python tmp_triage_migrations.py --report-only [--json triage.json]
 """
 import os
 import re
+import sys
 import glob
-import json
+import time
+import argparse
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts', 'migration_triage'))
+from parse_cache import DEFAULT_CACHE_DIR, content_key, parse_files  # noqa: E402
+from schema_model import SchemaModel  # noqa: E402
+from catalog import Catalog  # noqa: E402
+from catalog_snapshot import DEFAULT_SNAPSHOT_PATH  # noqa: E402
+import object_index  # noqa: E402
+import triage_store  # noqa: E402
+import migration_lint  # noqa: E402
+
 MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), 'supabase', 'migrations')
 
 # Windows: /tmp in git bash maps to %LOCALAPPDATA%/Temp
 TMP_DIR = os.environ.get('LOCALAPPDATA', '') + '\\Temp' if os.name == 'nt' else '/tmp'
 
-# ── Load catalog snapshots ────────────────────────────────────────────────────
-
-def load_lines(path):
-    with open(path, 'r') as f:
-        return set(line.strip() for line in f if line.strip())
-
-def tmp(name):
-    return os.path.join(TMP_DIR, name)
-
-remote_versions = load_lines(tmp('remote_versions.txt'))
-prod_tables = load_lines(tmp('prod_tables.txt'))
-prod_columns = load_lines(tmp('prod_columns.txt'))  # "table.column"
-prod_indexes = load_lines(tmp('prod_indexes.txt'))
-prod_constraints = load_lines(tmp('prod_constraints.txt'))
-prod_policies_raw = load_lines(tmp('prod_policies.txt'))  # "polname@table"
-prod_policies = {}
-for p in prod_policies_raw:
-    if '@' in p:
-        name, tbl = p.split('@', 1)
-        prod_policies[name] = tbl
-prod_functions = load_lines(tmp('prod_functions.txt'))
-prod_views = load_lines(tmp('prod_views.txt'))
-prod_enums = load_lines(tmp('prod_enums.txt'))
-prod_triggers_raw = load_lines(tmp('prod_triggers.txt'))  # "tgname@table"
-prod_triggers = {}
-for t in prod_triggers_raw:
-    if '@' in t:
-        name, tbl = t.split('@', 1)
-        prod_triggers[name] = tbl
-prod_rls_enabled = load_lines(tmp('prod_rls_enabled.txt'))
-
-# ── Discover local files ──────────────────────────────────────────────────────
+# Names for remote-only versions when the catalog doesn't carry them (the
+# legacy remote_versions.txt has versions only); from the 14a diagnostic
+KNOWN_REMOTE_NAMES = {
+    '20260312100000': 'intelligence_feed_read_at',
+    '20260317000000': 'permissions_tables',
+    '20260321000000': 'notifications_superpower',
+    '20260321100000': 'demo_wire',
+    '20260321200000': 'drop_external_tables',
+    '20260322000000': 'ie_inspection_reports_distributions',
+    '20260322100000': 'firecrawl_crawl_engine',
+    '20260322200000': 'inspection_reports_storage',
+    '20260525000000': 'drift_monitor',
+}
 
-local_files = sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql')))
-local_map = {}  # version -> filepath
-for f in local_files:
-    basename = os.path.basename(f)
-    match = re.match(r'^(\d+)_', basename)
-    if match:
-        local_map[match.group(1)] = f
+# ── Load catalog snapshot ─────────────────────────────────────────────────────
 
-# ── Compute gaps ──────────────────────────────────────────────────────────────
+def load_catalog(path=None):
+    """Structured snapshot if there is one, else the legacy /tmp text files."""
+    path = path or (DEFAULT_SNAPSHOT_PATH if os.path.exists(DEFAULT_SNAPSHOT_PATH) else None)
+    if path:
+        return Catalog.load(path)
+    return Catalog.from_legacy_dir(TMP_DIR)
 
-local_versions = set(local_map.keys())
-parity = local_versions & remote_versions
-local_only = local_versions - remote_versions
-remote_only = remote_versions - local_versions
+# ── Discover local files ──────────────────────────────────────────────────────
 
-print(f"Local files: {len(local_files)}")
-print(f"Remote versions: {len(remote_versions)}")
-print(f"Parity: {len(parity)}")
-print(f"Local-only: {len(local_only)}")
-print(f"Remote-only: {len(remote_only)}")
-print()
+def discover_local_files():
+    local_files = sorted(glob.glob(os.path.join(MIGRATIONS_DIR, '*.sql')))
+    local_map = {}  # version -> filepath
+    for f in local_files:
+        basename = os.path.basename(f)
+        match = re.match(r'^(\d+)_', basename)
+        if match:
+            local_map[match.group(1)] = f
+    return local_files, local_map
 
 # ── DDL operation extraction ──────────────────────────────────────────────────
 
-# Patterns to detect DDL operations in migration SQL
-DDL_PATTERNS = [
-    # CREATE TABLE
-    (r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'CREATE_TABLE'),
-    # DROP TABLE
-    (r'DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_TABLE'),
-    # ALTER TABLE ... ADD COLUMN
-    (r'ALTER\s+TABLE\s+(?:(?:IF\s+EXISTS\s+)?(?:public\.)?)?["\']?(\w+)["\']?\s+ADD\s+COLUMN\s+(?:IF\s+NOT\s+EXISTS\s+)?["\']?(\w+)["\']?',
-     'ADD_COLUMN'),
-    # ALTER TABLE ... DROP COLUMN
-    (r'ALTER\s+TABLE\s+(?:(?:IF\s+EXISTS\s+)?(?:public\.)?)?["\']?(\w+)["\']?\s+DROP\s+COLUMN\s+(?:IF\s+EXISTS\s+)?["\']?(\w+)["\']?',
-     'DROP_COLUMN'),
-    # ALTER TABLE ... ADD CONSTRAINT
-    (r'ALTER\s+TABLE\s+(?:(?:IF\s+EXISTS\s+)?(?:public\.)?)?["\']?(\w+)["\']?\s+ADD\s+CONSTRAINT\s+["\']?(\w+)["\']?',
-     'ADD_CONSTRAINT'),
-    # ALTER TABLE ... DROP CONSTRAINT
-    (r'ALTER\s+TABLE\s+(?:(?:IF\s+EXISTS\s+)?(?:public\.)?)?["\']?(\w+)["\']?\s+DROP\s+CONSTRAINT\s+(?:IF\s+EXISTS\s+)?["\']?(\w+)["\']?',
-     'DROP_CONSTRAINT'),
-    # CREATE INDEX
-    (r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?["\']?(\w+)["\']?',
-     'CREATE_INDEX'),
-    # DROP INDEX
-    (r'DROP\s+INDEX\s+(?:IF\s+EXISTS\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_INDEX'),
-    # CREATE POLICY
-    (r'CREATE\s+POLICY\s+["\']?([^"\';\s]+)["\']?\s+ON\s+(?:public\.)?["\']?(\w+)["\']?',
-     'CREATE_POLICY'),
-    # DROP POLICY
-    (r'DROP\s+POLICY\s+(?:IF\s+EXISTS\s+)?["\']?([^"\';\s]+)["\']?\s+ON\s+(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_POLICY'),
-    # CREATE OR REPLACE FUNCTION
-    (r'CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+(?:public\.)?["\']?(\w+)["\']?\s*\(',
-     'CREATE_FUNCTION'),
-    # DROP FUNCTION
-    (r'DROP\s+FUNCTION\s+(?:IF\s+EXISTS\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_FUNCTION'),
-    # CREATE OR REPLACE VIEW
-    (r'CREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s+(?:public\.)?["\']?(\w+)["\']?',
-     'CREATE_VIEW'),
-    # DROP VIEW
-    (r'DROP\s+VIEW\s+(?:IF\s+EXISTS\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_VIEW'),
-    # CREATE TYPE (enum)
-    (r'CREATE\s+TYPE\s+(?:public\.)?["\']?(\w+)["\']?\s+AS\s+ENUM',
-     'CREATE_ENUM'),
-    # DROP TYPE
-    (r'DROP\s+TYPE\s+(?:IF\s+EXISTS\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_TYPE'),
-    # ALTER TABLE ... ENABLE ROW LEVEL SECURITY
-    (r'ALTER\s+TABLE\s+(?:public\.)?["\']?(\w+)["\']?\s+ENABLE\s+ROW\s+LEVEL\s+SECURITY',
-     'ENABLE_RLS'),
-    # CREATE TRIGGER
-    (r'CREATE\s+(?:OR\s+REPLACE\s+)?TRIGGER\s+["\']?(\w+)["\']?\s+.*?\s+ON\s+(?:public\.)?["\']?(\w+)["\']?',
-     'CREATE_TRIGGER'),
-    # DROP TRIGGER
-    (r'DROP\s+TRIGGER\s+(?:IF\s+EXISTS\s+)?["\']?(\w+)["\']?\s+ON\s+(?:public\.)?["\']?(\w+)["\']?',
-     'DROP_TRIGGER'),
-    # ALTER TYPE ... ADD VALUE (enum value)
-    (r"ALTER\s+TYPE\s+(?:public\.)?[\"']?(\w+)[\"']?\s+ADD\s+VALUE",
-     'ALTER_ENUM_ADD'),
-    # INSERT INTO
-    (r'INSERT\s+INTO\s+(?:public\.)?["\']?(\w+)["\']?',
-     'INSERT_INTO'),
-    # UPDATE table SET
-    (r'UPDATE\s+(?:public\.)?["\']?(\w+)["\']?\s+SET\s+',
-     'UPDATE_TABLE'),
-    # DELETE FROM
-    (r'DELETE\s+FROM\s+(?:public\.)?["\']?(\w+)["\']?',
-     'DELETE_FROM'),
-    # ALTER TABLE ... ALTER COLUMN (type change, default, not null)
-    (r'ALTER\s+TABLE\s+(?:(?:IF\s+EXISTS\s+)?(?:public\.)?)?["\']?(\w+)["\']?\s+ALTER\s+COLUMN\s+["\']?(\w+)["\']?',
-     'ALTER_COLUMN'),
-    # ALTER TABLE ... RENAME COLUMN
-    (r'ALTER\s+TABLE\s+(?:public\.)?["\']?(\w+)["\']?\s+RENAME\s+COLUMN\s+["\']?(\w+)["\']?\s+TO\s+["\']?(\w+)["\']?',
-     'RENAME_COLUMN'),
-    # GRANT
-    (r'GRANT\s+.*\s+ON\s+(?:TABLE\s+)?(?:public\.)?["\']?(\w+)["\']?',
-     'GRANT'),
-    # CREATE EXTENSION
-    (r'CREATE\s+EXTENSION\s+(?:IF\s+NOT\s+EXISTS\s+)?["\']?(\w+)["\']?',
-     'CREATE_EXTENSION'),
-    # CREATE SCHEMA
-    (r'CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?["\']?(\w+)["\']?',
-     'CREATE_SCHEMA'),
-]
-
-def strip_comments(sql):
-    """Remove SQL comments (-- and /* */) but keep strings."""
-    # Remove single-line comments
-    sql = re.sub(r'--[^\n]*', '', sql)
-    # Remove block comments
-    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
-    return sql
+# Statement splitting and classification live in
+# scripts/migration_triage/sql_lexer.py: one tokenizer pass per file that
+# understands comments, quoted identifiers, string literals and $$ bodies.
+# parse_cache.py fans it out over a process pool and caches op lists by
+# file content hash. schema_model.py replays every local migration's ops in
+# version order and diffs the expected final state against PROD; each op is
+# judged from that diff rather than in isolation. object_index.py keeps a
+# sqlite index of which migrations touched each object; triage refreshes it
+# and uses it to point reviewers at later migrations touching absent objects.
+# Function, view, policy and trigger bodies are fingerprinted on both sides
+# (normalized token streams), so an object that exists under the right name
+# but with an old body counts as drifted rather than present.
+# migration_lint.py flags lock- and scan-heavy DDL in the local-only files.
 
 def extract_header_comment(sql):
     """Extract first comment block as description."""
@@ -179,184 +102,32 @@ def extract_header_comment(sql):
             break
     return ' '.join(desc_lines[:3]) if desc_lines else '(no header comment)'
 
-def extract_ddl_ops(sql_content):
-    """Extract DDL operations from SQL content."""
-    clean_sql = strip_comments(sql_content)
-    ops = []
-    for pattern, op_type in DDL_PATTERNS:
-        for m in re.finditer(pattern, clean_sql, re.IGNORECASE | re.DOTALL):
-            groups = [g for g in m.groups() if g is not None]
-            ops.append({
-                'type': op_type,
-                'args': groups,
-                'match': m.group(0)[:120]
-            })
-    return ops
-
-def check_op_in_prod(op):
-    """Check if a DDL operation's effect is present in PROD catalog.
-    Returns: 'present', 'absent', or 'unclear'
-    """
-    op_type = op['type']
-    args = op['args']
-
-    if op_type == 'CREATE_TABLE':
-        table = args[0].lower()
-        return 'present' if table in prod_tables else 'absent'
-
-    elif op_type == 'DROP_TABLE':
-        table = args[0].lower()
-        return 'present' if table not in prod_tables else 'absent'
-
-    elif op_type == 'ADD_COLUMN':
-        table = args[0].lower()
-        col = args[1].lower()
-        key = f"{table}.{col}"
-        return 'present' if key in prod_columns else 'absent'
-
-    elif op_type == 'DROP_COLUMN':
-        table = args[0].lower()
-        col = args[1].lower()
-        key = f"{table}.{col}"
-        return 'present' if key not in prod_columns else 'absent'
-
-    elif op_type == 'ADD_CONSTRAINT':
-        constraint = args[1].lower()
-        return 'present' if constraint in prod_constraints else 'absent'
-
-    elif op_type == 'DROP_CONSTRAINT':
-        constraint = args[1].lower()
-        return 'present' if constraint not in prod_constraints else 'absent'
-
-    elif op_type == 'CREATE_INDEX':
-        idx = args[0].lower()
-        return 'present' if idx in prod_indexes else 'absent'
-
-    elif op_type == 'DROP_INDEX':
-        idx = args[0].lower()
-        return 'present' if idx not in prod_indexes else 'absent'
-
-    elif op_type == 'CREATE_POLICY':
-        policy = args[0].lower()
-        # strip quotes
-        policy = policy.strip('"').strip("'")
-        return 'present' if policy in prod_policies else 'absent'
-
-    elif op_type == 'DROP_POLICY':
-        policy = args[0].lower()
-        policy = policy.strip('"').strip("'")
-        return 'present' if policy not in prod_policies else 'absent'
-
-    elif op_type == 'CREATE_FUNCTION':
-        func = args[0].lower()
-        return 'present' if func in prod_functions else 'absent'
-
-    elif op_type == 'DROP_FUNCTION':
-        func = args[0].lower()
-        return 'present' if func not in prod_functions else 'absent'
-
-    elif op_type == 'CREATE_VIEW':
-        view = args[0].lower()
-        return 'present' if view in prod_views else 'absent'
-
-    elif op_type == 'DROP_VIEW':
-        view = args[0].lower()
-        return 'present' if view not in prod_views else 'absent'
-
-    elif op_type == 'CREATE_ENUM':
-        enum = args[0].lower()
-        return 'present' if enum in prod_enums else 'absent'
-
-    elif op_type == 'DROP_TYPE':
-        enum = args[0].lower()
-        return 'present' if enum not in prod_enums else 'absent'
-
-    elif op_type == 'ENABLE_RLS':
-        table = args[0].lower()
-        return 'present' if table in prod_rls_enabled else 'absent'
-
-    elif op_type == 'CREATE_TRIGGER':
-        trigger = args[0].lower()
-        return 'present' if trigger in prod_triggers else 'absent'
-
-    elif op_type == 'DROP_TRIGGER':
-        trigger = args[0].lower()
-        return 'present' if trigger not in prod_triggers else 'absent'
-
-    elif op_type == 'ALTER_ENUM_ADD':
-        # Can't easily check enum values, mark as unclear
-        return 'unclear'
-
-    elif op_type in ('INSERT_INTO', 'UPDATE_TABLE', 'DELETE_FROM'):
-        # Data operations can't be verified via schema reflection
-        return 'unclear'
-
-    elif op_type == 'ALTER_COLUMN':
-        # Column exists check (type/default changes can't be fully verified)
-        table = args[0].lower()
-        col = args[1].lower()
-        key = f"{table}.{col}"
-        return 'present' if key in prod_columns else 'absent'
-
-    elif op_type == 'RENAME_COLUMN':
-        # Check new name exists
-        table = args[0].lower()
-        new_col = args[2].lower() if len(args) > 2 else args[1].lower()
-        key = f"{table}.{new_col}"
-        return 'present' if key in prod_columns else 'absent'
-
-    elif op_type in ('GRANT', 'CREATE_EXTENSION', 'CREATE_SCHEMA'):
-        return 'unclear'
-
-    return 'unclear'
-
 # ── Triage each LOCAL_ONLY file ───────────────────────────────────────────────
 
-categories = {
-    'APPLIED_IDENTICAL': [],
-    'APPLIED_PARTIAL': [],
-    'NOT_APPLIED_DEAD': [],
-    'NOT_APPLIED_REAL': [],
-    'UNCLEAR': [],
-}
-
-local_only_sorted = sorted(local_only)
-print(f"Processing {len(local_only_sorted)} local-only files...")
-print()
-
-for i, version in enumerate(local_only_sorted):
-    filepath = local_map[version]
-    basename = os.path.basename(filepath)
-
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-    except Exception as e:
-        categories['UNCLEAR'].append({
-            'version': version,
-            'file': basename,
-            'description': f'(error reading file: {e})',
-            'reason': f'File read error: {e}',
-            'ops': [],
-            'present': [],
-            'absent': [],
-            'unclear_ops': [],
-        })
-        continue
-
+def triage_file(version, basename, content, ops, catalog, model, diff, index_conn):
+    """Judge one file's ops against the schema model diff and assign its category."""
     header = extract_header_comment(content)
-    ops = extract_ddl_ops(content)
 
     present_ops = []
     absent_ops = []
     unclear_ops = []
+    superseded_ops = []
 
     for op in ops:
-        status = check_op_in_prod(op)
+        status, writer = model.op_status(op, version, diff)
         if status == 'present':
             present_ops.append(op)
-        elif status == 'absent':
-            absent_ops.append(op)
+        elif status in ('absent', 'drifted'):
+            kind, name = object_index.op_refs(op)[0]
+            later = object_index.touched_after(index_conn, kind, name, version)
+            extra = {}
+            if later:
+                extra['later_refs'] = later
+            if status == 'drifted':
+                extra['drifted'] = True
+            absent_ops.append(dict(op, **extra) if extra else op)
+        elif status == 'superseded':
+            superseded_ops.append(dict(op, superseded_by=writer))
         else:
             unclear_ops.append(op)
 
@@ -370,28 +141,26 @@ for i, version in enumerate(local_only_sorted):
         'present': present_ops,
         'absent': absent_ops,
         'unclear_ops': unclear_ops,
+        'superseded': superseded_ops,
         'total_ops': len(ops),
         'total_checkable': total_checkable,
     }
 
-    if total_checkable == 0:
+    if total_checkable == 0 and superseded_ops:
+        entry['reason'] = 'All DDL effects superseded by later migrations — nothing left for this file to apply'
+        entry['category'] = 'NOT_APPLIED_DEAD'
+    elif total_checkable == 0:
         if len(unclear_ops) > 0:
             entry['reason'] = 'Only data ops (INSERT/UPDATE/DELETE) or unchecked DDL — cannot verify via schema reflection'
-            entry['category'] = 'UNCLEAR'
-            categories['UNCLEAR'].append(entry)
         elif len(ops) == 0:
             entry['reason'] = 'No DDL or DML ops detected — possibly empty/comment-only file or non-standard SQL'
-            entry['category'] = 'UNCLEAR'
-            categories['UNCLEAR'].append(entry)
         else:
             entry['reason'] = 'All ops unclear'
-            entry['category'] = 'UNCLEAR'
-            categories['UNCLEAR'].append(entry)
+        entry['category'] = 'UNCLEAR'
     elif len(absent_ops) == 0:
         # All checkable ops present in PROD
         entry['reason'] = 'All checkable DDL effects present in PROD — likely applied via another route or re-timestamped'
         entry['category'] = 'APPLIED_IDENTICAL'
-        categories['APPLIED_IDENTICAL'].append(entry)
     elif len(present_ops) == 0:
         # No checkable ops present in PROD
         # Determine if dead or real pending
@@ -400,7 +169,8 @@ for i, version in enumerate(local_only_sorted):
         for op in absent_ops:
             if op['type'] in ('ADD_COLUMN', 'ALTER_COLUMN', 'ADD_CONSTRAINT', 'CREATE_POLICY', 'CREATE_TRIGGER', 'ENABLE_RLS', 'CREATE_INDEX'):
                 # These reference an existing table - check if table exists
-                if op['args'] and op['args'][0].lower() in prod_tables:
+                tables = [name for kind, name in object_index.op_refs(op) if kind == 'tables']
+                if any(catalog.has_table(t) for t in tables):
                     references_existing = True
                     break
             elif op['type'] == 'CREATE_TABLE':
@@ -411,156 +181,355 @@ for i, version in enumerate(local_only_sorted):
         if references_existing:
             entry['reason'] = 'REAL PENDING — DDL effects NOT in PROD and target objects exist or are new tables'
             entry['category'] = 'NOT_APPLIED_REAL'
-            categories['NOT_APPLIED_REAL'].append(entry)
         else:
             entry['reason'] = 'No DDL effects in PROD and targets don\'t exist — likely dead/abandoned or references dropped tables'
             entry['category'] = 'NOT_APPLIED_DEAD'
-            categories['NOT_APPLIED_DEAD'].append(entry)
     else:
         # Mix of present and absent
         entry['reason'] = f'PARTIAL — {len(present_ops)} ops present, {len(absent_ops)} ops absent in PROD'
         entry['category'] = 'APPLIED_PARTIAL'
-        categories['APPLIED_PARTIAL'].append(entry)
-
-    if (i + 1) % 20 == 0:
-        print(f"  Processed {i+1}/{len(local_only_sorted)}...")
 
-print(f"  Processed {len(local_only_sorted)}/{len(local_only_sorted)} — done.")
-print()
+    return entry
 
-# ── Print summary ─────────────────────────────────────────────────────────────
-
-print("=" * 60)
-print("CATEGORY COUNTS")
-print("=" * 60)
-for cat, items in categories.items():
-    print(f"  {cat}: {len(items)} files")
-print()
+def read_error_entry(version, basename, e):
+    return {
+        'version': version,
+        'file': basename,
+        'description': f'(error reading file: {e})',
+        'reason': f'File read error: {e}',
+        'category': 'UNCLEAR',
+        'ops': [],
+        'present': [],
+        'absent': [],
+        'unclear_ops': [],
+        'superseded': [],
+    }
 
 # ── Generate report ───────────────────────────────────────────────────────────
 
-report_path = os.path.join(TMP_DIR, 'migration-sync-triage-report.md')
-
-with open(report_path, 'w', encoding='utf-8') as f:
-    f.write(f"# Migration Sync Triage Report — {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n")
-
-    f.write("## Summary\n\n")
-    f.write(f"- Total local files: {len(local_files)}\n")
-    f.write(f"- Total remote versions: {len(remote_versions)}\n")
-    f.write(f"- Parity (both local + remote): {len(parity)}\n")
-    f.write(f"- Local-only (local file, no remote tracking): {len(local_only)}\n")
-    f.write(f"- Remote-only (remote tracking, no local file): {len(remote_only)}\n\n")
-
-    f.write("## Category Counts\n\n")
-    f.write(f"- **APPLIED-IDENTICAL**: {len(categories['APPLIED_IDENTICAL'])} files — all DDL effects present in PROD\n")
-    f.write(f"- **APPLIED-PARTIAL**: {len(categories['APPLIED_PARTIAL'])} files — some DDL present, some missing\n")
-    f.write(f"- **NOT-APPLIED-DEAD**: {len(categories['NOT_APPLIED_DEAD'])} files — zero DDL present, targets don't exist\n")
-    f.write(f"- **NOT-APPLIED-REAL**: {len(categories['NOT_APPLIED_REAL'])} files — zero DDL present, targets exist or new tables\n")
-    f.write(f"- **UNCLEAR**: {len(categories['UNCLEAR'])} files — only data ops or no detectable DDL\n\n")
-
-    # ── APPLIED-IDENTICAL ──
-    f.write(f"## APPLIED-IDENTICAL files ({len(categories['APPLIED_IDENTICAL'])} files)\n\n")
-    f.write("These files' DDL effects are fully present in PROD. Safe to mark as applied via `migration repair --status applied`.\n\n")
-    for entry in sorted(categories['APPLIED_IDENTICAL'], key=lambda e: e['version']):
-        f.write(f"- `{entry['file']}` — {entry['description'][:120]}\n")
-        ops_summary = ', '.join(set(op['type'] for op in entry['present']))
-        f.write(f"  - Ops present: {ops_summary}\n")
-        if entry['unclear_ops']:
-            unclear_summary = ', '.join(set(op['type'] for op in entry['unclear_ops']))
-            f.write(f"  - Unclear ops (not checked): {unclear_summary}\n")
-    f.write("\n")
-
-    # ── APPLIED-PARTIAL ──
-    f.write(f"## APPLIED-PARTIAL files ({len(categories['APPLIED_PARTIAL'])} files) ⚠️ REQUIRES REVIEW\n\n")
-    for entry in sorted(categories['APPLIED_PARTIAL'], key=lambda e: e['version']):
-        f.write(f"### `{entry['file']}`\n\n")
-        f.write(f"Description: {entry['description'][:200]}\n\n")
-        f.write("**DDL ops present in PROD:**\n")
-        for op in entry['present']:
-            f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
-        f.write("\n**DDL ops MISSING from PROD:**\n")
-        for op in entry['absent']:
-            f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
-        if entry['unclear_ops']:
-            f.write("\n**Unclear ops:**\n")
-            for op in entry['unclear_ops']:
+def format_absent(op):
+    line = f"- {op['type']}: {' / '.join(op['args'])}"
+    if op.get('drifted'):
+        line += " (exists, but body differs from PROD)"
+    if op.get('later_refs'):
+        line += f" (also touched later by {', '.join(op['later_refs'])})"
+    return line + "\n"
+
+def write_superseded(f, entry):
+    if entry.get('superseded'):
+        f.write("\n**Superseded by later migrations:**\n")
+        for op in entry['superseded']:
+            f.write(f"- {op['type']}: {' / '.join(op['args'])} (last written by {op['superseded_by']})\n")
+
+def write_report(report_path, summary, categories):
+    """Render the markdown report from the triage store's summary and entries."""
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(f"# Migration Sync Triage Report — {summary['generated_at']}\n\n")
+
+        f.write("## Summary\n\n")
+        f.write(f"- Catalog: {summary['catalog_source']}\n")
+        f.write(f"- Total local files: {summary['local_files']}\n")
+        f.write(f"- Total remote versions: {summary['remote_versions']}\n")
+        f.write(f"- Parity (both local + remote): {summary['parity']}\n")
+        f.write(f"- Local-only (local file, no remote tracking): {len(summary['local_only'])}\n")
+        f.write(f"- Remote-only (remote tracking, no local file): {len(summary['remote_only'])}\n\n")
+
+        f.write("## Category Counts\n\n")
+        f.write(f"- **APPLIED-IDENTICAL**: {len(categories['APPLIED_IDENTICAL'])} files — all DDL effects present in PROD\n")
+        f.write(f"- **APPLIED-PARTIAL**: {len(categories['APPLIED_PARTIAL'])} files — some DDL present, some missing\n")
+        f.write(f"- **NOT-APPLIED-DEAD**: {len(categories['NOT_APPLIED_DEAD'])} files — zero DDL present (or all superseded), targets don't exist\n")
+        f.write(f"- **NOT-APPLIED-REAL**: {len(categories['NOT_APPLIED_REAL'])} files — zero DDL present, targets exist or new tables\n")
+        f.write(f"- **UNCLEAR**: {len(categories['UNCLEAR'])} files — only data ops or no detectable DDL\n\n")
+
+        # ── SCHEMA MODEL vs PROD ──
+        f.write("## Expected schema vs PROD\n\n")
+        f.write("Final state from replaying every local migration in version order (last writer wins), diffed against the PROD catalog. "
+                "Missing = expected but not in PROD; lingering = dropped by its last migration but still in PROD; "
+                "drifted = in PROD, but its function/view/policy/trigger body fingerprints differently from the last migration that wrote it.\n\n")
+        f.write("| Kind | Missing | Lingering | Drifted |\n|------|---------|-----------|---------|\n")
+        for kind, d in summary['diff'].items():
+            f.write(f"| {kind} | {d['missing']} | {d['lingering']} | {d['drifted']} |\n")
+        f.write("\n")
+        if summary['drifted']:
+            f.write("**Drifted objects** (last written by):\n")
+            for kind, key, writer in summary['drifted']:
+                f.write(f"- {kind}: {key} ({writer or '?'})\n")
+            f.write("\n")
+
+        # ── APPLIED-IDENTICAL ──
+        f.write(f"## APPLIED-IDENTICAL files ({len(categories['APPLIED_IDENTICAL'])} files)\n\n")
+        f.write("These files' DDL effects are fully present in PROD. Safe to mark as applied via `migration repair --status applied`.\n\n")
+        for entry in categories['APPLIED_IDENTICAL']:
+            f.write(f"- `{entry['file']}` — {entry['description'][:120]}\n")
+            ops_summary = ', '.join(sorted(set(op['type'] for op in entry['present'])))
+            f.write(f"  - Ops present: {ops_summary}\n")
+            if entry['unclear_ops']:
+                unclear_summary = ', '.join(sorted(set(op['type'] for op in entry['unclear_ops'])))
+                f.write(f"  - Unclear ops (not checked): {unclear_summary}\n")
+        f.write("\n")
+
+        # ── APPLIED-PARTIAL ──
+        f.write(f"## APPLIED-PARTIAL files ({len(categories['APPLIED_PARTIAL'])} files) ⚠️ REQUIRES REVIEW\n\n")
+        for entry in categories['APPLIED_PARTIAL']:
+            f.write(f"### `{entry['file']}`\n\n")
+            f.write(f"Description: {entry['description'][:200]}\n\n")
+            f.write("**DDL ops present in PROD:**\n")
+            for op in entry['present']:
                 f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
-        f.write(f"\nBest guess: {entry['reason']}\n\n")
-
-    # ── NOT-APPLIED-DEAD ──
-    f.write(f"## NOT-APPLIED-DEAD files ({len(categories['NOT_APPLIED_DEAD'])} files)\n\n")
-    f.write("These files' DDL effects are not in PROD and their targets don't exist. Likely abandoned drafts.\n\n")
-    for entry in sorted(categories['NOT_APPLIED_DEAD'], key=lambda e: e['version']):
-        f.write(f"- `{entry['file']}` — {entry['description'][:120]}\n")
-        if entry['absent']:
-            ops_summary = ', '.join(f"{op['type']}({'/'.join(op['args'])})" for op in entry['absent'][:5])
-            f.write(f"  - Missing ops: {ops_summary}\n")
-    f.write("\n")
-
-    # ── NOT-APPLIED-REAL ──
-    f.write(f"## NOT-APPLIED-REAL files ({len(categories['NOT_APPLIED_REAL'])} files) ⚠️ HIGH PRIORITY\n\n")
-    f.write("These files contain DDL that is NOT in PROD but targets existing tables or creates new ones.\n\n")
-    for entry in sorted(categories['NOT_APPLIED_REAL'], key=lambda e: e['version']):
-        f.write(f"### `{entry['file']}`\n\n")
-        f.write(f"Description: {entry['description'][:200]}\n\n")
-        f.write("**DDL ops missing in PROD:**\n")
-        for op in entry['absent']:
-            f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
-        if entry['unclear_ops']:
-            f.write("\n**Unclear ops:**\n")
-            for op in entry['unclear_ops']:
-                f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
-        f.write(f"\nRisk: {entry['reason']}\n\n")
-
-    # ── UNCLEAR ──
-    f.write(f"## UNCLEAR files ({len(categories['UNCLEAR'])} files)\n\n")
-    f.write("These files cannot be auto-categorized — only data ops, no detectable DDL, or file read errors.\n\n")
-    for entry in sorted(categories['UNCLEAR'], key=lambda e: e['version']):
-        f.write(f"- `{entry['file']}` — {entry['description'][:120]}\n")
-        f.write(f"  - Reason: {entry['reason']}\n")
-        if entry.get('unclear_ops'):
-            ops_summary = ', '.join(f"{op['type']}({'/'.join(op['args'])})" for op in entry['unclear_ops'][:5])
-            f.write(f"  - Ops: {ops_summary}\n")
-    f.write("\n")
-
-    # ── REMOTE-ONLY ──
-    f.write(f"## Remote-Only versions ({len(remote_only)})\n\n")
-    f.write("These versions are in PROD's schema_migrations but have no local file.\n\n")
-    # Load remote names for the remote-only ones
-    # We'll just list them since we know them from the 14a diagnostic
-    remote_only_names = {
-        '20260312100000': 'intelligence_feed_read_at',
-        '20260317000000': 'permissions_tables',
-        '20260321000000': 'notifications_superpower',
-        '20260321100000': 'demo_wire',
-        '20260321200000': 'drop_external_tables',
-        '20260322000000': 'ie_inspection_reports_distributions',
-        '20260322100000': 'firecrawl_crawl_engine',
-        '20260322200000': 'inspection_reports_storage',
-        '20260525000000': 'drift_monitor',
+            f.write("\n**DDL ops MISSING from PROD:**\n")
+            for op in entry['absent']:
+                f.write(format_absent(op))
+            if entry['unclear_ops']:
+                f.write("\n**Unclear ops:**\n")
+                for op in entry['unclear_ops']:
+                    f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
+            write_superseded(f, entry)
+            f.write(f"\nBest guess: {entry['reason']}\n\n")
+
+        # ── NOT-APPLIED-DEAD ──
+        f.write(f"## NOT-APPLIED-DEAD files ({len(categories['NOT_APPLIED_DEAD'])} files)\n\n")
+        f.write("These files' DDL effects are not in PROD and their targets don't exist. Likely abandoned drafts.\n\n")
+        for entry in categories['NOT_APPLIED_DEAD']:
+            f.write(f"- `{entry['file']}` — {entry['description'][:120]}\n")
+            if entry['absent']:
+                ops_summary = ', '.join(f"{op['type']}({'/'.join(op['args'])})" for op in entry['absent'][:5])
+                f.write(f"  - Missing ops: {ops_summary}\n")
+            if entry['superseded']:
+                later = ', '.join(sorted(set(op['superseded_by'] for op in entry['superseded'])))
+                f.write(f"  - {len(entry['superseded'])} op(s) superseded by: {later}\n")
+        f.write("\n")
+
+        # ── NOT-APPLIED-REAL ──
+        f.write(f"## NOT-APPLIED-REAL files ({len(categories['NOT_APPLIED_REAL'])} files) ⚠️ HIGH PRIORITY\n\n")
+        f.write("These files contain DDL that is NOT in PROD but targets existing tables or creates new ones.\n\n")
+        for entry in categories['NOT_APPLIED_REAL']:
+            f.write(f"### `{entry['file']}`\n\n")
+            f.write(f"Description: {entry['description'][:200]}\n\n")
+            f.write("**DDL ops missing in PROD:**\n")
+            for op in entry['absent']:
+                f.write(format_absent(op))
+            if entry['unclear_ops']:
+                f.write("\n**Unclear ops:**\n")
+                for op in entry['unclear_ops']:
+                    f.write(f"- {op['type']}: {' / '.join(op['args'])}\n")
+            write_superseded(f, entry)
+            f.write(f"\nRisk: {entry['reason']}\n\n")
+
+        # ── UNCLEAR ──
+        f.write(f"## UNCLEAR files ({len(categories['UNCLEAR'])} files)\n\n")
+        f.write("These files cannot be auto-categorized — only data ops, no detectable DDL, or file read errors.\n\n")
+        for entry in categories['UNCLEAR']:
+            f.write(f"- `{entry['file']}` — {entry['description'][:120]}\n")
+            f.write(f"  - Reason: {entry['reason']}\n")
+            if entry.get('unclear_ops'):
+                ops_summary = ', '.join(f"{op['type']}({'/'.join(op['args'])})" for op in entry['unclear_ops'][:5])
+                f.write(f"  - Ops: {ops_summary}\n")
+        f.write("\n")
+
+        # ── REMOTE-ONLY ──
+        f.write(f"## Remote-Only versions ({len(summary['remote_only'])})\n\n")
+        f.write("These versions are in PROD's schema_migrations but have no local file.\n\n")
+        for v, name in summary['remote_only']:
+            f.write(f"- `{v}` / {name or '(unknown)'} — effects in PROD: assumed yes (was applied)\n")
+        f.write("\n")
+
+        # ── LINT ──
+        lint = summary.get('lint') or []
+        f.write(f"## Lint findings in local-only files ({len(lint)})\n\n")
+        f.write("DDL that is lock- or scan-heavy on large tables (see scripts/migration_triage/migration_lint.py). "
+                "Worth fixing before any NOT-APPLIED-REAL file is pushed.\n\n")
+        for rule in migration_lint.RULES:
+            hits = [x for x in lint if x['rule'] == rule]
+            if hits:
+                f.write(f"**{rule}** ({len(hits)}):\n")
+                for x in hits:
+                    f.write(f"- `{x['file']}:{x['line']}` (offset {x['offset']}) — {x['message']}\n")
+                f.write("\n")
+
+        # ── RECOMMENDED ACTIONS ──
+        f.write("## Recommended Actions (per category)\n\n")
+        f.write("1. **APPLIED-IDENTICAL**: Create local placeholder files, run `migration repair --status applied`, then delete placeholders. Or: bulk insert into schema_migrations via `db query`. One commit.\n")
+        f.write("2. **APPLIED-PARTIAL**: STOP. Manual review per file before any action. Each needs human judgment on whether missing ops are intentional or a real gap.\n")
+        f.write("3. **NOT-APPLIED-DEAD**: Delete local files. One commit.\n")
+        f.write("4. **NOT-APPLIED-REAL**: STOP. Each file becomes its own apply decision — either apply to PROD or delete if superseded.\n")
+        f.write("5. **UNCLEAR**: Manual review per file.\n")
+        f.write("6. **REMOTE-ONLY**: Create placeholder files, run `migration repair --status applied` for the orphans listed above. Or: keep placeholder files permanently.\n\n")
+
+        # ── VERSION LIST FOR REFERENCE ──
+        f.write("## Appendix: Full local-only version list\n\n")
+        f.write("```\n")
+        for basename in summary['local_only']:
+            f.write(f"{basename}\n")
+        f.write("```\n")
+
+def build_summary(catalog, local_files, local_map, parity, local_only, remote_only, diff, writers, lint):
+    """Run-wide facts the report header needs, in the form the triage store keeps."""
+    return {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'catalog_source': catalog.source + ('' if catalog.structured else ' (legacy text files)'),
+        'local_files': len(local_files),
+        'remote_versions': len(catalog.remote_versions),
+        'parity': len(parity),
+        'local_only': [os.path.basename(local_map[v]) for v in sorted(local_only)],
+        'remote_only': [[v, catalog.migrations.get(v) or KNOWN_REMOTE_NAMES.get(v)] for v in sorted(remote_only)],
+        'diff': {kind: {k: len(keys) for k, keys in d.items()} for kind, d in diff.items()},
+        'drifted': [[kind, key, writers.get((kind, key))]
+                    for kind, d in diff.items() for key in sorted(d['drifted'])],
+        'lint': lint,
     }
-    for v in sorted(remote_only):
-        name = remote_only_names.get(v, '(unknown)')
-        f.write(f"- `{v}` / {name} — effects in PROD: assumed yes (was applied)\n")
-    f.write("\n")
-
-    # ── RECOMMENDED ACTIONS ──
-    f.write("## Recommended Actions (per category)\n\n")
-    f.write("1. **APPLIED-IDENTICAL**: Create local placeholder files, run `migration repair --status applied`, then delete placeholders. Or: bulk insert into schema_migrations via `db query`. One commit.\n")
-    f.write("2. **APPLIED-PARTIAL**: STOP. Manual review per file before any action. Each needs human judgment on whether missing ops are intentional or a real gap.\n")
-    f.write("3. **NOT-APPLIED-DEAD**: Delete local files. One commit.\n")
-    f.write("4. **NOT-APPLIED-REAL**: STOP. Each file becomes its own apply decision — either apply to PROD or delete if superseded.\n")
-    f.write("5. **UNCLEAR**: Manual review per file.\n")
-    f.write("6. **REMOTE-ONLY**: Create placeholder files, run `migration repair --status applied` for the 9 known orphans. Or: keep placeholder files permanently.\n\n")
-
-    # ── VERSION LIST FOR REFERENCE ──
-    f.write("## Appendix: Full local-only version list\n\n")
-    f.write("```\n")
-    for v in sorted(local_only):
-        basename = os.path.basename(local_map[v])
-        f.write(f"{basename}\n")
-    f.write("```\n")
-
-print(f"Report written to: {report_path}")
-print()
-print("Done.")
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description='Triage local-only migrations against the PROD catalog')
+    parser.add_argument('--catalog', default=None,
+                        help=f'Catalog snapshot JSON (default: {DEFAULT_SNAPSHOT_PATH} if present, else {TMP_DIR}/prod_*.txt)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parse processes for uncached files (default: CPU count; 1 = serial)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Parse cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-parse and re-triage every file and leave the caches untouched')
+    parser.add_argument('--report-only', action='store_true',
+                        help='Re-render the report from the stored results without re-triaging')
+    parser.add_argument('--json', metavar='PATH', help='Also export the stored results as JSON')
+    args = parser.parse_args()
+
+    report_path = os.path.join(TMP_DIR, 'migration-sync-triage-report.md')
+    store_path = os.path.join(args.cache_dir, 'triage.sqlite')
+    store = triage_store.connect(':memory:' if args.no_cache else store_path)
+
+    if args.report_only:
+        summary = triage_store.load_summary(store)
+        if summary is None:
+            sys.exit(f"No stored triage results in {store_path}; run without --report-only first")
+        write_report(report_path, summary, triage_store.load_categories(store))
+        print(f"Report written to: {report_path}")
+        if args.json:
+            triage_store.export_json(store, args.json)
+            print(f"Results exported to: {args.json}")
+        return
+
+    catalog = load_catalog(args.catalog)
+    remote_versions = catalog.remote_versions
+    print(f"Catalog: {catalog.source}{'' if catalog.structured else ' (legacy text files)'}")
+    local_files, local_map = discover_local_files()
+
+    # ── Compute gaps ──
+
+    local_versions = set(local_map.keys())
+    parity = local_versions & remote_versions
+    local_only = local_versions - remote_versions
+    remote_only = remote_versions - local_versions
+
+    print(f"Local files: {len(local_files)}")
+    print(f"Remote versions: {len(remote_versions)}")
+    print(f"Parity: {len(parity)}")
+    print(f"Local-only: {len(local_only)}")
+    print(f"Remote-only: {len(remote_only)}")
+    print()
+
+    local_only_sorted = sorted(local_only)
+    print(f"Processing {len(local_only_sorted)} local-only files...")
+    print()
+
+    # Every local file is parsed (most come from the cache): the schema model
+    # needs the parity migrations too, to know what later files superseded.
+    local_versions_sorted = sorted(local_map)
+    parsed, timings = parse_files([local_map[v] for v in local_versions_sorted],
+                                  cache_dir=args.cache_dir, workers=args.workers,
+                                  use_cache=not args.no_cache)
+
+    index_path = os.path.join(args.cache_dir, 'objects.sqlite')
+    index_conn = object_index.connect(':memory:' if args.no_cache else index_path)
+    object_index.update_index(index_conn, local_map, parsed, cache_dir=args.cache_dir)
+
+    t0 = time.perf_counter()
+    ops_by_version = {v: parsed[local_map[v]]['ops'] for v in local_versions_sorted
+                      if 'error' not in parsed[local_map[v]]}
+    model = SchemaModel().replay(sorted(ops_by_version.items()))
+    diff = model.diff(catalog.keys(), catalog.fingerprints())
+    touches = triage_store.touch_map(ops_by_version)
+    stored = triage_store.stored_keys(store)
+
+    # Only versions whose content or dependencies changed are re-triaged
+    rows = []
+    for version in local_only_sorted:
+        filepath = local_map[version]
+        basename = os.path.basename(filepath)
+        result = parsed[filepath]
+
+        if 'error' in result:
+            entry = read_error_entry(version, basename, result['error'])
+            rows.append((f"error:{result['error']}", entry))
+            continue
+
+        key = triage_store.input_key(version, content_key(result['content'].encode('utf-8')),
+                                     result['ops'], model, diff, catalog, touches)
+        if stored.get(version) == key:
+            continue
+        entry = triage_file(version, basename, result['content'], result['ops'], catalog, model, diff, index_conn)
+        del entry['ops']
+        rows.append((key, entry))
+
+        if len(rows) % 20 == 0:
+            print(f"  Re-triaged {len(rows)}...")
+    removed = triage_store.save_results(store, rows, keep=set(local_only_sorted))
+    # Lint sees every migration (for FK indexes added later) but reports local-only files
+    lint = migration_lint.lint(
+        ((v, os.path.basename(local_map[v]), parsed[local_map[v]]['content'], ops)
+         for v, ops in sorted(ops_by_version.items())),
+        catalog if catalog.structured else None, versions=local_only)
+    summary = build_summary(catalog, local_files, local_map, parity, local_only, remote_only,
+                            diff, model.writer, lint)
+    triage_store.save_summary(store, summary)
+    timings['check'] = time.perf_counter() - t0
+
+    print(f"  Re-triaged {len(rows)}/{len(local_only_sorted)}, "
+          f"{len(local_only_sorted) - len(rows)} unchanged, {removed} dropped — done.")
+    print()
+
+    # ── Print summary ──
+
+    t0 = time.perf_counter()
+    categories = triage_store.load_categories(store)
+    print("=" * 60)
+    print("CATEGORY COUNTS")
+    print("=" * 60)
+    for cat, items in categories.items():
+        print(f"  {cat}: {len(items)} files")
+    print()
+    print("Expected schema vs PROD (missing / lingering / drifted):")
+    for kind, d in summary['diff'].items():
+        print(f"  {kind}: {d['missing']} / {d['lingering']} / {d['drifted']}")
+    print()
+    print(f"Lint findings in local-only files: {len(summary['lint'])}")
+    for rule in migration_lint.RULES:
+        n = sum(1 for x in summary['lint'] if x['rule'] == rule)
+        if n:
+            print(f"  {rule}: {n}")
+    print()
+
+    write_report(report_path, summary, categories)
+    timings['report'] = time.perf_counter() - t0
+
+    print(f"Report written to: {report_path}")
+    if args.json:
+        triage_store.export_json(store, args.json)
+        print(f"Results exported to: {args.json}")
+    print()
+    print("=" * 60)
+    print("TIMING")
+    print("=" * 60)
+    print(f"  read:           {timings['read']:.3f}s")
+    print(f"  lex:            {timings['lex']:.3f}s  (summed across workers)")
+    print(f"  classify:       {timings['classify']:.3f}s  (summed across workers)")
+    print(f"  catalog check:  {timings['check']:.3f}s")
+    print(f"  report:         {timings['report']:.3f}s")
+    print(f"  parsed {timings['parsed']} file(s), {timings['cached']} from cache")
+    print()
+    print("Done.")
+
+
+if __name__ == '__main__':
+    main()